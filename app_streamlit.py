@@ -3,9 +3,12 @@ import streamlit as st
 from datetime import datetime, timedelta
 import time
 import threading
-from ncaa_api import NCAAAPIClient
+from ncaa_api import STALE_FIELD, NCAAAPIClient
+from prefetch import VIEW_MAX_AGE, Prefetcher
 from xml_generator import XMLGenerator
 from config_manager import ConfigManager
+from contest_db import ContestDatabase
+from serializers import available_formats, get_serializer, serialize
 import os
 
 # Page configuration
@@ -47,10 +50,24 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state
+@st.cache_resource
+def get_config():
+    """Settings shared by all sessions (one config.json, one flush timer)"""
+    return ConfigManager()
+
+@st.cache_resource
+def get_database(path):
+    """Contest database shared by all sessions"""
+    return ContestDatabase(path)
+
 if 'api_client' not in st.session_state:
-    st.session_state.api_client = NCAAAPIClient()
+    st.session_state.config = get_config()
+    database_path = st.session_state.config.get('database', '')
+    st.session_state.database = get_database(database_path) if database_path else None
+    # Optional hedging of slow upstream requests ("hedge_requests" in config.json)
+    st.session_state.api_client = NCAAAPIClient(hedge=bool(st.session_state.config.get('hedge_requests', False)),
+                                                database=st.session_state.database)
     st.session_state.xml_generator = XMLGenerator()
-    st.session_state.config = ConfigManager()
     st.session_state.all_contests = []
     st.session_state.selected_contests = []
     st.session_state.auto_update_running = False
@@ -60,8 +77,30 @@ if 'api_client' not in st.session_state:
     st.session_state.last_response = None
     st.session_state.fetch_error = None
 
+@st.cache_resource
+def get_prefetcher(database_path, hedge):
+    """One background prefetcher for all sessions (they share the client cache)"""
+    database = get_database(database_path) if database_path else None
+    return Prefetcher(NCAAAPIClient(hedge=hedge, database=database))
+
+def prefetch_around(query):
+    """Warm adjacent dates and divisions in the background ("prefetch" in config.json)"""
+    config = st.session_state.config
+    if config.get('prefetch', True):
+        get_prefetcher(config.get('database', ''), bool(config.get('hedge_requests', False))).prefetch_around(*query)
+
 def fetch_events(sport_code, division, date, week=None):
     """Fetch events from NCAA API"""
+    query = (sport_code, division, 2025, date, int(week) if week and str(week).isdigit() else None)
+    cached = st.session_state.api_client.cached_snapshot(*query) if query[4] or not week else None
+    if cached is not None and cached.age <= VIEW_MAX_AGE:
+        # Prefetched or fetched moments ago: no need to wait on the network
+        st.session_state.all_contests = cached.contests
+        st.session_state.last_fetch_time = datetime.now() - timedelta(seconds=cached.age)
+        st.session_state.fetch_error = None
+        prefetch_around(query)
+        return cached.contests
+
     with st.spinner('Fetching events from NCAA.com...'):
         try:
             # Store request details for debugging
@@ -84,10 +123,22 @@ def fetch_events(sport_code, division, date, week=None):
             # Store raw response for debugging
             st.session_state.last_response = response
 
+            st.session_state.last_fetch_time = datetime.now()
+            cache = response.get(STALE_FIELD)
+            if cache:
+                # Upstream failed: keep showing the last good data instead of blanking
+                if cache['fetched_at'] is None:
+                    st.session_state.fetch_error = cache['error']
+                    st.warning(f"Fetch failed, keeping current events: {cache['error']}")
+                    return st.session_state.all_contests
+                st.session_state.fetch_error = cache['error']
+                st.warning(f"Fetch failed, showing events from {cache['age']:.0f}s ago")
+            else:
+                st.session_state.fetch_error = None
+                prefetch_around(query)
+
             contests = st.session_state.api_client.parse_contests(response)
             st.session_state.all_contests = contests
-            st.session_state.last_fetch_time = datetime.now()
-            st.session_state.fetch_error = None
             return contests
         except Exception as e:
             st.session_state.fetch_error = str(e)
@@ -97,17 +148,7 @@ def fetch_events(sport_code, division, date, week=None):
 
 def apply_filters(contests, top25_only, conference_filter):
     """Apply filters to contests"""
-    filtered = contests.copy()
-
-    if top25_only:
-        filtered = [c for c in filtered if st.session_state.api_client.is_top_25(c)]
-
-    if conference_filter and conference_filter.lower() != "all":
-        filtered = [c for c in filtered if
-                   conference_filter.lower() in c.get('home_team', {}).get('conference', '').lower() or
-                   conference_filter.lower() in c.get('away_team', {}).get('conference', '').lower()]
-
-    return filtered
+    return st.session_state.api_client.filter_contests(contests, top25_only, conference_filter)
 
 def format_event_display(contest, index):
     """Format event for display"""
@@ -316,6 +357,31 @@ with col_main1:
                     st.error(f"Unexpected response type: {type(st.session_state.last_response)}")
                     st.write(str(st.session_state.last_response)[:1000])
 
+    # Local contest database: answered without upstream calls
+    if st.session_state.database:
+        with st.expander("🗄️ Local Database", expanded=False):
+            db_col1, db_col2 = st.columns(2)
+            with db_col1:
+                db_team = st.text_input("Team", "", key="db_team")
+                db_from = st.date_input("From", value=datetime.now() - timedelta(days=7), key="db_from")
+            with db_col2:
+                db_conference = st.text_input("Conference", "", key="db_conference")
+                db_to = st.date_input("To", value=datetime.now() + timedelta(days=7), key="db_to")
+            db_ranked = st.selectbox("Ranked", ["Any", "Either team ranked", "Ranked matchups"], key="db_ranked")
+            results = st.session_state.database.query(
+                team=db_team.strip() or None,
+                conference=db_conference.strip() or None,
+                date_from=db_from.strftime("%Y-%m-%d"),
+                date_to=db_to.strftime("%Y-%m-%d"),
+                ranked={"Either team ranked": "either", "Ranked matchups": "both"}.get(db_ranked)
+            )
+            st.caption(f"{len(results)} contests in the local database")
+            for i, contest in enumerate(results[:50]):
+                st.markdown(format_event_display(contest, i))
+            if results and st.button("Show these as Available Events", key="db_load"):
+                st.session_state.all_contests = results
+                st.rerun()
+
 with col_main2:
     st.header("✅ Selected Events")
 
@@ -362,29 +428,39 @@ with col_main2:
             st.session_state.last_xml = xml_string
             st.code(xml_string, language='xml')
 
-        if st.button("💾 Download XML", type="primary", use_container_width=True):
+        output_format = st.selectbox(
+            "Download format",
+            available_formats(),
+            format_func=lambda fmt: fmt.upper()
+        )
+        serializer = get_serializer(output_format)
+
+        if st.button(f"💾 Download {output_format.upper()}", type="primary", use_container_width=True):
             metadata = {
                 'Sport': sport_name,
                 'Division': division_name,
                 'Date': date_str,
-                'TotalEvents': len(st.session_state.selected_contests),
-                'GeneratedAt': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'TotalEvents': len(st.session_state.selected_contests)
             }
-            xml_string = st.session_state.xml_generator.generate_xml(
-                st.session_state.selected_contests,
-                metadata
-            )
+            if output_format == 'xml':
+                metadata['GeneratedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                data = st.session_state.xml_generator.generate_xml(
+                    st.session_state.selected_contests,
+                    metadata
+                )
+            else:
+                data = serialize(st.session_state.selected_contests, metadata, output_format)
 
             # Download button
-            filename = f"ncaa_events_{sport_code}_{date_str.replace('/', '_')}.xml"
+            filename = f"ncaa_events_{sport_code}_{date_str.replace('/', '_')}{serializer.extension}"
             st.download_button(
-                label="⬇️ Download XML File",
-                data=xml_string,
+                label=f"⬇️ Download {output_format.upper()} File",
+                data=data,
                 file_name=filename,
-                mime="application/xml",
+                mime=serializer.mime_type,
                 use_container_width=True
             )
-            st.success(f"✓ XML ready! Click above to download as '{filename}'")
+            st.success(f"✓ {output_format.upper()} ready! Click above to download as '{filename}'")
 
         # Auto-update XML feature
         st.divider()
@@ -0,0 +1,250 @@
+"""Auto-update pipeline: poll, diff, render and write one output file"""
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Optional, Callable, Union
+
+from changes import ContestDiffer
+from history import ScoreHistory
+from latency import ChangeLatencyTracker
+from metrics import CHANGE_EVENTS, CYCLES, STAGE_SECONDS
+from profiling import CycleProfiler, get_profiler
+from ncaa_api import STALE_FIELD, NCAAAPIClient
+from serializers import format_for_path, save_output, serialize
+from xml_generator import XMLGenerator
+
+STAGES = ('fetch', 'parse', 'filter', 'render', 'write', 'total')
+
+
+class AutoUpdateJob:
+    """Polls one upstream query and keeps an output file current"""
+
+    def __init__(self, client: NCAAAPIClient, sport_code: str, division: int, contest_date: Optional[str],
+                 output_path: str, selected: Optional[List[Dict]] = None, season_year: int = 2025,
+                 week: Optional[int] = None, metadata: Optional[Dict] = None,
+                 top25_only: bool = False, conference: Optional[str] = None,
+                 ids: Optional[List[str]] = None, generator: Optional[XMLGenerator] = None,
+                 profiler: Optional[CycleProfiler] = None, push_sink=None,
+                 history: Optional[ScoreHistory] = None):
+        """
+        Args:
+            client: API client used for every poll
+            sport_code: Sport code (e.g. 'WBB')
+            division: Division number
+            contest_date: Date in MM/DD/YYYY format
+            output_path: File to keep current (extension selects the format)
+            selected: Contests to write; None writes every contest that
+                passes the Top 25/conference filters
+            season_year: Season year
+            week: Week number (optional)
+            metadata: Static metadata (TotalEvents and LastUpdated are added)
+            top25_only: Filter used when no selection is given
+            conference: Filter used when no selection is given
+            ids: Contest ids kept after the filters when no selection is given
+            generator: XMLGenerator to reuse (keeps its fragment cache)
+            profiler: Profiler wrapped around cycles (default: the
+                process-wide one, None unless profiling is enabled)
+            push_sink: push_sink.PushSinkGroup sent changed contests as soon
+                as they are detected, before rendering and writing
+            history: ScoreHistory fed every polled contest; written contests
+                carry their score timeline
+        """
+        self.client = client
+        self.sport_code = sport_code
+        self.division = division
+        self.contest_date = contest_date
+        self.season_year = season_year
+        self.week = week
+        self.output_path = output_path
+        self.selected = list(selected) if selected is not None else None
+        self.metadata = dict(metadata or {})
+        self.top25_only = top25_only
+        self.conference = conference
+        self.ids = set(ids) if ids else None
+        self.generator = generator or XMLGenerator()
+        self.format = format_for_path(output_path)
+        self.profiler = profiler or get_profiler()
+        self.push_sink = push_sink
+        self.history = history
+
+        self.differ = ContestDiffer()
+        self.latency = ChangeLatencyTracker()
+        self.contests: List[Dict] = []
+        self.last_output: List[Dict] = []
+        self.last_document = None
+        self.runs = 0
+
+    @property
+    def key(self) -> tuple:
+        """Upstream query this job polls"""
+        return (self.sport_code, self.division, self.season_year, self.contest_date, self.week)
+
+    def document_version(self) -> Optional[str]:
+        """Hash of the last rendered document, ignoring volatile timestamps"""
+        if self.last_document is None:
+            return None
+        if self.format == 'xml':
+            return self.generator.payload_hash(self.last_document)
+        static = {k: v for k, v in self.metadata.items() if k not in XMLGenerator.VOLATILE_METADATA}
+        payload = json.dumps({'contests': self.last_output, 'metadata': static}, sort_keys=True, default=str)
+        return hashlib.sha1(f"{self.format}:{payload}".encode('utf-8')).hexdigest()
+
+    def merge_selection(self, selected: List[Dict], contests: List[Dict]) -> List[Dict]:
+        """Replace selected contests with their fresh versions, keeping stale ones that vanished"""
+        fresh = {c.get('id'): c for c in contests}
+        return [fresh.get(contest.get('id'), contest) for contest in selected]
+
+    def run_once(self, selected: Optional[List[Dict]] = None) -> Dict:
+        """
+        Run one poll cycle: fetch, parse, diff, select, render, write
+
+        Args:
+            selected: Selection for this cycle (defaults to the job's)
+
+        Returns:
+            Dict with per-stage timings, change events and write outcome;
+            'stale' holds the upstream error and data age when the fetch
+            failed and the output was left as it was (None otherwise)
+        """
+        try:
+            if self.profiler:
+                with self.profiler.cycle():
+                    result = self._run_cycle(selected)
+            else:
+                result = self._run_cycle(selected)
+        except Exception:
+            CYCLES.inc(result='error')
+            raise
+
+        for stage in STAGES:
+            STAGE_SECONDS.observe(result[f'{stage}_seconds'], stage=stage)
+        for event in result['events']:
+            CHANGE_EVENTS.inc(type=event['type'])
+        if result['stale']:
+            CYCLES.inc(result='stale')
+        else:
+            CYCLES.inc(result='written' if result['written'] else ('unchanged' if result['ok'] else 'failed'))
+        return result
+
+    def fetch(self) -> Dict:
+        """Raw response for this job's query (subclasses may combine several)"""
+        return self.client.fetch_contests(
+            sport_code=self.sport_code,
+            division=self.division,
+            season_year=self.season_year,
+            contest_date=self.contest_date,
+            week=self.week
+        )
+
+    def select(self, contests: List[Dict]) -> List[Dict]:
+        """Contests to write when no explicit selection is given"""
+        output = self.client.filter_contests(contests, self.top25_only, self.conference)
+        if self.ids:
+            output = [c for c in output if str(c.get('id')) in self.ids]
+        return output
+
+    def _run_cycle(self, selected: Optional[List[Dict]]) -> Dict:
+        started = time.perf_counter()
+        response = self.fetch()
+        fetched = time.perf_counter()
+
+        if self.client.is_stale(response):
+            # Upstream failed: keep the last output instead of rewriting it
+            # with old (or no) data; it switches when a fetch succeeds again
+            return self._stale_result(response, started, fetched)
+
+        contests = self.client.parse_contests(response)
+        parsed = time.perf_counter()
+
+        events = self.differ.update(self.key, contests)
+        self.contests = contests
+
+        selection = selected if selected is not None else self.selected
+        if selection is not None:
+            output = self.merge_selection(selection, contests)
+            if selected is None:
+                self.selected = output
+        else:
+            output = self.select(contests)
+        if self.history is not None:
+            self.history.record(contests)
+            output = self.history.attach(output)
+        if self.push_sink and events:
+            self.push_sink.send_changes(events, output)
+        diffed = time.perf_counter()
+
+        metadata = dict(self.metadata)
+        metadata['TotalEvents'] = len(output)
+        metadata['LastUpdated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        if self.format == 'xml':
+            data = self.generator.generate_xml(output, metadata)
+            rendered = time.perf_counter()
+            skipped_before = self.generator.write_stats['skipped']
+            ok = self.generator.save_to_file(data, self.output_path)
+            written = ok and self.generator.write_stats['skipped'] == skipped_before
+        else:
+            data = serialize(output, metadata, self.format)
+            rendered = time.perf_counter()
+            ok = written = save_output(data, self.output_path)
+        finished = time.perf_counter()
+
+        self.last_output = output
+        self.last_document = data
+        self.latency.observe(events, output, {
+            'started': started, 'fetched': fetched, 'parsed': parsed,
+            'filtered': diffed, 'rendered': rendered, 'finished': finished
+        }, ok)
+        self.runs += 1
+        return {
+            'contests': len(contests),
+            'selected': len(output),
+            'events': events,
+            'ok': ok,
+            'written': written,
+            'stale': None,
+            'fetch_seconds': fetched - started,
+            'parse_seconds': parsed - fetched,
+            'filter_seconds': diffed - parsed,
+            'render_seconds': rendered - diffed,
+            'write_seconds': finished - rendered,
+            'total_seconds': finished - started,
+        }
+
+    def _stale_result(self, response: Dict, started: float, fetched: float) -> Dict:
+        meta = response[STALE_FIELD]
+        self.runs += 1
+        return {
+            'contests': len(self.contests),
+            'selected': len(self.last_output),
+            'events': [],
+            'ok': True,
+            'written': False,
+            'stale': {'error': meta['error'], 'age': meta['age']},
+            'fetch_seconds': fetched - started,
+            'parse_seconds': 0.0,
+            'filter_seconds': 0.0,
+            'render_seconds': 0.0,
+            'write_seconds': 0.0,
+            'total_seconds': fetched - started,
+        }
+
+    def run_forever(self, interval: Union[float, Callable[[], float]], stop_event: threading.Event,
+                    on_cycle: Optional[Callable[[Dict], None]] = None):
+        """
+        Run poll cycles every interval seconds until stop_event is set
+
+        interval may be a callable returning the current interval, which is
+        asked again after every cycle. Errors in a cycle are printed and the
+        loop carries on.
+        """
+        while not stop_event.is_set():
+            try:
+                result = self.run_once()
+                if on_cycle:
+                    on_cycle(result)
+            except Exception as e:
+                print(f"Auto-update error: {e}")
+            stop_event.wait(interval() if callable(interval) else interval)
@@ -0,0 +1,212 @@
+"""Parallel multi-file export for batch jobs
+
+Splits a contest selection into many output documents (one per contest or
+one per sport) and renders and writes them across a worker pool, reporting
+per-file timings and a single summary.
+"""
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Optional
+
+from serializers import get_serializer, save_output, serialize
+from templates import compile_template
+from xml_generator import XMLGenerator
+
+SPLIT_MODES = ('contest', 'sport')
+
+# One generator per (template, output document) in each worker process, so
+# repeated exports reuse fragment caches and change-aware write state
+_generators: Dict[tuple, XMLGenerator] = {}
+_generators_lock = threading.Lock()
+
+
+def _safe_name(value) -> str:
+    """Make a value safe to use in a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(value)).strip('_') or 'unknown'
+
+
+def split_selection(contests: List[Dict], split_by: str = 'contest') -> Dict[str, List[Dict]]:
+    """
+    Group contests into output documents
+
+    Args:
+        contests: List of contest dictionaries
+        split_by: 'contest' (one document per contest) or 'sport'
+
+    Returns:
+        Dict of document key -> contests, in first-seen order. Values that
+        sanitize to the same key (e.g. a missing id and 'unknown') get a
+        numeric suffix instead of sharing, and overwriting, one file.
+    """
+    if split_by not in SPLIT_MODES:
+        raise ValueError(f"Unknown split mode '{split_by}'. Choose from: {', '.join(SPLIT_MODES)}")
+
+    groups: Dict[str, List[Dict]] = {}
+    keys: Dict[str, str] = {}
+    for contest in contests:
+        if split_by == 'contest':
+            value = str(contest.get('id', ''))
+        else:
+            value = str(contest.get('sport') or 'unknown')
+        key = keys.get(value)
+        if key is None:
+            key = base = f"{split_by}_{_safe_name(value)}"
+            suffix = 2
+            while key in groups:
+                key = f"{base}_{suffix}"
+                suffix += 1
+            keys[value] = key
+            groups[key] = []
+        groups[key].append(contest)
+    return groups
+
+
+def _worker_generator(template_spec: Optional[Dict], document_key: str) -> XMLGenerator:
+    """Return the generator for one output document"""
+    key = (repr(template_spec), document_key)
+    with _generators_lock:
+        generator = _generators.get(key)
+        if generator is None:
+            template = compile_template(template_spec) if template_spec is not None else None
+            generator = _generators[key] = XMLGenerator(template=template)
+    return generator
+
+
+def _export_document(task: Dict) -> Dict:
+    """Render and write one output document (runs in a worker)"""
+    result = {'key': task['key'], 'path': task['path'], 'contests': len(task['contests']),
+              'render_seconds': 0.0, 'write_seconds': 0.0, 'written': False, 'error': None}
+    try:
+        start = time.perf_counter()
+        if task['fmt'] == 'xml' or task['template'] is not None:
+            generator = _worker_generator(task['template'], task['path'])
+            data = generator.generate_xml(task['contests'], task['metadata'])
+            rendered = time.perf_counter()
+            skipped_before = generator.write_stats['skipped']
+            ok = generator.save_to_file(data, task['path'])
+            result['written'] = ok and generator.write_stats['skipped'] == skipped_before
+        else:
+            data = serialize(task['contests'], task['metadata'], task['fmt'])
+            rendered = time.perf_counter()
+            ok = save_output(data, task['path'])
+            result['written'] = ok
+        result['render_seconds'] = rendered - start
+        result['write_seconds'] = time.perf_counter() - rendered
+        if not ok:
+            result['error'] = "write failed"
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+class BatchExporter:
+    """Exports a selection as many files using a reusable worker pool"""
+
+    def __init__(self, output_dir: str, split_by: str = 'contest', fmt: str = 'xml',
+                 template_spec: Optional[Dict] = None, workers: Optional[int] = None,
+                 use_processes: bool = False):
+        """
+        Args:
+            output_dir: Directory the files are written to
+            split_by: 'contest' or 'sport'
+            fmt: Output format name (see serializers.py)
+            template_spec: Optional template dictionary (see templates.py)
+            workers: Pool size (default: CPU count, plus 4 for threads
+                since writes are I/O bound)
+            use_processes: Render in worker processes instead of threads
+        """
+        if split_by not in SPLIT_MODES:
+            raise ValueError(f"Unknown split mode '{split_by}'. Choose from: {', '.join(SPLIT_MODES)}")
+        self.output_dir = output_dir
+        self.split_by = split_by
+        self.fmt = fmt
+        self.template_spec = template_spec
+        if template_spec is not None:
+            self.extension = compile_template(template_spec).extension
+        else:
+            self.extension = get_serializer(fmt).extension
+        cpus = os.cpu_count() or 1
+        self.workers = workers or (cpus if use_processes else min(32, cpus + 4))
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=self.workers)
+
+    def export(self, contests: List[Dict], metadata: Dict = None) -> Dict:
+        """
+        Split, render and write a selection
+
+        Args:
+            contests: List of contest dictionaries
+            metadata: Metadata shared by every file (TotalEvents is set per file)
+
+        Returns:
+            Summary dict with per-file results under 'files'
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        start = time.perf_counter()
+
+        tasks = []
+        for key, group in split_selection(contests, self.split_by).items():
+            file_metadata = dict(metadata or {})
+            file_metadata['TotalEvents'] = len(group)
+            tasks.append({
+                'key': key,
+                'contests': group,
+                'metadata': file_metadata,
+                'path': os.path.join(self.output_dir, key + self.extension),
+                'fmt': self.fmt,
+                'template': self.template_spec,
+            })
+
+        files = list(self._executor.map(_export_document, tasks))
+        wall = time.perf_counter() - start
+
+        render_times = [f['render_seconds'] for f in files]
+        return {
+            'files': files,
+            'documents': len(files),
+            'contests': len(contests),
+            'written': sum(1 for f in files if f['written']),
+            'skipped': sum(1 for f in files if not f['written'] and not f['error']),
+            'failed': sum(1 for f in files if f['error']),
+            'workers': self.workers,
+            'wall_seconds': wall,
+            'render_seconds_total': sum(render_times),
+            'write_seconds_total': sum(f['write_seconds'] for f in files),
+            'slowest_file': max(files, key=lambda f: f['render_seconds'] + f['write_seconds'])['path'] if files else None,
+        }
+
+    def close(self):
+        """Shut down the worker pool and drop this exporter's generators"""
+        self._executor.shutdown(wait=True)
+        prefix = os.path.join(self.output_dir, '')
+        with _generators_lock:
+            for key in [k for k in _generators if k[1].startswith(prefix)]:
+                del _generators[key]
+
+
+def export_batch(contests: List[Dict], output_dir: str, metadata: Dict = None, **options) -> Dict:
+    """One-shot batch export (see BatchExporter for options)"""
+    exporter = BatchExporter(output_dir, **options)
+    try:
+        return exporter.export(contests, metadata)
+    finally:
+        exporter.close()
+
+
+def format_summary(summary: Dict, per_file: bool = False) -> str:
+    """Format a batch summary for console output"""
+    lines = []
+    if per_file:
+        for f in summary['files']:
+            status = 'error: ' + f['error'] if f['error'] else ('written' if f['written'] else 'unchanged')
+            lines.append(f"  {os.path.basename(f['path']):<40} {f['contests']:>4} contests "
+                         f"render {f['render_seconds'] * 1000:7.2f} ms  write {f['write_seconds'] * 1000:7.2f} ms  {status}")
+    lines.append(f"{summary['documents']} files ({summary['contests']} contests) in "
+                 f"{summary['wall_seconds'] * 1000:.1f} ms with {summary['workers']} workers: "
+                 f"{summary['written']} written, {summary['skipped']} unchanged, {summary['failed']} failed "
+                 f"(render {summary['render_seconds_total'] * 1000:.1f} ms, "
+                 f"write {summary['write_seconds_total'] * 1000:.1f} ms total)")
+    return '\n'.join(lines)
@@ -0,0 +1,291 @@
+"""
+Benchmarks for NCAA Sports Tracker
+
+Measures the parse -> filter -> render -> write pipeline on synthetic slates
+of 10, 100, 1k and 10k contests, reporting throughput and peak memory.
+Results are written as JSON so runs can be compared against a stored
+baseline.
+
+Usage:
+    python benchmark.py run -o results.json
+    python benchmark.py run --fetch          # include fetch from a local mock server
+    python benchmark.py run --baseline benchmark_baseline.json
+    python benchmark.py compare benchmark_baseline.json results.json
+    python benchmark.py serializers
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Callable, Optional
+
+from mock_server import MockNCAAServer
+from ncaa_api import NCAAAPIClient
+from serializers import available_formats, build_document, get_serializer
+from synthetic import SyntheticSlate, make_contests, make_response
+from xml_generator import XMLGenerator
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_THRESHOLD = 0.25
+
+
+def measure(func: Callable[[], object], repeat: int = 3, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Time a callable and measure its peak traced memory
+
+    Timing runs without tracemalloc (best of repeat); memory is measured in
+    one extra traced run so tracing overhead does not skew the timings.
+
+    Args:
+        func: Callable to measure
+        repeat: Timed runs (best time is reported)
+        setup: Optional untimed callable run before every run
+
+    Returns:
+        Dict with 'seconds' and 'peak_bytes'
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def bench_pipeline(sizes: List[int], repeat: int = 3, include_fetch: bool = False) -> List[Dict]:
+    """
+    Benchmark each pipeline stage for every slate size
+
+    Stages:
+        fetch         NCAAAPIClient.fetch_contests against a local mock
+                      server (only with include_fetch)
+        parse         NCAAAPIClient.parse_contests on a raw response
+        is_top_25     NCAAAPIClient.is_top_25 over every contest
+        filter        Top 25 + conference filter (the GUIs' _apply_filters)
+        render_cold   XMLGenerator.generate_xml with an empty fragment cache
+        render_warm   XMLGenerator.generate_xml with every fragment cached
+        write         XMLGenerator.save_to_file of a changed document
+        write_skip    XMLGenerator.save_to_file of an unchanged document
+
+    Returns:
+        List of result dictionaries
+    """
+    client = NCAAAPIClient()
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            response = make_response(size)
+            contests = client.parse_contests(response)
+            metadata = {'Sport': 'Benchmark', 'TotalEvents': size}
+            generator = XMLGenerator()
+            xml_string = generator.generate_xml(contests, metadata)
+            path = os.path.join(tmp_dir, f'bench_{size}.xml')
+
+            stages = {}
+            if include_fetch:
+                slate = SyntheticSlate(count=size, sports={'WBB': 1.0}, tick_seconds=0)
+                with MockNCAAServer(slate) as server:
+                    fetch_client = NCAAAPIClient(base_url=server.url)
+                    stages['fetch'] = measure(
+                        lambda: fetch_client.fetch_contests('WBB', 1, 2025, '01/07/2026'), repeat)
+
+            stages.update({
+                'parse': measure(lambda: client.parse_contests(response), repeat),
+                'is_top_25': measure(lambda: [client.is_top_25(c) for c in contests], repeat),
+                'filter': measure(lambda: client.filter_contests(contests, top25_only=True, conference='SEC'),
+                                  repeat),
+                'render_cold': measure(lambda: generator.generate_xml(contests, metadata), repeat,
+                                       setup=generator.clear_cache),
+                'render_warm': measure(lambda: generator.generate_xml(contests, metadata), repeat),
+                'write': measure(lambda: generator.save_to_file(xml_string, path, force=True), repeat),
+                'write_skip': measure(lambda: generator.save_to_file(xml_string, path), repeat),
+            })
+
+            for stage, result in stages.items():
+                results.append({
+                    'stage': stage,
+                    'contests': size,
+                    'seconds': result['seconds'],
+                    'contests_per_second': size / result['seconds'] if result['seconds'] else None,
+                    'peak_bytes': result['peak_bytes'],
+                })
+    return results
+
+
+def run_suite(sizes: List[int], repeat: int = 3, include_fetch: bool = False) -> Dict:
+    """Run the pipeline benchmarks and wrap them with run metadata"""
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': repeat,
+            'include_fetch': include_fetch,
+        },
+        'results': bench_pipeline(sizes, repeat, include_fetch),
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """
+    Compare two benchmark runs
+
+    Args:
+        baseline: Stored run (as written by run_suite)
+        current: New run
+        threshold: Relative slowdown (or memory growth) that counts as a regression
+
+    Returns:
+        One row per (stage, contests) present in both runs
+    """
+    base_index = {(r['stage'], r['contests']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        base = base_index.get((r['stage'], r['contests']))
+        if not base:
+            continue
+        time_ratio = r['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        memory_ratio = r['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1.0
+        rows.append({
+            'stage': r['stage'],
+            'contests': r['contests'],
+            'baseline_seconds': base['seconds'],
+            'seconds': r['seconds'],
+            'time_ratio': time_ratio,
+            'memory_ratio': memory_ratio,
+            'regression': time_ratio > 1 + threshold or memory_ratio > 1 + threshold,
+        })
+    return rows
+
+
+def print_results(results: List[Dict]):
+    """Print pipeline results as a table"""
+    print(f"{'stage':<13}{'contests':>9}{'ms':>12}{'contests/s':>14}{'peak KiB':>11}")
+    for r in results:
+        rate = f"{r['contests_per_second']:,.0f}" if r['contests_per_second'] else '-'
+        print(f"{r['stage']:<13}{r['contests']:>9}{r['seconds'] * 1000:>12.3f}{rate:>14}"
+              f"{r['peak_bytes'] / 1024:>11.1f}")
+
+
+def print_comparison(rows: List[Dict]):
+    """Print a baseline comparison table"""
+    print(f"{'stage':<13}{'contests':>9}{'base ms':>11}{'ms':>11}{'time':>8}{'mem':>8}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['stage']:<13}{row['contests']:>9}{row['baseline_seconds'] * 1000:>11.3f}"
+              f"{row['seconds'] * 1000:>11.3f}{row['time_ratio']:>7.2f}x{row['memory_ratio']:>7.2f}x{flag}")
+
+
+def load_results(file_path: str) -> Dict:
+    """Load a results JSON file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def bench_serializers(sizes: List[int], repeat: int = 3) -> List[Dict]:
+    """
+    Time each serializer and measure its output size
+
+    Args:
+        sizes: Contest counts to benchmark
+        repeat: Runs per measurement (best time is reported)
+
+    Returns:
+        List of result dictionaries
+    """
+    results = []
+    for size in sizes:
+        document = build_document(make_contests(size), {'Sport': 'Benchmark', 'TotalEvents': size})
+        for fmt in available_formats():
+            serializer = get_serializer(fmt)
+            best = float('inf')
+            for _ in range(repeat):
+                if fmt == 'xml':
+                    # Measure a full render, not fragment cache hits
+                    serializer.generator.clear_cache()
+                start = time.perf_counter()
+                data = serializer.serialize(document)
+                best = min(best, time.perf_counter() - start)
+            size_bytes = len(data) if isinstance(data, bytes) else len(data.encode('utf-8'))
+            results.append({'format': fmt, 'contests': size, 'seconds': best, 'bytes': size_bytes})
+    return results
+
+
+def print_serializer_results(results: List[Dict]):
+    """Print serializer results as a table"""
+    print(f"{'format':<10}{'contests':>10}{'ms':>12}{'bytes':>14}{'bytes/contest':>16}")
+    for r in results:
+        print(f"{r['format']:<10}{r['contests']:>10}{r['seconds'] * 1000:>12.2f}"
+              f"{r['bytes']:>14}{r['bytes'] / max(r['contests'], 1):>16.1f}")
+
+
+def main(argv=None) -> int:
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="NCAA Sports Tracker benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Benchmark parse, filter, render and write")
+    run.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--fetch', action='store_true',
+                     help="Also time fetch_contests against a local mock server")
+    run.add_argument('-o', '--output', default=None, help="Write results JSON here")
+    run.add_argument('--baseline', default=None, help="Compare against this results JSON")
+    run.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                     help=f"Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})")
+
+    cmp_parser = subparsers.add_parser('compare', help="Compare two results files")
+    cmp_parser.add_argument('baseline')
+    cmp_parser.add_argument('current')
+    cmp_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+
+    ser = subparsers.add_parser('serializers', help="Serialize time and output size per format")
+    ser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    ser.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serializers':
+        print_serializer_results(bench_serializers(args.sizes, args.repeat))
+        return 0
+
+    if args.command == 'compare':
+        rows = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        print_comparison(rows)
+        return 1 if any(row['regression'] for row in rows) else 0
+
+    suite = run_suite(args.sizes, args.repeat, args.fetch)
+    print_results(suite['results'])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(suite, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        print()
+        rows = compare(load_results(args.baseline), suite, args.threshold)
+        print_comparison(rows)
+        return 1 if any(row['regression'] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Change detection between successive contest snapshots"""
+from typing import List, Dict, Optional
+
+CHANGE_TYPES = ('added', 'removed', 'score', 'status', 'rank')
+
+
+def _scores(contest: Dict) -> Dict:
+    return {'home': contest.get('home_team', {}).get('score', ''),
+            'away': contest.get('away_team', {}).get('score', '')}
+
+
+def _ranks(contest: Dict) -> Dict:
+    return {'home': contest.get('home_team', {}).get('rank', ''),
+            'away': contest.get('away_team', {}).get('rank', '')}
+
+
+def _event(change_type: str, contest: Dict, old=None, new=None) -> Dict:
+    return {
+        'type': change_type,
+        'contest_id': str(contest.get('id', '')),
+        'sport': contest.get('sport', ''),
+        'old': old,
+        'new': new,
+        'contest': contest,
+    }
+
+
+def diff_contests(previous: Optional[List[Dict]], current: List[Dict]) -> List[Dict]:
+    """
+    Compare two parse_contests results
+
+    Args:
+        previous: Earlier snapshot (None for the first poll: nothing is reported)
+        current: Latest snapshot
+
+    Returns:
+        Change events, each with 'type' (added, removed, score, status or
+        rank), 'contest_id', 'sport', 'old', 'new' and the current 'contest'
+    """
+    if previous is None:
+        return []
+
+    before = {str(c.get('id', '')): c for c in previous}
+    events = []
+    seen = set()
+
+    for contest in current:
+        contest_id = str(contest.get('id', ''))
+        seen.add(contest_id)
+        old = before.get(contest_id)
+        if old is None:
+            events.append(_event('added', contest))
+            continue
+        if old == contest:
+            continue
+
+        old_scores, new_scores = _scores(old), _scores(contest)
+        if old_scores != new_scores:
+            events.append(_event('score', contest, old_scores, new_scores))
+        if old.get('status') != contest.get('status'):
+            events.append(_event('status', contest, old.get('status'), contest.get('status')))
+        old_ranks, new_ranks = _ranks(old), _ranks(contest)
+        if old_ranks != new_ranks:
+            events.append(_event('rank', contest, old_ranks, new_ranks))
+
+    for contest_id, contest in before.items():
+        if contest_id not in seen:
+            events.append(_event('removed', contest))
+
+    return events
+
+
+class ContestDiffer:
+    """Keeps the previous snapshot per query key and reports changes"""
+
+    def __init__(self):
+        self._snapshots: Dict[tuple, List[Dict]] = {}
+
+    def update(self, key: tuple, contests: List[Dict]) -> List[Dict]:
+        """Store a new snapshot for key and return its changes"""
+        events = diff_contests(self._snapshots.get(key), contests)
+        self._snapshots[key] = contests
+        return events
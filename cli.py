@@ -0,0 +1,638 @@
+"""
+Command-line interface for NCAA Sports Tracker
+
+Usage:
+    python cli.py export --sport WBB --date 01/07/2026 --format json -o scores.json
+    python cli.py batch --sport MBB --split contest --output-dir bugs/
+    python cli.py watch --sport WBB --top25 -o scores.xml --record gameday.ndjson.gz
+    python cli.py watch --team Duke --team UConn --sports WBB MBB WVB -o teams.xml
+    python cli.py watch --sport WBB -o scores.xml --shm
+    python cli.py render --shm --top25 -o top25.json
+    python cli.py shard --workers 4 --sport WBB MBB --division 1 2 3 --output-dir out/ --db contests.db
+    python cli.py replay gameday.ndjson.gz --speed 10 -o replay.xml
+    python cli.py sync --sport WBB MBB --from 01/01/2026 --to 01/31/2026 --db contests.db
+    python cli.py query --db contests.db --team Duke --from 01/01/2026 --to 01/31/2026
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from auto_update import AutoUpdateJob
+from batch_export import SPLIT_MODES, export_batch, format_summary
+from changes import ContestDiffer
+from config_manager import ConfigManager
+from contest_db import DEFAULT_DB_PATH, RANKED_MODES, ContestDatabase, iso_day
+from hedging import configure_policy
+from history import DEFAULT_CAPACITY, ScoreHistory
+from http_api import SnapshotStore, start_api_server
+from push import EventHub
+from push_sink import FRAMINGS, PushSinkGroup
+from watchlist import WatchlistJob
+from latency import format_summary as format_latency, merge_summaries
+from metrics import start_metrics_server
+from ncaa_api import NCAAAPIClient
+from sharding import DEFAULT_LEASE_PATH, ShardPool, query_key
+from shared_snapshot import DEFAULT_SEGMENT, DEFAULT_SIZE, SnapshotPublisher, SnapshotReader
+from profiling import PROFILE_MODES, configure_profiler
+from serializers import SERIALIZERS, available_formats, format_for_path, save_output, serialize, write_output
+from templates import load_template
+from xml_generator import XMLGenerator
+
+
+def add_fetch_arguments(parser: argparse.ArgumentParser):
+    """Add the sport/division/date/filter options shared by subcommands"""
+    parser.add_argument('--sport', default='WBB',
+                        help="Sport code, e.g. WBB, MBB, MFB (default: WBB)")
+    parser.add_argument('--division', type=int, default=1, choices=[1, 2, 3],
+                        help="Division number (default: 1)")
+    parser.add_argument('--season-year', type=int, default=2025, help="Season year (default: 2025)")
+    parser.add_argument('--date', default=datetime.now().strftime("%m/%d/%Y"),
+                        help="Contest date MM/DD/YYYY (default: today)")
+    parser.add_argument('--week', type=int, default=None, help="Week number (optional)")
+    parser.add_argument('--top25', action='store_true', help="Only contests with a Top 25 team")
+    parser.add_argument('--conference', default=None, help="Conference filter, e.g. SEC")
+    parser.add_argument('--ids', nargs='*', default=None, help="Only these contest ids")
+
+
+def fetch_selection(client: NCAAAPIClient, args) -> list:
+    """Fetch, parse and filter contests according to the parsed arguments"""
+    response = client.fetch_contests(
+        sport_code=args.sport,
+        division=args.division,
+        season_year=args.season_year,
+        contest_date=args.date,
+        week=args.week
+    )
+    contests = client.parse_contests(response)
+    contests = client.filter_contests(contests, top25_only=args.top25, conference=args.conference)
+    if args.ids:
+        wanted = set(args.ids)
+        contests = [c for c in contests if str(c.get('id')) in wanted]
+    return contests
+
+
+def build_metadata(args, contests: list) -> dict:
+    """Metadata block matching what the GUIs write"""
+    sport_names = {code: name for name, code in NCAAAPIClient.SPORT_CODES.items()}
+    division_names = {number: name for name, number in NCAAAPIClient.DIVISIONS.items()}
+    return {
+        'Sport': sport_names.get(args.sport, args.sport),
+        'Division': division_names.get(args.division, args.division),
+        'Date': args.date,
+        'TotalEvents': len(contests)
+    }
+
+
+def cmd_export(args) -> int:
+    """Fetch contests once and write them in the requested format"""
+    fmt = args.format or (format_for_path(args.output) if args.output else 'xml')
+    client = NCAAAPIClient()
+    contests = fetch_selection(client, args)
+    if args.template:
+        fmt = 'template'
+        generator = XMLGenerator(template=load_template(args.template))
+        data = generator.generate_xml(contests, build_metadata(args, contests))
+    else:
+        data = serialize(contests, build_metadata(args, contests), fmt)
+
+    if not args.output:
+        if isinstance(data, bytes):
+            sys.stdout.buffer.write(data)
+        else:
+            sys.stdout.write(data)
+        return 0
+
+    if not save_output(data, args.output):
+        return 1
+    print(f"Wrote {len(contests)} contests to {args.output} ({fmt})", file=sys.stderr)
+    return 0
+
+
+def cmd_batch(args) -> int:
+    """Fetch contests once and write one file per contest or per sport"""
+    template_spec = None
+    if args.template:
+        with open(args.template, 'r', encoding='utf-8') as f:
+            template_spec = json.load(f)
+
+    client = NCAAAPIClient()
+    contests = fetch_selection(client, args)
+    summary = export_batch(contests, args.output_dir, build_metadata(args, contests),
+                           split_by=args.split, fmt=args.format, template_spec=template_spec,
+                           workers=args.workers, use_processes=args.processes)
+    print(format_summary(summary, per_file=args.verbose))
+    return 1 if summary['failed'] else 0
+
+
+def create_job(client: NCAAAPIClient, args, output_path: str) -> AutoUpdateJob:
+    """Auto-update job for the query described by the parsed arguments"""
+    history = ScoreHistory(args.history_size) if getattr(args, 'history', False) else None
+    if getattr(args, 'team', None):
+        sports = args.sports or [args.sport]
+        metadata = build_metadata(args, [])
+        metadata['Sport'] = ', '.join(sports)
+        metadata['Teams'] = ', '.join(args.team)
+        return WatchlistJob(
+            client=client,
+            teams=args.team,
+            sports=sports,
+            contest_date=args.date,
+            output_path=output_path,
+            division=args.division,
+            season_year=args.season_year,
+            week=args.week,
+            metadata=metadata,
+            top25_only=args.top25,
+            conference=args.conference,
+            ids=args.ids,
+            history=history
+        )
+    return AutoUpdateJob(
+        client=client,
+        sport_code=args.sport,
+        division=args.division,
+        contest_date=args.date,
+        output_path=output_path,
+        season_year=args.season_year,
+        week=args.week,
+        metadata=build_metadata(args, []),
+        top25_only=args.top25,
+        conference=args.conference,
+        ids=args.ids,
+        history=history
+    )
+
+
+def format_events(events: list) -> str:
+    """One line per change event"""
+    lines = []
+    for event in events:
+        contest = event['contest']
+        matchup = f"{contest.get('away_team', {}).get('name', '')} @ {contest.get('home_team', {}).get('name', '')}"
+        if event['type'] == 'score':
+            detail = f"{event['new']['away']}-{event['new']['home']}"
+        elif event['type'] in ('status', 'rank'):
+            detail = f"{event['old']} -> {event['new']}"
+        else:
+            detail = ''
+        lines.append(f"  {event['type']:<8}{event['contest_id']:<12}{matchup} {detail}".rstrip())
+    return '\n'.join(lines)
+
+
+def cmd_watch(args) -> int:
+    """Poll one query headlessly and keep an output file current"""
+    if args.profile:
+        configure_profiler(args.profile, args.profile_dir, args.profile_every)
+    hedge = configure_policy(args.hedge_percentile, args.hedge_ratio) if args.hedge else None
+    database = ContestDatabase(args.db) if args.db else None
+    client = NCAAAPIClient(record_path=args.record, hedge=hedge, database=database)
+    job = create_job(client, args, args.output)
+    if args.push:
+        job.push_sink = PushSinkGroup(args.push, args.push_framing)
+    metrics_server = start_metrics_server(args.metrics_port) if args.metrics_port else None
+    api_store = SnapshotStore() if args.api_port else None
+    event_hub = EventHub() if args.api_port else None
+    api_server = (start_api_server(api_store, args.api_port, args.api_host, event_hub, database)
+                  if args.api_port else None)
+    job_name = args.name or os.path.splitext(os.path.basename(args.output))[0]
+    try:
+        publisher = SnapshotPublisher(args.shm, args.shm_size) if args.shm else None
+    except (FileExistsError, ValueError) as e:
+        print(f"Shared snapshot disabled: {e}", file=sys.stderr)
+        publisher = None
+
+    config = ConfigManager(args.config) if args.config else None
+    settings = {'interval': args.interval or (config.get('update_interval', 30) if config else 30.0)}
+
+    def apply_config(changed):
+        """Pick up external edits to the config file between cycles"""
+        if 'update_interval' in changed:
+            settings['interval'] = float(config.get('update_interval', settings['interval']))
+            print(f"Config: interval now {settings['interval']}s", file=sys.stderr)
+        if 'default_sport' in changed or 'default_division' in changed:
+            args.sport = config.get('default_sport', args.sport)
+            args.division = config.get('default_division', args.division)
+            job.sport_code, job.division = args.sport, args.division
+            job.metadata = build_metadata(args, [])
+            print(f"Config: now watching {args.sport} division {args.division}", file=sys.stderr)
+
+    def current_interval():
+        if config:
+            config.reload_if_changed()
+        return settings['interval']
+
+    if config:
+        config.on_change(apply_config)
+
+    def on_cycle(result):
+        if api_server:
+            api_store.publish_job(job_name, job)
+            event_hub.publish(result['events'])
+        if publisher and not result['stale']:
+            try:
+                publisher.publish_job(job)
+            except ValueError as e:
+                print(f"Shared snapshot not updated: {e}", file=sys.stderr)
+        state = 'written' if result['written'] else ('unchanged' if result['ok'] else 'FAILED')
+        if result['stale']:
+            age = result['stale']['age']
+            state = 'upstream error, kept last output' + (f" ({age:.0f}s old)" if age is not None else '')
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {result['selected']} contests, "
+              f"{len(result['events'])} changes, {state} ({result['total_seconds'] * 1000:.0f} ms)")
+        if args.verbose and result['events']:
+            print(format_events(result['events']))
+
+    stop_event = threading.Event()
+    watching = f"{', '.join(args.team)} in {', '.join(job.sports)}" if args.team else args.sport
+    print(f"Watching {watching} every {settings['interval']}s -> {args.output} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        job.run_forever(current_interval, stop_event, on_cycle)
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        client.close()
+        if metrics_server:
+            metrics_server.stop()
+        if api_server:
+            api_server.stop()
+        if job.push_sink:
+            job.push_sink.close()
+        if publisher:
+            publisher.close()
+    print("\nScore change latency (first fetch to written output):")
+    print(format_latency(job.latency.summary()))
+    if hedge:
+        stats = hedge.summary()
+        print(f"Hedged {stats['sent']} of {stats['requests']} requests ({stats['hedge_rate']:.1%}), "
+              f"{stats['won']} hedges answered first, {stats['skipped']} skipped over budget")
+    if args.record:
+        print(f"Recorded {client.recorder.count} responses to {args.record}", file=sys.stderr)
+    if database:
+        database.close()
+    return 0
+
+
+def cmd_sync(args) -> int:
+    """Fetch every day in a date range into the local contest database"""
+    first, last = iso_day(args.date_from), iso_day(args.date_to or args.date_from)
+    if not first or not last:
+        print("Dates must be MM/DD/YYYY or YYYY-MM-DD", file=sys.stderr)
+        return 1
+    day, end = datetime.strptime(first, '%Y-%m-%d'), datetime.strptime(last, '%Y-%m-%d')
+    with ContestDatabase(args.db) as database:
+        client = NCAAAPIClient(database=database)
+        failed = 0
+        while day <= end:
+            for sport in args.sport:
+                response = client.fetch_contests(sport, args.division, args.season_year, day.strftime('%m/%d/%Y'))
+                if client.is_stale(response):
+                    failed += 1
+            day += timedelta(days=1)
+        client.close()
+        print(f"{database.count()} contests in {args.db}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def format_contest_rows(contests: list) -> str:
+    """One line per contest: date, status, matchup and score"""
+    lines = []
+    for contest in contests:
+        home, away = contest.get('home_team', {}), contest.get('away_team', {})
+
+        def team(side):
+            rank = f"#{side['rank']} " if side.get('rank') else ''
+            return f"{rank}{side.get('name', '')}"
+
+        score = f"{away.get('score')}-{home.get('score')}" if home.get('score') or away.get('score') else ''
+        lines.append(f"{contest.get('date', ''):<12}{contest.get('status', ''):<3}{contest.get('sport', ''):<5}"
+                     f"{team(away)} @ {team(home)} {score}".rstrip())
+    return '\n'.join(lines)
+
+
+def cmd_query(args) -> int:
+    """Answer a query from the local contest database without upstream calls"""
+    if not os.path.exists(args.db):
+        print(f"No database at {args.db} (fill it with 'sync' or 'watch --db')", file=sys.stderr)
+        return 1
+    with ContestDatabase(args.db) as database:
+        started = time.perf_counter()
+        contests = database.query(team=args.team, conference=args.conference, date_from=args.date_from,
+                                  date_to=args.date_to, status=args.status, sport=args.sport,
+                                  ranked=args.ranked, max_rank=args.max_rank, limit=args.limit)
+        elapsed = time.perf_counter() - started
+
+    if args.format is None and not args.output:
+        if contests:
+            print(format_contest_rows(contests))
+        print(f"{len(contests)} contests ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+        return 0
+
+    fmt = args.format or format_for_path(args.output)
+    data = serialize(contests, {'TotalEvents': len(contests)}, fmt)
+    if not args.output:
+        if isinstance(data, bytes):
+            sys.stdout.buffer.write(data)
+        else:
+            sys.stdout.write(data)
+        return 0
+    if not save_output(data, args.output):
+        return 1
+    print(f"Wrote {len(contests)} contests to {args.output} ({fmt})", file=sys.stderr)
+    return 0
+
+
+def cmd_render(args) -> int:
+    """Keep an output file current from the snapshots a watch process publishes"""
+    try:
+        reader = SnapshotReader(args.shm)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"No snapshot segment '{args.shm}' ({e}); start 'watch --shm' first", file=sys.stderr)
+        return 1
+    client = NCAAAPIClient()
+    generator = XMLGenerator()
+    differ = ContestDiffer()
+    push_sink = PushSinkGroup(args.push, args.push_framing) if args.push else None
+    seq = 0
+    print(f"Rendering {args.shm} -> {args.output} (Ctrl+C to stop)", file=sys.stderr)
+    try:
+        while True:
+            snapshot = reader.wait(seq, timeout=args.timeout)
+            if snapshot is None:
+                if args.once:
+                    print(f"Nothing published to {args.shm} within {args.timeout}s", file=sys.stderr)
+                    return 1
+                continue
+            seq = snapshot.seq
+            output = client.filter_contests(snapshot.contests, args.top25, args.conference)
+            if args.ids:
+                output = [c for c in output if str(c.get('id')) in args.ids]
+            events = differ.update((args.shm,), output)
+            if push_sink and events:
+                push_sink.send_changes(events, output)
+            metadata = dict(snapshot.metadata, TotalEvents=len(output),
+                            LastUpdated=datetime.fromtimestamp(snapshot.published_at).strftime('%Y-%m-%d %H:%M:%S'))
+            ok = write_output(output, metadata, args.output, generator)
+            if args.verbose:
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] snapshot {seq}: {len(output)} contests, "
+                      f"{len(events)} changes, {'written' if ok else 'FAILED'}")
+            if args.once:
+                return 0 if ok else 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        reader.close()
+        client.close()
+        if push_sink:
+            push_sink.close()
+
+
+def cmd_shard(args) -> int:
+    """Poll many queries with worker processes that split them through leases"""
+    keys = [query_key(sport, division, args.date) for sport in args.sport for division in args.division]
+    pool = ShardPool(keys, args.workers, args.leases, args.output_dir,
+                     extension=SERIALIZERS[args.format].extension,
+                     db_path=args.db, interval=args.interval, season_year=args.season_year)
+    print(f"Polling {len(keys)} queries with {args.workers} workers every {args.interval}s "
+          f"-> {args.output_dir} (Ctrl+C to stop)", file=sys.stderr)
+    pool.start()
+    try:
+        while True:
+            time.sleep(args.interval)
+            owners = {}
+            for key, lease in pool.assignments().items():
+                owners.setdefault(lease['owner'] or 'unowned', []).append(key)
+            shares = ', '.join(f"{owner}: {len(owned)}" for owner, owned in sorted(owners.items()))
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {pool.alive()}/{args.workers} workers alive; {shares}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+    return 0
+
+
+def cmd_replay(args) -> int:
+    """Rerun a recorded capture through the polling, diffing and write pipeline"""
+    client = NCAAAPIClient(replay_path=args.capture, replay_speed=args.speed)
+    replayer = client.replayer
+    if not replayer.captures:
+        print(f"No captures in {args.capture}", file=sys.stderr)
+        return 1
+
+    queries = replayer.keys()
+    root, ext = os.path.splitext(args.output)
+    jobs = {}
+    totals = {'ticks': 0, 'contests': 0, 'written': 0, 'unchanged': 0, 'failed': 0}
+    changes = {}
+    started = time.perf_counter()
+
+    while True:
+        variables = replayer.next_variables()
+        if variables is None:
+            break
+        key = json.dumps(variables, sort_keys=True)
+        job = jobs.get(key)
+        if job is None:
+            output_path = args.output
+            if len(queries) > 1:
+                output_path = f"{root}_{variables['sportCode']}_d{variables['division']}_{len(jobs)}{ext}"
+            job = jobs[key] = AutoUpdateJob(
+                client=client,
+                sport_code=variables['sportCode'],
+                division=variables['division'],
+                contest_date=variables['contestDate'],
+                output_path=output_path,
+                season_year=variables['seasonYear'],
+                week=variables['week'],
+                metadata={'Sport': variables['sportCode'], 'Division': variables['division'],
+                          'Date': variables['contestDate']},
+                top25_only=args.top25,
+                conference=args.conference,
+                ids=args.ids
+            )
+
+        result = job.run_once()
+        totals['ticks'] += 1
+        totals['contests'] += result['contests']
+        if not result['ok']:
+            totals['failed'] += 1
+        elif result['written']:
+            totals['written'] += 1
+        else:
+            totals['unchanged'] += 1
+        for event in result['events']:
+            changes[event['type']] = changes.get(event['type'], 0) + 1
+        if args.verbose and result['events']:
+            print(format_events(result['events']))
+
+    elapsed = time.perf_counter() - started
+    rate = totals['contests'] / elapsed if elapsed else 0.0
+    print(f"Replayed {totals['ticks']} responses for {len(jobs)} queries in {elapsed:.2f}s "
+          f"({rate:,.0f} contests/s)")
+    print("Changes: " + (', '.join(f"{count} {kind}" for kind, count in sorted(changes.items())) or 'none'))
+    print(f"Writes: {totals['written']} written, {totals['unchanged']} unchanged, {totals['failed']} failed")
+    print("\nScore change latency (first fetch to written output):")
+    print(format_latency(merge_summaries(job.latency for job in jobs.values())))
+    return 1 if totals['failed'] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser"""
+    parser = argparse.ArgumentParser(description="NCAA Sports Tracker command-line interface")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help="Fetch contests and write them to a file or stdout")
+    add_fetch_arguments(export)
+    export.add_argument('--format', choices=available_formats(), default=None,
+                        help="Output format (default: from --output extension, else xml)")
+    export.add_argument('--template', default=None,
+                        help="JSON output template for graphics systems (overrides --format)")
+    export.add_argument('-o', '--output', default=None, help="Output file (default: stdout)")
+    export.set_defaults(func=cmd_export)
+
+    batch = subparsers.add_parser('batch', help="Write one file per contest or per sport using a worker pool")
+    add_fetch_arguments(batch)
+    batch.add_argument('--split', choices=SPLIT_MODES, default='contest', help="How to split files (default: contest)")
+    batch.add_argument('--format', choices=available_formats(), default='xml', help="Output format (default: xml)")
+    batch.add_argument('--template', default=None, help="JSON output template (overrides --format)")
+    batch.add_argument('--output-dir', required=True, help="Directory for the output files")
+    batch.add_argument('--workers', type=int, default=None, help="Worker pool size (default: based on CPU count)")
+    batch.add_argument('--processes', action='store_true', help="Use worker processes instead of threads")
+    batch.add_argument('-v', '--verbose', action='store_true', help="Print per-file timings")
+    batch.set_defaults(func=cmd_batch)
+
+    watch = subparsers.add_parser('watch', help="Poll headlessly and keep an output file current")
+    add_fetch_arguments(watch)
+    watch.add_argument('-o', '--output', required=True, help="Output file (extension selects the format)")
+    watch.add_argument('--team', action='append', default=None,
+                       help="Follow this team across --sports instead of filtering one sport (repeatable)")
+    watch.add_argument('--sports', nargs='+', default=None,
+                       help="Sport codes searched for --team games (default: --sport)")
+    watch.add_argument('--history', action='store_true',
+                       help="Write each contest's score timeline (<History>) with the output")
+    watch.add_argument('--history-size', type=int, default=DEFAULT_CAPACITY,
+                       help=f"Timeline points kept per contest (default: {DEFAULT_CAPACITY})")
+    watch.add_argument('--interval', type=float, default=None,
+                       help="Seconds between polls (default: update_interval from --config, else 30)")
+    watch.add_argument('--config', default=None,
+                       help="Config file watched for edits to update_interval, default_sport "
+                            "and default_division while running")
+    watch.add_argument('--hedge', action='store_true',
+                       help="Send a duplicate request when one is slower than usual")
+    watch.add_argument('--hedge-percentile', type=float, default=None,
+                       help="Latency percentile after which a request is hedged (default: 95)")
+    watch.add_argument('--hedge-ratio', type=float, default=None,
+                       help="Maximum extra requests as a share of all requests (default: 0.1)")
+    watch.add_argument('--db', default=None, help="Also store every fetch in this contest database")
+    watch.add_argument('--shm', nargs='?', const=DEFAULT_SEGMENT, default=None, metavar='NAME',
+                       help=f"Publish every poll to this shared memory segment for 'render' processes "
+                            f"(default name: {DEFAULT_SEGMENT})")
+    watch.add_argument('--shm-size', type=int, default=DEFAULT_SIZE,
+                       help=f"Shared memory segment size in bytes (default: {DEFAULT_SIZE})")
+    watch.add_argument('--record', default=None, help="Append every raw response to this capture file")
+    watch.add_argument('--metrics-port', type=int, default=None,
+                       help="Serve Prometheus-style metrics on this port at /metrics")
+    watch.add_argument('--api-port', type=int, default=None,
+                       help="Serve the latest contests, output and an /events stream over HTTP on this port")
+    watch.add_argument('--api-host', default='127.0.0.1',
+                       help="Address for --api-port (use 0.0.0.0 for other machines)")
+    watch.add_argument('--push', action='append', default=None, metavar='ENDPOINT',
+                       help="Send changed contests to tcp://host:port or udp://group:port (repeatable)")
+    watch.add_argument('--push-framing', choices=FRAMINGS, default='line',
+                       help="TCP frame delimiting: newline or 4-byte length prefix (default: line)")
+    watch.add_argument('--name', default=None, help="Job name in API URLs (default: output file name)")
+    watch.add_argument('--profile', default=None,
+                       help=f"Profile poll cycles: comma-separated {', '.join(PROFILE_MODES)} or all "
+                            f"(default: NCAA_PROFILE environment variable)")
+    watch.add_argument('--profile-dir', default=None, help="Directory for profiling reports (default: profiles)")
+    watch.add_argument('--profile-every', type=int, default=None, help="Profile every Nth cycle (default: 1)")
+    watch.add_argument('-v', '--verbose', action='store_true', help="Print every change event")
+    watch.set_defaults(func=cmd_watch)
+
+    render = subparsers.add_parser('render', help="Render the snapshots a 'watch --shm' process publishes")
+    render.add_argument('--shm', nargs='?', const=DEFAULT_SEGMENT, default=DEFAULT_SEGMENT, metavar='NAME',
+                        help=f"Shared memory segment to read (default: {DEFAULT_SEGMENT})")
+    render.add_argument('-o', '--output', required=True, help="Output file (extension selects the format)")
+    render.add_argument('--top25', action='store_true', help="Only contests with a Top 25 team")
+    render.add_argument('--conference', default=None, help="Conference filter, e.g. SEC")
+    render.add_argument('--ids', nargs='*', default=None, help="Only these contest ids")
+    render.add_argument('--push', action='append', default=None, metavar='ENDPOINT',
+                        help="Send changed contests to tcp://host:port or udp://group:port (repeatable)")
+    render.add_argument('--push-framing', choices=FRAMINGS, default='line',
+                        help="TCP frame delimiting: newline or 4-byte length prefix (default: line)")
+    render.add_argument('--timeout', type=float, default=5.0,
+                        help="Seconds to wait for a snapshot with --once (default: 5)")
+    render.add_argument('--once', action='store_true', help="Render the current snapshot and exit")
+    render.add_argument('-v', '--verbose', action='store_true', help="Print every rendered snapshot")
+    render.set_defaults(func=cmd_render)
+
+    shard = subparsers.add_parser('shard', help="Poll many queries with worker processes sharing leases")
+    shard.add_argument('--sport', nargs='+', default=['WBB'], help="Sport codes (default: WBB)")
+    shard.add_argument('--division', type=int, nargs='+', default=[1], choices=[1, 2, 3],
+                       help="Division numbers (default: 1)")
+    shard.add_argument('--season-year', type=int, default=2025, help="Season year (default: 2025)")
+    shard.add_argument('--date', default=datetime.now().strftime("%m/%d/%Y"),
+                       help="Contest date MM/DD/YYYY (default: today)")
+    shard.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help="Worker processes (default: CPU count)")
+    shard.add_argument('--output-dir', required=True, help="Directory for one output file per query")
+    shard.add_argument('--format', choices=available_formats(), default='xml', help="Output format (default: xml)")
+    shard.add_argument('--leases', default=DEFAULT_LEASE_PATH,
+                       help=f"Lease database shared by the workers (default: {DEFAULT_LEASE_PATH})")
+    shard.add_argument('--db', default=None, help="Also store every fetch in this shared contest database")
+    shard.add_argument('--interval', type=float, default=30.0, help="Seconds between polls (default: 30)")
+    shard.set_defaults(func=cmd_shard)
+
+    replay = subparsers.add_parser('replay', help="Rerun a recorded capture through the update pipeline")
+    replay.add_argument('capture', help="Capture file written by watch --record")
+    replay.add_argument('-o', '--output', required=True,
+                        help="Output file (suffixed per query when the capture has several)")
+    replay.add_argument('--speed', type=float, default=None,
+                        help="Replay at N times real time (default: as fast as possible)")
+    replay.add_argument('--top25', action='store_true', help="Only contests with a Top 25 team")
+    replay.add_argument('--conference', default=None, help="Conference filter, e.g. SEC")
+    replay.add_argument('--ids', nargs='*', default=None, help="Only these contest ids")
+    replay.add_argument('-v', '--verbose', action='store_true', help="Print every change event")
+    replay.set_defaults(func=cmd_replay)
+
+    sync = subparsers.add_parser('sync', help="Fetch a date range into the local contest database")
+    sync.add_argument('--sport', nargs='+', default=['WBB'], help="Sport codes (default: WBB)")
+    sync.add_argument('--division', type=int, default=1, choices=[1, 2, 3], help="Division number (default: 1)")
+    sync.add_argument('--season-year', type=int, default=2025, help="Season year (default: 2025)")
+    sync.add_argument('--from', dest='date_from', default=datetime.now().strftime("%m/%d/%Y"),
+                      help="First date MM/DD/YYYY (default: today)")
+    sync.add_argument('--to', dest='date_to', default=None, help="Last date MM/DD/YYYY (default: --from)")
+    sync.add_argument('--db', default=DEFAULT_DB_PATH, help=f"Database file (default: {DEFAULT_DB_PATH})")
+    sync.set_defaults(func=cmd_sync)
+
+    query = subparsers.add_parser('query', help="Query the local contest database (no upstream calls)")
+    query.add_argument('--db', default=DEFAULT_DB_PATH, help=f"Database file (default: {DEFAULT_DB_PATH})")
+    query.add_argument('--team', default=None, help="Full or short team name")
+    query.add_argument('--conference', default=None, help="Conference of either team, e.g. 'Big Ten'")
+    query.add_argument('--from', dest='date_from', default=None, help="First date MM/DD/YYYY")
+    query.add_argument('--to', dest='date_to', default=None, help="Last date MM/DD/YYYY")
+    query.add_argument('--status', choices=['P', 'I', 'F'], default=None, help="Contest state")
+    query.add_argument('--sport', default=None, help="Sport code, e.g. WBB")
+    query.add_argument('--ranked', choices=RANKED_MODES, default=None,
+                       help="Ranked team on either side, or ranked matchups only")
+    query.add_argument('--max-rank', type=int, default=25, help="Ranks up to this count as ranked (default: 25)")
+    query.add_argument('--limit', type=int, default=None, help="Maximum number of contests")
+    query.add_argument('--format', choices=available_formats(), default=None,
+                       help="Output format (default: a table, or from --output extension)")
+    query.add_argument('-o', '--output', default=None, help="Output file (default: stdout)")
+    query.set_defaults(func=cmd_query)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """Main entry point"""
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,71 @@
 """Configuration manager for NCAA Sports Tracker"""
+import atexit
 import json
 import os
+import threading
+import time
+import weakref
 from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from file_utils import atomic_write
+
+# Open managers, flushed once at exit. Weak references, so a manager that is
+# dropped without close() (one per Streamlit session, say) is not kept alive
+_managers = weakref.WeakSet()
+
+
+def _flush_all():
+    """Write pending changes of every open manager"""
+    for manager in list(_managers):
+        manager.flush()
+
+
+atexit.register(_flush_all)
 
 
 class ConfigManager:
-    """Manages application configuration and persistent settings"""
+    """Manages application configuration and persistent settings
+
+    Settings live in memory. set() marks them dirty and a background timer
+    flushes them atomically after flush_delay seconds, so bursts of changes
+    cost one write and never block the caller on disk. Edits made to the file
+    by someone else are detected by mtime/size and picked up on the next
+    get() or reload_if_changed().
+    """
 
-    def __init__(self, config_file='config.json'):
+    def __init__(self, config_file='config.json', flush_delay: float = 1.0, reload_interval: float = 1.0):
+        """
+        Args:
+            config_file: JSON settings file
+            flush_delay: Seconds to wait after the last set() before writing
+            reload_interval: Minimum seconds between external-edit checks in get()
+        """
         self.config_file = config_file
+        self.flush_delay = flush_delay
+        self.reload_interval = reload_interval
+
+        self._lock = threading.RLock()
+        self._dirty_keys = set()
+        self._timer: Optional[threading.Timer] = None
+        self._file_signature = None
+        self._last_check = time.monotonic()
+        self._listeners = []
+
         self.config = self._load_config()
+        _managers.add(self)
+
+    def _signature(self):
+        """(mtime_ns, size) of the config file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
 
     def _load_config(self):
         """Load configuration from file"""
+        self._file_signature = self._signature()
         if os.path.exists(self.config_file):
             try:
                 with open(self.config_file, 'r') as f:
@@ -29,22 +82,115 @@ class ConfigManager:
             "update_interval": 60,
             "default_sport": "WBB",
             "default_division": 1,
-            "default_season_year": 2025
+            "default_season_year": 2025,
+            "metrics_port": 0,
+            "api_port": 0,
+            "push_endpoints": [],
+            "hedge_requests": False,
+            "prefetch": True,
+            "database": "",
+            "score_history": False
         }
 
+    @property
+    def dirty(self) -> bool:
+        """True while changes are waiting to be flushed"""
+        return bool(self._dirty_keys)
+
     def save_config(self):
-        """Save configuration to file"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
-        except Exception as e:
-            print(f"Error saving config: {e}")
+        """Save configuration to file now
+
+        External edits made since the last load or check are merged first,
+        so only this manager's unflushed keys override the file.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self.reload_if_changed()
+            try:
+                atomic_write(self.config_file, json.dumps(self.config, indent=4))
+                self._file_signature = self._signature()
+                self._dirty_keys.clear()
+            except Exception as e:
+                print(f"Error saving config: {e}")
+
+    def flush(self):
+        """Write pending changes, if any"""
+        with self._lock:
+            if self._dirty_keys:
+                self.save_config()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_flush(self):
+        """(Re)start the debounce timer"""
+        self._cancel_timer()
+        if self.flush_delay <= 0:
+            self.save_config()
+            return
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the file if it was changed outside this manager
+
+        Unflushed local changes are kept on top of the reloaded values.
+
+        Returns:
+            True if the file was reloaded
+        """
+        with self._lock:
+            self._last_check = time.monotonic()
+            signature = self._signature()
+            if signature is None or signature == self._file_signature:
+                return False
+            try:
+                with open(self.config_file, 'r') as f:
+                    loaded = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep the current settings; a half-saved editor buffer is retried next check
+                print(f"Error reloading config: {e}")
+                return False
+            self._file_signature = signature
+            for key in self._dirty_keys:
+                loaded[key] = self.config.get(key)
+            changed = {key: value for key, value in loaded.items() if self.config.get(key) != value}
+            changed.update({key: None for key in self.config if key not in loaded})
+            self.config = loaded
+            listeners = list(self._listeners)
+
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(changed)
+                except Exception as e:
+                    print(f"Error in config listener: {e}")
+        return True
+
+    def on_change(self, listener: Callable[[Dict], None]):
+        """Call listener({key: new value}) when an external edit changes settings"""
+        self._listeners.append(listener)
 
     def get(self, key, default=None):
         """Get configuration value"""
+        if time.monotonic() - self._last_check >= self.reload_interval:
+            self.reload_if_changed()
         return self.config.get(key, default)
 
     def set(self, key, value):
-        """Set configuration value"""
-        self.config[key] = value
-        self.save_config()
+        """Set configuration value (written in the background)"""
+        with self._lock:
+            self.config[key] = value
+            self._dirty_keys.add(key)
+            self._schedule_flush()
+
+    def close(self):
+        """Flush pending changes and stop the background timer"""
+        self.flush()
+        with self._lock:
+            self._cancel_timer()
+        _managers.discard(self)
@@ -0,0 +1,276 @@
+"""
+Local SQLite database of every contest seen
+
+NCAAAPIClient upserts each successful fetch here when it is given a
+ContestDatabase, so questions like "all of Duke's games this month" or
+"every ranked Big Ten matchup next week" are answered from local indexes
+in milliseconds instead of re-fetching date by date.
+
+Tables:
+    contests       one row per contest id: sport, division, ISO day, status,
+                   venue, ... plus the parsed contest as JSON
+    teams          one row per team name: short name and conference
+    contest_teams  home/away side of each contest: team, score, rank, record
+
+Indexes cover contest id, day, status, team, conference and rank.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Dict, Optional
+
+DEFAULT_DB_PATH = 'contests.db'
+RANKED_MODES = ('either', 'both')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contests (
+    id TEXT PRIMARY KEY,
+    sport TEXT NOT NULL,
+    division TEXT NOT NULL,
+    day TEXT,
+    start_time TEXT,
+    start_minutes INTEGER,
+    status TEXT,
+    venue TEXT,
+    location TEXT,
+    broadcast TEXT,
+    tournament TEXT,
+    body TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS teams (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    short_name TEXT COLLATE NOCASE,
+    conference TEXT COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS contest_teams (
+    contest_id TEXT NOT NULL REFERENCES contests(id) ON DELETE CASCADE,
+    side TEXT NOT NULL,
+    team TEXT NOT NULL COLLATE NOCASE,
+    score TEXT,
+    rank INTEGER,
+    record TEXT,
+    PRIMARY KEY (contest_id, side)
+);
+CREATE INDEX IF NOT EXISTS contests_day ON contests(day, sport);
+CREATE INDEX IF NOT EXISTS contests_status ON contests(status, day);
+CREATE INDEX IF NOT EXISTS contest_teams_team ON contest_teams(team);
+CREATE INDEX IF NOT EXISTS contest_teams_rank ON contest_teams(rank) WHERE rank IS NOT NULL;
+CREATE INDEX IF NOT EXISTS teams_short_name ON teams(short_name);
+CREATE INDEX IF NOT EXISTS teams_conference ON teams(conference);
+"""
+
+
+def iso_day(value: Optional[str]) -> Optional[str]:
+    """YYYY-MM-DD for an MM/DD/YYYY or YYYY-MM-DD date (None if unparsable)"""
+    if not value:
+        return None
+    for fmt in ('%m/%d/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def start_minutes(value: Optional[str]) -> Optional[int]:
+    """Minutes after midnight for a '7:00 PM' or '19:00' start time (None if unparsable, e.g. 'TBA')"""
+    if not value:
+        return None
+    for fmt in ('%I:%M %p', '%I:%M%p', '%H:%M'):
+        try:
+            parsed = datetime.strptime(value.strip().upper(), fmt)
+            return parsed.hour * 60 + parsed.minute
+        except ValueError:
+            continue
+    return None
+
+
+def _rank(value) -> Optional[int]:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class ContestDatabase:
+    """SQLite-backed contest store with indexed queries (thread-safe)"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        """
+        Args:
+            path: Database file (':memory:' for a private in-memory store)
+        """
+        self.path = path
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA foreign_keys=ON')
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database file was created"""
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(contests)')}
+        if 'start_minutes' not in columns:
+            self._conn.execute('ALTER TABLE contests ADD COLUMN start_minutes INTEGER')
+            rows = self._conn.execute('SELECT id, start_time FROM contests').fetchall()
+            self._conn.executemany('UPDATE contests SET start_minutes = ? WHERE id = ?',
+                                   [(start_minutes(row['start_time']), row['id']) for row in rows])
+        self._conn.execute('CREATE INDEX IF NOT EXISTS contests_start ON contests(day, start_minutes)')
+
+    def upsert(self, contests: Iterable[Dict]) -> int:
+        """
+        Insert or update parsed contests (NCAAAPIClient.parse_contests output)
+
+        Returns:
+            Number of contests written
+        """
+        now = time.time()
+        contest_rows, team_rows, side_rows = [], {}, []
+        for contest in contests:
+            contest_id = str(contest.get('id') or '')
+            if not contest_id:
+                continue
+            contest_rows.append((
+                contest_id, contest.get('sport', ''), str(contest.get('division', '')),
+                iso_day(contest.get('date')), contest.get('time', ''), start_minutes(contest.get('time')),
+                contest.get('status', ''),
+                contest.get('venue', ''), contest.get('location', ''), contest.get('broadcast', ''),
+                contest.get('tournament', ''), json.dumps(contest, separators=(',', ':')), now))
+            for side in ('home', 'away'):
+                team = contest.get(f'{side}_team') or {}
+                name = team.get('name', '')
+                if not name:
+                    continue
+                team_rows[name.lower()] = (name, team.get('short_name', ''), team.get('conference', ''))
+                side_rows.append((contest_id, side, name, team.get('score', ''),
+                                  _rank(team.get('rank')), team.get('record', '')))
+
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO contests (id, sport, division, day, start_time, start_minutes, status, venue,
+                                      location, broadcast, tournament, body, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    sport=excluded.sport, division=excluded.division, day=excluded.day,
+                    start_time=excluded.start_time, start_minutes=excluded.start_minutes,
+                    status=excluded.status, venue=excluded.venue,
+                    location=excluded.location, broadcast=excluded.broadcast,
+                    tournament=excluded.tournament, body=excluded.body, updated=excluded.updated
+            """, contest_rows)
+            self._conn.executemany("""
+                INSERT INTO teams (name, short_name, conference) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    short_name=excluded.short_name, conference=excluded.conference
+            """, list(team_rows.values()))
+            self._conn.executemany("""
+                INSERT INTO contest_teams (contest_id, side, team, score, rank, record)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(contest_id, side) DO UPDATE SET
+                    team=excluded.team, score=excluded.score, rank=excluded.rank, record=excluded.record
+            """, side_rows)
+        return len(contest_rows)
+
+    def query(self, team: Optional[str] = None, conference: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              status: Optional[str] = None, sport: Optional[str] = None,
+              ranked: Optional[str] = None, max_rank: int = 25,
+              ids: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Contests matching every given filter, ordered by day and start time
+        (contests without a parsable time, e.g. 'TBA', last within their day)
+
+        Args:
+            team: Full or short team name (case-insensitive, exact)
+            conference: Conference of either team (case-insensitive, exact)
+            date_from: First day, MM/DD/YYYY or YYYY-MM-DD
+            date_to: Last day, MM/DD/YYYY or YYYY-MM-DD
+            status: Contest state ('P', 'I' or 'F')
+            sport: Sport code (e.g. 'WBB')
+            ranked: 'either' for a ranked team on either side, 'both' for
+                ranked matchups
+            max_rank: Ranks up to this count as ranked
+            ids: Only these contest ids
+            limit: Maximum number of contests
+
+        Returns:
+            Parsed contest dictionaries as stored
+        """
+        if ranked is not None and ranked not in RANKED_MODES:
+            raise ValueError(f"Unknown ranked mode '{ranked}', expected one of: {', '.join(RANKED_MODES)}")
+        clauses, params = [], []
+        if date_from:
+            clauses.append('c.day >= ?')
+            params.append(iso_day(date_from) or date_from)
+        if date_to:
+            clauses.append('c.day <= ?')
+            params.append(iso_day(date_to) or date_to)
+        if status:
+            clauses.append('c.status = ?')
+            params.append(status)
+        if sport:
+            clauses.append('c.sport = ?')
+            params.append(sport)
+        if ids is not None:
+            ids = [str(i) for i in ids]
+            clauses.append(f"c.id IN ({','.join('?' * len(ids))})" if ids else '0')
+            params.extend(ids)
+        if team:
+            clauses.append("""c.id IN (SELECT ct.contest_id FROM contest_teams ct WHERE ct.team = ?
+                              UNION SELECT ct.contest_id FROM contest_teams ct
+                                    JOIN teams t ON t.name = ct.team WHERE t.short_name = ?)""")
+            params.extend([team, team])
+        if conference:
+            clauses.append("""c.id IN (SELECT ct.contest_id FROM contest_teams ct
+                                       JOIN teams t ON t.name = ct.team WHERE t.conference = ?)""")
+            params.append(conference)
+        if ranked:
+            ranked_sides = 2 if ranked == 'both' else 1
+            clauses.append("""(SELECT COUNT(*) FROM contest_teams ct
+                               WHERE ct.contest_id = c.id AND ct.rank BETWEEN 1 AND ?) >= ?""")
+            params.extend([max_rank, ranked_sides])
+
+        sql = 'SELECT c.body FROM contests c'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY c.day, c.start_minutes IS NULL, c.start_minutes, c.id'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row['body']) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM contests').fetchone()[0]
+
+    def teams(self, conference: Optional[str] = None) -> List[Dict]:
+        """Known teams, optionally of one conference"""
+        sql = 'SELECT name, short_name, conference FROM teams'
+        params = []
+        if conference:
+            sql += ' WHERE conference = ?'
+            params.append(conference)
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY name', params).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
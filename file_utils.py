@@ -0,0 +1,57 @@
+"""File helpers shared by the NCAA Sports Tracker writers"""
+import os
+import tempfile
+from typing import Union
+
+
+def _read_umask() -> int:
+    """Return the process umask (read once, os.umask is not thread-safe)"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Permission bits a plain open() would create a new file with
+DEFAULT_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def atomic_write(file_path: str, data: Union[str, bytes], encoding: str = 'utf-8'):
+    """
+    Write text or bytes to a file atomically
+
+    The data is written to a temporary file in the same directory, flushed
+    and fsynced, then renamed over the target so readers never observe a
+    partially written file.
+
+    Args:
+        file_path: Destination file path
+        data: Text or bytes to write
+        encoding: Text encoding (ignored for bytes)
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(file_path) + '.',
+                                    suffix='.tmp')
+    try:
+        if isinstance(data, bytes):
+            f = os.fdopen(fd, 'wb')
+        else:
+            f = os.fdopen(fd, 'w', encoding=encoding)
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Keep the permissions of the file being replaced
+        try:
+            mode = os.stat(file_path).st_mode & 0o777
+        except OSError:
+            mode = DEFAULT_FILE_MODE
+        os.chmod(tmp_path, mode)
+
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
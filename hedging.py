@@ -0,0 +1,148 @@
+"""
+Hedged upstream requests
+
+Most NCAA API calls answer in a few hundred milliseconds, but a few hang
+until the request timeout and hold up the whole auto-update tick. With
+hedging, a request that has not answered after an adaptive delay (a high
+percentile of recent request latencies) gets a duplicate, and whichever
+answers first wins.
+
+A process-wide HedgePolicy bounds the extra load: every request earns a
+fraction of a hedge token (max_ratio) and every hedge spends one, so
+hedges never exceed that share of requests beyond a small burst.
+"""
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from metrics import REGISTRY, percentile
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_MAX_RATIO = 0.1
+# Delay used until enough latencies have been seen
+INITIAL_DELAY = 1.0
+MIN_DELAY = 0.05
+MAX_DELAY = 5.0
+WINDOW = 200
+MIN_SAMPLES = 20
+BURST = 2.0
+
+UPSTREAM_HEDGES = REGISTRY.counter('ncaa_upstream_hedges_total',
+                                   "Hedged NCAA API requests by outcome (sent, won, skipped over budget)",
+                                   ['result'])
+HEDGE_DELAY = REGISTRY.gauge('ncaa_upstream_hedge_delay_seconds', "Current delay before a request is hedged")
+
+
+class HedgePolicy:
+    """Adaptive hedge delay plus a token budget capping extra requests"""
+
+    def __init__(self, pct: float = DEFAULT_PERCENTILE, max_ratio: float = DEFAULT_MAX_RATIO,
+                 initial_delay: float = INITIAL_DELAY, min_delay: float = MIN_DELAY,
+                 max_delay: float = MAX_DELAY, window: int = WINDOW, min_samples: int = MIN_SAMPLES,
+                 burst: float = BURST):
+        """
+        Args:
+            pct: Latency percentile after which a request is hedged
+            max_ratio: Hedges allowed per request, e.g. 0.1 for at most 10%
+                extra requests
+            initial_delay: Delay used until min_samples latencies are known
+            min_delay: Lower bound of the delay
+            max_delay: Upper bound of the delay
+            window: Recent latencies the percentile is taken over
+            min_samples: Latencies needed before the delay adapts
+            burst: Hedges that may be spent before the ratio applies
+        """
+        self.pct = pct
+        self.max_ratio = max_ratio
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.burst = burst
+        self.stats = {'requests': 0, 'sent': 0, 'won': 0, 'skipped': 0}
+        self._latencies = deque(maxlen=window)
+        self._tokens = burst
+        self._delay: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record the latency of one finished request attempt"""
+        with self._lock:
+            self._latencies.append(seconds)
+            self._delay = None
+
+    def delay(self) -> float:
+        """Seconds to wait for an answer before hedging"""
+        with self._lock:
+            if self._delay is None:
+                if len(self._latencies) < self.min_samples:
+                    delay = self.initial_delay
+                else:
+                    delay = percentile(self._latencies, self.pct)
+                self._delay = min(max(delay, self.min_delay), self.max_delay)
+                HEDGE_DELAY.set(self._delay)
+            return self._delay
+
+    def start_request(self):
+        """Count a request and earn its share of a hedge token"""
+        with self._lock:
+            self.stats['requests'] += 1
+            self._tokens = min(self._tokens + self.max_ratio, max(self.burst, 1.0))
+
+    def try_hedge(self) -> bool:
+        """Spend a hedge token; False (and counted as skipped) when over budget"""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.stats['sent'] += 1
+                result = 'sent'
+            else:
+                self.stats['skipped'] += 1
+                result = 'skipped'
+        UPSTREAM_HEDGES.inc(result=result)
+        return result == 'sent'
+
+    def record_win(self):
+        """The hedge answered before the original request"""
+        with self._lock:
+            self.stats['won'] += 1
+        UPSTREAM_HEDGES.inc(result='won')
+
+    def summary(self) -> Dict:
+        """Counters plus hedge and win rates"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['hedge_rate'] = stats['sent'] / stats['requests'] if stats['requests'] else 0.0
+        stats['win_rate'] = stats['won'] / stats['sent'] if stats['sent'] else 0.0
+        stats['delay'] = self.delay()
+        return stats
+
+
+_policy: Optional[HedgePolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> HedgePolicy:
+    """The process-wide policy shared by every client that hedges"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = HedgePolicy()
+        return _policy
+
+
+def configure_policy(pct: Optional[float] = None, max_ratio: Optional[float] = None) -> HedgePolicy:
+    """Replace the process-wide policy's percentile and budget"""
+    policy = get_policy()
+    with policy._lock:
+        if pct is not None:
+            if not 0 < pct < 100 or math.isnan(pct):
+                raise ValueError(f"Hedge percentile must be between 0 and 100, got {pct}")
+            policy.pct = pct
+            policy._delay = None
+        if max_ratio is not None:
+            if max_ratio < 0:
+                raise ValueError(f"Hedge ratio must not be negative, got {max_ratio}")
+            policy.max_ratio = max_ratio
+    return policy
@@ -0,0 +1,223 @@
+"""
+Per-contest score history for in-game timelines
+
+Each poll overwrites the previous contest state, so score progression and
+lead changes are lost. ScoreHistory keeps a bounded timeline per contest id
+and appends a (timestamp, home score, away score, status) point only when
+one of those changed since the last point.
+
+Timelines are ring buffers over typed arrays (8 + 2 + 2 + 1 bytes per
+point, no per-point objects): a contest keeps at most `capacity` points,
+dropping its oldest once full, and at most `max_contests` contests are
+tracked, evicting finished games first. AutoUpdateJob attaches the
+timelines to its output, where the XML generator writes them as a
+<History> element per contest.
+"""
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_CAPACITY = 128
+DEFAULT_MAX_CONTESTS = 1000
+FINAL_STATUS = 'F'
+# Stored for scores that are blank (pre-game) or not a number
+NO_SCORE = -1
+MAX_SCORE = 32767
+
+
+def _score(value) -> int:
+    try:
+        return min(max(int(str(value).strip()), NO_SCORE), MAX_SCORE)
+    except (TypeError, ValueError):
+        return NO_SCORE
+
+
+class ContestTimeline:
+    """Fixed-capacity ring buffer of score points for one contest"""
+
+    __slots__ = ('capacity', 'times', 'home', 'away', 'status', 'start', 'size', 'dropped', 'updated')
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.home = array('h', bytes(2 * capacity))
+        self.away = array('h', bytes(2 * capacity))
+        self.status = array('B', bytes(capacity))
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+        self.updated = 0.0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def last(self) -> Optional[tuple]:
+        """Newest (time, home, away, status code) point, or None"""
+        if not self.size:
+            return None
+        i = (self.start + self.size - 1) % self.capacity
+        return self.times[i], self.home[i], self.away[i], self.status[i]
+
+    def append(self, timestamp: float, home: int, away: int, status: int) -> bool:
+        """Add a point unless it repeats the newest one; True if added"""
+        last = self.last()
+        if last is not None and last[1:] == (home, away, status):
+            return False
+        if self.size < self.capacity:
+            i = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+            self.dropped += 1
+        self.times[i], self.home[i], self.away[i], self.status[i] = timestamp, home, away, status
+        self.updated = timestamp
+        return True
+
+    def points(self) -> List[tuple]:
+        """(time, home, away, status code) points, oldest first"""
+        indexes = ((self.start + n) % self.capacity for n in range(self.size))
+        return [(self.times[i], self.home[i], self.away[i], self.status[i]) for i in indexes]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.times, self.home, self.away, self.status))
+
+
+def lead_changes(points: Iterable[tuple]) -> int:
+    """Times the leading team changed (ties do not end a lead)"""
+    changes = 0
+    leader = 0
+    for point in points:
+        home, away = point[1], point[2]
+        if home == NO_SCORE or away == NO_SCORE or home == away:
+            continue
+        current = 1 if home > away else -1
+        if leader and current != leader:
+            changes += 1
+        leader = current
+    return changes
+
+
+class ScoreHistory:
+    """Bounded score timelines for every contest seen (thread-safe)"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_contests: int = DEFAULT_MAX_CONTESTS):
+        """
+        Args:
+            capacity: Points kept per contest (oldest dropped first)
+            max_contests: Contests tracked; beyond this, finished games
+                and then the least recently changed ones are evicted
+        """
+        if capacity < 1 or max_contests < 1:
+            raise ValueError("History capacity and max_contests must be at least 1")
+        self.capacity = capacity
+        self.max_contests = max_contests
+        self.stats = {'points': 0, 'evicted': 0}
+        self._timelines: Dict[str, ContestTimeline] = {}
+        self._statuses: List[str] = []
+        self._status_codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._timelines)
+
+    def _status_code(self, status: str) -> int:
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        return code
+
+    def record(self, contests: Iterable[Dict], now: Optional[float] = None) -> int:
+        """
+        Append a point for every contest whose score or status changed
+
+        Returns:
+            Number of points added
+        """
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for contest in contests:
+                contest_id = str(contest.get('id', ''))
+                if not contest_id:
+                    continue
+                timeline = self._timelines.get(contest_id)
+                if timeline is None:
+                    timeline = self._timelines[contest_id] = ContestTimeline(self.capacity)
+                home = _score((contest.get('home_team') or {}).get('score'))
+                away = _score((contest.get('away_team') or {}).get('score'))
+                if timeline.append(now, home, away, self._status_code(contest.get('status', ''))):
+                    added += 1
+            self.stats['points'] += added
+            self._evict()
+        return added
+
+    def _evict(self):
+        excess = len(self._timelines) - self.max_contests
+        if excess <= 0:
+            return
+        final = self._status_codes.get(FINAL_STATUS)
+
+        def priority(item):
+            timeline = item[1]
+            return (timeline.last()[3] != final, timeline.updated)
+
+        for contest_id, _ in sorted(self._timelines.items(), key=priority)[:excess]:
+            del self._timelines[contest_id]
+        self.stats['evicted'] += excess
+
+    def timeline(self, contest_id: str) -> List[Dict]:
+        """Points of one contest, oldest first (empty if unknown)"""
+        with self._lock:
+            timeline = self._timelines.get(str(contest_id))
+            points = timeline.points() if timeline else []
+        return [self._point(point) for point in points]
+
+    def _point(self, point: tuple) -> Dict:
+        timestamp, home, away, status = point
+        return {
+            'time': datetime.fromtimestamp(timestamp).isoformat(timespec='seconds'),
+            'home': '' if home == NO_SCORE else str(home),
+            'away': '' if away == NO_SCORE else str(away),
+            'status': self._statuses[status],
+        }
+
+    def summary(self, contest_id: str) -> Optional[Dict]:
+        """Timeline plus lead changes and points dropped for one contest"""
+        with self._lock:
+            timeline = self._timelines.get(str(contest_id))
+            if timeline is None:
+                return None
+            points, dropped = timeline.points(), timeline.dropped
+        return {'lead_changes': lead_changes(points), 'dropped': dropped,
+                'points': [self._point(point) for point in points]}
+
+    def attach(self, contests: List[Dict]) -> List[Dict]:
+        """Copies of the contests with their 'history' summary added"""
+        output = []
+        for contest in contests:
+            summary = self.summary(contest.get('id', ''))
+            output.append(dict(contest, history=summary) if summary else contest)
+        return output
+
+    def export(self) -> Dict[str, Dict]:
+        """Every tracked contest's summary by contest id"""
+        with self._lock:
+            ids = list(self._timelines)
+        return {contest_id: summary for contest_id in ids
+                if (summary := self.summary(contest_id)) is not None}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the point arrays"""
+        with self._lock:
+            return sum(timeline.nbytes for timeline in self._timelines.values())
+
+    def clear(self):
+        with self._lock:
+            self._timelines.clear()
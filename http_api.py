@@ -0,0 +1,387 @@
+"""
+Local HTTP API serving the latest contests and rendered documents
+
+One tracker polls upstream and publishes each auto-update job's snapshot
+here; graphics boxes and other consumers pull from it instead of running
+their own copies. Every response is served from memory: bodies, gzip
+variants and ETags are computed once when a snapshot changes, and requests
+never trigger an upstream fetch.
+
+Endpoints:
+    GET /jobs                         published jobs with their URLs
+    GET /jobs/<name>/contests.json    all parsed contests of the job's query
+    GET /jobs/<name>/output[.ext]     rendered output document (e.g. XML)
+    GET /jobs/<name>/history.json     score timeline of every contest the
+                                      job tracks (when it keeps a history)
+    GET /events?sport=&conference=&ids=&types=
+                                      Server-Sent Events stream of change
+                                      events (when the server has an EventHub)
+    GET /db/contests?team=&conference=&from=&to=&status=&sport=&ranked=&limit=
+                                      contests from the local contest
+                                      database (when the server has one)
+    GET /healthz                      liveness
+
+Responses carry a strong ETag and honour If-None-Match (304) and
+Accept-Encoding: gzip.
+"""
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Union
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from push import EventHub, SubscriptionFilter
+from serializers import get_serializer
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+GZIP_LEVEL = 6
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_KEEPALIVE = 15.0
+
+
+class Representation:
+    """An immutable response body with its precomputed gzip variant and ETag"""
+
+    __slots__ = ('body', 'gzip_body', 'etag', 'gzip_etag', 'content_type', 'last_modified')
+
+    def __init__(self, body: bytes, content_type: str, version: Optional[str] = None):
+        """
+        Args:
+            body: Response body
+            content_type: Content-Type header value
+            version: Content version for the ETag (default: hash of body)
+        """
+        self.body = body
+        self.content_type = content_type
+        version = version or hashlib.sha1(body).hexdigest()
+        self.etag = f'"{version}"'
+        self.last_modified = formatdate(time.time(), usegmt=True)
+        if len(body) >= GZIP_MIN_BYTES:
+            self.gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            self.gzip_etag = f'"{version}-gzip"'
+        else:
+            self.gzip_body = None
+            self.gzip_etag = None
+
+    def matches(self, if_none_match: str) -> bool:
+        """True if an If-None-Match header names this representation"""
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return self.etag in tags or (self.gzip_etag is not None and self.gzip_etag in tags)
+
+
+HEALTHZ = Representation(b'ok\n', 'text/plain; charset=utf-8')
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """True if an Accept-Encoding header allows gzip"""
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '').lower() not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'job'
+
+
+class SnapshotStore:
+    """Latest published representations per job name"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._index: Optional[Representation] = None
+        self._lock = threading.Lock()
+
+    def publish(self, name: str, contests: List[Dict], document: Union[str, bytes, None] = None,
+                fmt: str = 'xml', version: Optional[str] = None, history: Optional[Dict] = None):
+        """
+        Replace a job's snapshot
+
+        Representations whose content did not change are kept as they are,
+        so their ETags stay valid and clients keep getting 304s.
+
+        Args:
+            name: Job name used in URLs
+            contests: Parsed contests to serve as JSON
+            document: Rendered output document (None to serve contests only)
+            fmt: Serializer name of the document
+            version: Content version of the document (default: hash of its
+                bytes; pass one that ignores volatile timestamps)
+            history: Score timelines by contest id (history.ScoreHistory.export)
+        """
+        name = _safe_name(name)
+        contests_body = json.dumps(contests, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        contests_etag = f'"{hashlib.sha1(contests_body).hexdigest()}"'
+        history_body = (json.dumps(history, separators=(',', ':'), sort_keys=True).encode('utf-8')
+                        if history is not None else None)
+
+        if isinstance(document, str):
+            document = document.encode('utf-8')
+        serializer = get_serializer(fmt) if document is not None else None
+
+        with self._lock:
+            entry = self._jobs.setdefault(name, {'contests': None, 'document': None, 'history': None,
+                                                 'extension': ''})
+            if entry['contests'] is None or entry['contests'].etag != contests_etag:
+                entry['contests'] = Representation(contests_body, 'application/json')
+            if history_body is not None and (entry['history'] is None
+                                             or entry['history'].body != history_body):
+                entry['history'] = Representation(history_body, 'application/json')
+            if document is not None:
+                document_version = version or hashlib.sha1(document).hexdigest()
+                current = entry['document']
+                if current is None or current.etag != f'"{document_version}"':
+                    content_type = serializer.mime_type
+                    if not serializer.binary:
+                        content_type += '; charset=utf-8'
+                    entry['document'] = Representation(document, content_type, document_version)
+                entry['extension'] = serializer.extension
+            entry['updated'] = time.time()
+            self._index = None
+
+    def publish_job(self, name: str, job) -> None:
+        """Publish an AutoUpdateJob's latest cycle"""
+        history = job.history.export() if job.history is not None else None
+        self.publish(name, job.contests, job.last_document, job.format, job.document_version(), history)
+
+    def remove(self, name: str):
+        with self._lock:
+            self._jobs.pop(_safe_name(name), None)
+            self._index = None
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._jobs)
+
+    def get(self, name: str, resource: str) -> Optional[Representation]:
+        """'contests', 'document' or 'history' representation of a job"""
+        with self._lock:
+            entry = self._jobs.get(name)
+            return entry.get(resource) if entry else None
+
+    def index(self) -> Representation:
+        """JSON listing of published jobs (rebuilt only after a publish)"""
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            jobs = []
+            for name, entry in sorted(self._jobs.items()):
+                base = f"/jobs/{quote(name)}"
+                item = {'name': name, 'updated': entry.get('updated'), 'contests': f"{base}/contests.json"}
+                if entry['document'] is not None:
+                    item['output'] = f"{base}/output{entry['extension']}"
+                if entry['history'] is not None:
+                    item['history'] = f"{base}/history.json"
+                jobs.append(item)
+            body = json.dumps({'jobs': jobs}, indent=2).encode('utf-8')
+            self._index = Representation(body, 'application/json')
+            return self._index
+
+
+class ContestAPIServer:
+    """Threaded HTTP server answering from a SnapshotStore"""
+
+    def __init__(self, store: SnapshotStore, port: int = 8080, host: str = '127.0.0.1',
+                 hub: Optional[EventHub] = None, database=None):
+        """
+        Args:
+            store: Snapshots to serve
+            port: Bind port (0 picks a free port)
+            host: Bind address
+            hub: Change events to stream at /events (None disables it)
+            database: contest_db.ContestDatabase queried at /db/contests
+                (None disables it)
+        """
+        self.store = store
+        self.hub = hub
+        self.database = database
+        self.stats = {'requests': 0, 'not_modified': 0, 'gzip': 0, 'not_found': 0, 'streams': 0}
+        self._stats_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def query_database(self, query: Dict[str, List[str]]) -> Representation:
+        """JSON representation of a /db/contests query"""
+        def first(key):
+            return query.get(key, [None])[0] or None
+        limit = first('limit')
+        contests = self.database.query(team=first('team'), conference=first('conference'),
+                                       date_from=first('from'), date_to=first('to'),
+                                       status=first('status'), sport=first('sport'),
+                                       ranked=first('ranked'), limit=int(limit) if limit else None)
+        body = json.dumps({'contests': contests, 'count': len(contests)}, separators=(',', ':')).encode('utf-8')
+        return Representation(body, 'application/json')
+
+    def resolve(self, path: str) -> Optional[Representation]:
+        """Representation for a request path, or None"""
+        url = urlparse(path)
+        if url.path.rstrip('/') == '/db/contests' and self.database is not None:
+            return self.query_database(parse_qs(url.query))
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        if parts in (['jobs'], []):
+            return self.store.index()
+        if parts == ['healthz']:
+            return HEALTHZ
+        if len(parts) == 3 and parts[0] == 'jobs':
+            if parts[2] == 'contests.json':
+                return self.store.get(parts[1], 'contests')
+            if parts[2] == 'history.json':
+                return self.store.get(parts[1], 'history')
+            if parts[2] == 'output' or parts[2].startswith('output.'):
+                return self.store.get(parts[1], 'document')
+        return None
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_HEAD(self):
+                self._respond(head=True)
+
+            def do_GET(self):
+                self._respond(head=False)
+
+            def _respond(self, head: bool):
+                server._count('requests')
+                url = urlparse(self.path)
+                if url.path.rstrip('/') == '/events' and server.hub is not None and not head:
+                    self._stream_events(parse_qs(url.query))
+                    return
+                try:
+                    rep = server.resolve(self.path)
+                except ValueError as e:
+                    self._send_error(400, str(e))
+                    return
+                if rep is None:
+                    server._count('not_found')
+                    body = b'{"error": "not found"}\n'
+                    self.send_response(404)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    if not head:
+                        self.wfile.write(body)
+                    return
+
+                use_gzip = rep.gzip_body is not None and _accepts_gzip(self.headers.get('Accept-Encoding', ''))
+                etag = rep.gzip_etag if use_gzip else rep.etag
+                if_none_match = self.headers.get('If-None-Match')
+                if if_none_match and rep.matches(if_none_match):
+                    server._count('not_modified')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Cache-Control', 'no-cache')
+                    self.send_header('Vary', 'Accept-Encoding')
+                    self.end_headers()
+                    return
+
+                body = rep.gzip_body if use_gzip else rep.body
+                self.send_response(200)
+                self.send_header('Content-Type', rep.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', rep.last_modified)
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Vary', 'Accept-Encoding')
+                if use_gzip:
+                    server._count('gzip')
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                if not head:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass
+
+            def _stream_events(self, query: Dict[str, List[str]]):
+                try:
+                    event_filter = SubscriptionFilter.from_query(query)
+                    last_id = self.headers.get('Last-Event-ID') or query.get('last_event_id', [None])[0]
+                    last_id = int(last_id) if last_id else None
+                except ValueError as e:
+                    self._send_error(400, str(e))
+                    return
+
+                server._count('streams')
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+                self.send_header('Cache-Control', 'no-cache')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                with server.hub.subscribe(event_filter, last_id) as subscription:
+                    try:
+                        self.wfile.write(b'retry: 3000\n\n')
+                        self.wfile.flush()
+                        while not subscription.closed:
+                            events = subscription.get(timeout=SSE_KEEPALIVE)
+                            if events:
+                                self.wfile.write(b''.join(event.sse() for event in events))
+                            elif not subscription.closed:
+                                self.wfile.write(b': keepalive\n\n')
+                            self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError, OSError):
+                        pass
+
+            def _send_error(self, status: int, message: str):
+                body = json.dumps({'error': message}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'ContestAPIServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self.hub is not None:
+            self.hub.close()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def start_api_server(store: SnapshotStore, port: int, host: str = '127.0.0.1',
+                     hub: Optional[EventHub] = None, database=None) -> Optional[ContestAPIServer]:
+    """Start serving a store (and optionally an event hub and database), or print why not and return None"""
+    try:
+        server = ContestAPIServer(store, port, host, hub, database).start()
+    except OSError as e:
+        print(f"Could not start API server on port {port}: {e}")
+        return None
+    print(f"Contest API available at {server.url}/jobs")
+    return server
@@ -0,0 +1,108 @@
+"""
+End-to-end score-change latency
+
+Tracks each contest change from the poll cycle whose fetch first saw it
+until the output file containing it has been written. Per-stage timings
+come from the cycle that first saw the change; 'total' runs from that
+cycle's fetch start to the end of the successful write, so a change whose
+write failed keeps ageing until a later cycle gets it onto disk.
+"""
+from collections import deque
+from typing import List, Dict, Iterable, Sequence
+
+from metrics import CHANGE_LATENCY_SECONDS, percentile
+
+LATENCY_STAGES = ('fetch', 'parse', 'filter', 'render', 'write', 'total')
+
+
+class ChangeLatencyTracker:
+    """Collects change-to-disk latency samples for one output"""
+
+    def __init__(self, change_types: Sequence[str] = ('score',), max_samples: int = 10000):
+        """
+        Args:
+            change_types: Change event types to track (see changes.CHANGE_TYPES)
+            max_samples: Samples kept per stage for the summary
+        """
+        self.change_types = set(change_types)
+        self.samples: Dict[str, deque] = {stage: deque(maxlen=max_samples) for stage in LATENCY_STAGES}
+        # contest id -> (first-seen fetch start, per-stage seconds of that cycle)
+        self._pending: Dict[str, tuple] = {}
+
+    @property
+    def pending(self) -> int:
+        """Changes seen but not yet on disk"""
+        return len(self._pending)
+
+    def observe(self, events: List[Dict], output: Iterable[Dict], timings: Dict, ok: bool):
+        """
+        Record one poll cycle
+
+        Args:
+            events: Change events from this cycle's diff
+            output: Contests written to the output this cycle
+            timings: perf_counter marks 'started', 'fetched', 'parsed',
+                'filtered', 'rendered' and 'finished'
+            ok: True if the output on disk now matches this cycle's render
+        """
+        if events:
+            written_ids = {str(c.get('id', '')) for c in output}
+            stages = {
+                'fetch': timings['fetched'] - timings['started'],
+                'parse': timings['parsed'] - timings['fetched'],
+                'filter': timings['filtered'] - timings['parsed'],
+                'render': timings['rendered'] - timings['filtered'],
+                'write': timings['finished'] - timings['rendered'],
+            }
+            for event in events:
+                if event['type'] in self.change_types and event['contest_id'] in written_ids:
+                    # Keep the earliest sighting of a change still waiting for disk
+                    self._pending.setdefault(event['contest_id'], (timings['started'], stages))
+
+        if ok and self._pending:
+            for first_seen, stages in self._pending.values():
+                for stage, seconds in stages.items():
+                    self._record(stage, seconds)
+                self._record('total', timings['finished'] - first_seen)
+            self._pending.clear()
+
+    def _record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+        CHANGE_LATENCY_SECONDS.observe(seconds, stage=stage)
+
+    def summary(self) -> Dict[str, Dict]:
+        """count, mean, p50, p95, p99 and max seconds per stage"""
+        result = {}
+        for stage, values in self.samples.items():
+            values = list(values)
+            result[stage] = {
+                'count': len(values),
+                'mean': sum(values) / len(values) if values else None,
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'p99': percentile(values, 99),
+                'max': max(values) if values else None,
+            }
+        return result
+
+
+def merge_summaries(trackers: Iterable[ChangeLatencyTracker]) -> Dict[str, Dict]:
+    """Summary over the samples of several trackers"""
+    combined = ChangeLatencyTracker()
+    for tracker in trackers:
+        for stage, values in tracker.samples.items():
+            combined.samples[stage].extend(values)
+    return combined.summary()
+
+
+def format_summary(summary: Dict[str, Dict]) -> str:
+    """Table of per-stage latency in milliseconds"""
+    def ms(value):
+        return f"{value * 1000:.2f}" if value is not None else '-'
+
+    lines = [f"{'stage':<8}{'changes':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for stage in LATENCY_STAGES:
+        s = summary[stage]
+        lines.append(f"{stage:<8}{s['count']:>9}{ms(s['p50']):>10}{ms(s['p95']):>10}"
+                     f"{ms(s['p99']):>10}{ms(s['max']):>10}")
+    return '\n'.join(lines)
@@ -0,0 +1,321 @@
+"""
+Load test: many simulated consumers against a mock NCAA upstream
+
+Drives N concurrent Streamlit-style sessions (fetch -> parse -> filter ->
+render XML in memory) or auto-update jobs (AutoUpdateJob writing a file)
+for a fixed duration, using the real NCAAAPIClient and XMLGenerator code
+paths. Reports p50/p95/p99 cycle latency, upstream requests per second, CPU
+and RSS of this process, and writes the results as JSON.
+
+By default the mock upstream runs in a separate process so CPU and RSS
+reflect the consumers only.
+
+Usage:
+    python loadtest.py --mode session --sessions 1 10 50 --duration 30 -o load.json
+    python loadtest.py --mode job --sessions 100 --interval 5 --count 300 --latency-ms 150
+    python loadtest.py --url http://127.0.0.1:8765/ --sessions 20
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from auto_update import AutoUpdateJob
+from metrics import UPSTREAM_COALESCED, UPSTREAM_REQUESTS, percentile
+from mock_server import MockNCAAServer
+from ncaa_api import NCAAAPIClient
+from synthetic import SyntheticSlate
+from xml_generator import XMLGenerator
+
+MODES = ('session', 'job')
+CONTEST_DATE = '01/07/2026'
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes (None if unknown)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource:
+        # Peak, not current: ru_maxrss is KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+class ResourceSampler:
+    """Samples process RSS in a background thread"""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss()
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def start(self) -> 'ResourceSampler':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class Consumer:
+    """One simulated session or auto-update job"""
+
+    def __init__(self, url: str, mode: str, sport_code: str, output_dir: str, index: int):
+        self.client = NCAAAPIClient(base_url=url)
+        self.mode = mode
+        self.sport_code = sport_code
+        self.latencies: List[float] = []
+        self.empty = 0
+        if mode == 'job':
+            self.job = AutoUpdateJob(self.client, sport_code, 1, CONTEST_DATE,
+                                     os.path.join(output_dir, f'consumer_{index}.xml'),
+                                     metadata={'Sport': sport_code, 'Date': CONTEST_DATE})
+        else:
+            self.generator = XMLGenerator()
+
+    def cycle(self):
+        """Run one poll cycle and record its latency"""
+        start = time.perf_counter()
+        if self.mode == 'job':
+            contests = self.job.run_once()['contests']
+        else:
+            # Same steps as a Streamlit rerun: fetch, parse, filter, render
+            response = self.client.fetch_contests(self.sport_code, 1, 2025, CONTEST_DATE)
+            parsed = self.client.parse_contests(response)
+            selected = self.client.filter_contests(parsed, top25_only=True)
+            self.generator.generate_xml(selected, {'Sport': self.sport_code, 'TotalEvents': len(selected)})
+            contests = len(parsed)
+        self.latencies.append(time.perf_counter() - start)
+        if not contests:
+            self.empty += 1
+
+    def run(self, interval: float, deadline: float, stop_event: threading.Event):
+        """Cycle every interval seconds (back to back when 0) until the deadline"""
+        if interval:
+            # Stagger start times like independently opened sessions
+            stop_event.wait(random.uniform(0, interval))
+        while not stop_event.is_set() and time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                self.cycle()
+            except Exception as e:
+                print(f"Consumer error: {e}")
+                self.empty += 1
+            if interval:
+                stop_event.wait(max(0.0, interval - (time.perf_counter() - started)))
+
+    def close(self):
+        self.client.close()
+
+
+def run_level(url: str, sessions: int, duration: float, mode: str = 'session',
+              interval: float = 0.0, sports: Optional[List[str]] = None) -> Dict:
+    """
+    Drive sessions concurrent consumers against url for duration seconds
+
+    Args:
+        url: Upstream base URL (a mock server)
+        sessions: Number of concurrent consumers (one thread each)
+        duration: Seconds to run
+        mode: 'session' (render in memory) or 'job' (AutoUpdateJob writing a file)
+        interval: Seconds between a consumer's cycles (0 for back to back)
+        sports: Sport codes assigned round-robin to consumers
+
+    Returns:
+        Result dictionary for this concurrency level
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of: {', '.join(MODES)}")
+    sports = sports or ['WBB']
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        consumers = [Consumer(url, mode, sports[i % len(sports)], output_dir, i) for i in range(sessions)]
+        stop_event = threading.Event()
+        sampler = ResourceSampler().start()
+        cpu_start = time.process_time()
+        requests_start = UPSTREAM_REQUESTS.value()
+        coalesced_start = UPSTREAM_COALESCED.value(mode='thread')
+        started = time.perf_counter()
+        deadline = started + duration
+
+        threads = [threading.Thread(target=c.run, args=(interval, deadline, stop_event), daemon=True)
+                   for c in consumers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        elapsed = time.perf_counter() - started
+        cpu_seconds = time.process_time() - cpu_start
+        upstream_requests = UPSTREAM_REQUESTS.value() - requests_start
+        coalesced = UPSTREAM_COALESCED.value(mode='thread') - coalesced_start
+        sampler.stop()
+        for consumer in consumers:
+            consumer.close()
+
+    latencies = [latency for c in consumers for latency in c.latencies]
+    cycles = len(latencies)
+    rss = sampler.samples
+    return {
+        'mode': mode,
+        'sessions': sessions,
+        'interval': interval,
+        'seconds': elapsed,
+        'cycles': cycles,
+        'empty_cycles': sum(c.empty for c in consumers),
+        'upstream_requests_per_second': upstream_requests / elapsed if elapsed else 0.0,
+        'coalesced_requests': coalesced,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p95': percentile(latencies, 95),
+        'latency_p99': percentile(latencies, 99),
+        'latency_max': max(latencies) if latencies else None,
+        'cpu_seconds': cpu_seconds,
+        'cpu_percent': 100 * cpu_seconds / elapsed if elapsed else 0.0,
+        'rss_peak_bytes': max(rss) if rss else None,
+        'rss_mean_bytes': sum(rss) / len(rss) if rss else None,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_process(mock_args: List[str], timeout: float = 10.0) -> tuple:
+    """
+    Start mock_server.py in a child process
+
+    Returns:
+        (Popen, base URL)
+    """
+    port = _free_port()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server.py')
+    process = subprocess.Popen([sys.executable, script, '--port', str(port)] + mock_args,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return process, f"http://127.0.0.1:{port}/"
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Mock server did not start")
+
+
+def print_results(results: List[Dict]):
+    """Print one row per concurrency level"""
+    def ms(value):
+        return f"{value * 1000:.1f}" if value is not None else '-'
+
+    def mib(value):
+        return f"{value / 1048576:.1f}" if value is not None else '-'
+
+    print(f"{'mode':<8}{'sessions':>9}{'cycles':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'cpu %':>8}{'rss MiB':>9}{'empty':>7}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['sessions']:>9}{r['cycles']:>8}{r['upstream_requests_per_second']:>9.1f}"
+              f"{ms(r['latency_p50']):>9}{ms(r['latency_p95']):>9}{ms(r['latency_p99']):>9}"
+              f"{r['cpu_percent']:>8.1f}{mib(r['rss_peak_bytes']):>9}{r['empty_cycles']:>7}")
+
+
+def main(argv=None) -> int:
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="NCAA Sports Tracker load test")
+    parser.add_argument('--mode', choices=MODES, default='session',
+                        help="session: fetch+render in memory; job: AutoUpdateJob writing files")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 50],
+                        help="Concurrent consumers; several values run one level each")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level (default: 10)")
+    parser.add_argument('--interval', type=float, default=0.0,
+                        help="Seconds between a consumer's cycles (default: 0, back to back)")
+    parser.add_argument('--sports', nargs='+', default=['WBB'], help="Sport codes assigned round-robin")
+    parser.add_argument('--url', default=None, help="Use this upstream instead of starting a mock")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run the mock in this process (its CPU then counts against the consumers)")
+    parser.add_argument('--count', type=int, default=200, help="Mock slate size (default: 200)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Mock response latency")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Mock latency jitter")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Mock error rate")
+    parser.add_argument('-o', '--output', default=None, help="Write results JSON here")
+    args = parser.parse_args(argv)
+
+    process = server = None
+    if args.url:
+        url, upstream = args.url, 'external'
+    elif args.in_process:
+        slate = SyntheticSlate(count=args.count, sports={code: 1.0 for code in args.sports})
+        server = MockNCAAServer(slate, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                error_rate=args.error_rate).start()
+        url, upstream = server.url, 'in-process'
+    else:
+        process, url = start_mock_process([
+            '--count', str(args.count), '--sports', *args.sports,
+            '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+            '--error-rate', str(args.error_rate)])
+        upstream = 'subprocess'
+
+    results = []
+    try:
+        for sessions in args.sessions:
+            print(f"Running {sessions} {args.mode} consumer(s) for {args.duration:g}s...", file=sys.stderr)
+            results.append(run_level(url, sessions, args.duration, args.mode, args.interval, args.sports))
+    finally:
+        if server:
+            server.stop()
+        if process:
+            process.terminate()
+            process.wait()
+
+    print_results(results)
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'upstream': upstream,
+                'mock': {'count': args.count, 'latency_ms': args.latency_ms,
+                         'jitter_ms': args.jitter_ms, 'error_rate': args.error_rate},
+            },
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
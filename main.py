@@ -7,9 +7,19 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import os
 
+from auto_update import AutoUpdateJob
 from ncaa_api import NCAAAPIClient
 from xml_generator import XMLGenerator
 from config_manager import ConfigManager
+from contest_db import ContestDatabase
+from http_api import SnapshotStore, start_api_server
+from push import EventHub
+from push_sink import PushSinkGroup
+from metrics import start_metrics_server
+from history import ScoreHistory
+from prefetch import VIEW_MAX_AGE, Prefetcher
+from profiling import configure_from_config
+from serializers import file_dialog_types, write_output
 
 
 class NCAATrackerApp(ctk.CTk):
@@ -20,14 +30,49 @@ class NCAATrackerApp(ctk.CTk):
 
         # Initialize components
         self.config = ConfigManager()
-        self.api_client = NCAAAPIClient()
+        # Optional local contest database ("database" in config.json, e.g. "contests.db")
+        database_path = self.config.get('database', '')
+        self.database = ContestDatabase(database_path) if database_path else None
+        # Optional hedging of slow upstream requests ("hedge_requests" in config.json)
+        self.api_client = NCAAAPIClient(hedge=bool(self.config.get('hedge_requests', False)),
+                                        database=self.database)
         self.xml_generator = XMLGenerator()
 
+        # Optional Prometheus-style metrics endpoint ("metrics_port" in config.json)
+        metrics_port = self.config.get('metrics_port', 0)
+        self.metrics_server = start_metrics_server(metrics_port) if metrics_port else None
+
+        # Optional local HTTP API for graphics boxes ("api_port" in config.json)
+        api_port = self.config.get('api_port', 0)
+        self.api_store = SnapshotStore()
+        self.event_hub = EventHub()
+        self.api_server = (start_api_server(self.api_store, api_port, hub=self.event_hub, database=self.database)
+                           if api_port else None)
+
+        # Optional push to graphics engines ("push_endpoints" in config.json)
+        try:
+            endpoints = self.config.get('push_endpoints', [])
+            self.push_sink = PushSinkGroup(endpoints, self.config.get('push_framing', 'line')) if endpoints else None
+        except (ValueError, OSError) as e:
+            print(f"Push sink disabled: {e}")
+            self.push_sink = None
+
+        # Optional auto-update profiling (NCAA_PROFILE or "profiling" in config.json)
+        configure_from_config(self.config)
+
+        # Score timelines written with the auto-update output ("score_history" in config.json)
+        self.score_history = ScoreHistory() if self.config.get('score_history', False) else None
+
+        # Warm adjacent dates and divisions in the background ("prefetch" in config.json)
+        self.prefetcher = Prefetcher(self.api_client) if self.config.get('prefetch', True) else None
+
         # Application state
         self.selected_contests = []
         self.all_contests = []
+        self.fetch_query = None
         self.auto_update_thread = None
         self.auto_update_running = False
+        self.auto_update_job = None
         self.last_xml_path = None
 
         # Setup UI
@@ -229,21 +274,18 @@ class NCAATrackerApp(ctk.CTk):
                 date = self.date_var.get()
                 week = self.week_var.get() if self.week_var.get() else None
 
-                # Fetch data
-                response = self.api_client.fetch_contests(
-                    sport_code=sport_code,
-                    division=division,
-                    season_year=2025,
-                    contest_date=date,
-                    week=int(week) if week else None
-                )
-
-                # Parse contests
-                self.all_contests = self.api_client.parse_contests(response)
+                # Fetch and parse (shared with the auto-update thread if it
+                # is requesting the same slate right now). Recently fetched or
+                # prefetched views show at once; older ones, and the last good
+                # data after an error, are refreshed in the background.
+                query = (sport_code, division, 2025, date, int(week) if week else None)
+                self.fetch_query = query
+                snapshot = self.api_client.get_snapshot(
+                    *query, max_age=VIEW_MAX_AGE,
+                    on_fresh=lambda fresh: self.after(0, lambda: self._show_snapshot(fresh, query)))
 
                 # Update UI on main thread
-                self.after(0, self._display_events)
-                self.after(0, lambda: self.status_label.configure(text=f"Found {len(self.all_contests)} events"))
+                self.after(0, lambda: self._show_snapshot(snapshot, query))
                 self.after(0, lambda: self.fetch_btn.configure(state="normal"))
 
             except Exception as e:
@@ -252,6 +294,26 @@ class NCAATrackerApp(ctk.CTk):
 
         threading.Thread(target=fetch_thread, daemon=True).start()
 
+    def _show_snapshot(self, snapshot, query):
+        """Show fetched contests; a failed fetch never blanks the list"""
+        if query != self.fetch_query:
+            return  # a different query was fetched since
+        if snapshot.has_data:
+            self.all_contests = snapshot.contests
+            self._display_events()
+        if snapshot.error and snapshot.has_data:
+            text = (f"Fetch failed, showing {len(self.all_contests)} events from "
+                    f"{snapshot.age:.0f}s ago (retrying)")
+        elif snapshot.error:
+            text = f"Fetch failed: {snapshot.error} (retrying)"
+        elif snapshot.stale:
+            text = f"Found {len(self.all_contests)} events (updating...)"
+        else:
+            text = f"Found {len(self.all_contests)} events"
+            if self.prefetcher:
+                self.prefetcher.prefetch_around(*query)
+        self.status_label.configure(text=text)
+
     def _display_events(self):
         """Display events in the text widget"""
         self.events_text.delete("1.0", "end")
@@ -292,20 +354,9 @@ class NCAATrackerApp(ctk.CTk):
 
     def _apply_filters(self) -> List[Dict]:
         """Apply current filters to contests"""
-        filtered = self.all_contests.copy()
-
-        # Top 25 filter
-        if self.top25_var.get():
-            filtered = [c for c in filtered if self.api_client.is_top_25(c)]
-
-        # Conference filter
-        conf_filter = self.conference_var.get().strip()
-        if conf_filter and conf_filter.lower() != "all":
-            filtered = [c for c in filtered if
-                       conf_filter.lower() in c.get('home_team', {}).get('conference', '').lower() or
-                       conf_filter.lower() in c.get('away_team', {}).get('conference', '').lower()]
-
-        return filtered
+        return self.api_client.filter_contests(self.all_contests,
+                                               top25_only=self.top25_var.get(),
+                                               conference=self.conference_var.get())
 
     def _on_event_click(self, event):
         """Handle click on event in available events list"""
@@ -405,8 +456,8 @@ class NCAATrackerApp(ctk.CTk):
         file_path = filedialog.asksaveasfilename(
             initialdir=initial_dir,
             defaultextension=".xml",
-            filetypes=[("XML files", "*.xml"), ("All files", "*.*")],
-            title="Save NCAA Events XML"
+            filetypes=file_dialog_types(),
+            title="Save NCAA Events"
         )
 
         if file_path:
@@ -418,15 +469,23 @@ class NCAATrackerApp(ctk.CTk):
                 'TotalEvents': len(self.selected_contests)
             }
 
-            xml_string = self.xml_generator.generate_xml(self.selected_contests, metadata)
+            try:
+                saved = self._write_output(self.selected_contests, metadata, file_path)
+            except RuntimeError as e:
+                messagebox.showerror("Error", str(e))
+                return
 
-            if self.xml_generator.save_to_file(xml_string, file_path):
+            if saved:
                 # Save directory for next time
                 self.config.set('last_save_directory', os.path.dirname(file_path))
                 self.last_xml_path = file_path
-                messagebox.showinfo("Success", f"XML saved successfully to:\n{file_path}")
+                messagebox.showinfo("Success", f"Saved successfully to:\n{file_path}")
             else:
-                messagebox.showerror("Error", "Failed to save XML file.")
+                messagebox.showerror("Error", "Failed to save file.")
+
+    def _write_output(self, contests: List[Dict], metadata: Dict, file_path: str) -> bool:
+        """Render contests in the format implied by the file extension and save them"""
+        return write_output(contests, metadata, file_path, self.xml_generator)
 
     def _start_auto_update(self):
         """Start auto-update thread"""
@@ -441,6 +500,7 @@ class NCAATrackerApp(ctk.CTk):
                                       "Please select events and save XML at least once before starting auto-update.")
                 return
 
+            self.auto_update_job = self._create_auto_update_job()
             self.auto_update_running = True
             self.start_btn.configure(state="disabled")
             self.stop_btn.configure(state="normal")
@@ -456,7 +516,28 @@ class NCAATrackerApp(ctk.CTk):
             self.auto_update_thread.start()
 
         except ValueError:
-            messagebox.showerror("Invalid Interval", "Please enter a valid number for the interval.")
+            messagebox.showerror("Invalid Input", "Please enter valid numbers for the interval and week.")
+
+    def _create_auto_update_job(self) -> AutoUpdateJob:
+        """Snapshot the current query and output file into an auto-update job"""
+        week = self.week_var.get()
+        return AutoUpdateJob(
+            client=self.api_client,
+            sport_code=self.api_client.SPORT_CODES[self.sport_var.get()],
+            division=self.api_client.DIVISIONS[self.division_var.get()],
+            contest_date=self.date_var.get(),
+            season_year=2025,
+            week=int(week) if week else None,
+            output_path=self.last_xml_path,
+            metadata={
+                'Sport': self.sport_var.get(),
+                'Division': self.division_var.get(),
+                'Date': self.date_var.get()
+            },
+            generator=self.xml_generator,
+            push_sink=self.push_sink,
+            history=self.score_history
+        )
 
     def _stop_auto_update(self):
         """Stop auto-update thread"""
@@ -467,50 +548,26 @@ class NCAATrackerApp(ctk.CTk):
 
     def _update_xml(self):
         """Update XML file (called by auto-update)"""
-        if not self.last_xml_path:
+        if not self.last_xml_path or not self.auto_update_job:
             return
 
         try:
-            # Re-fetch current data
-            sport_code = self.api_client.SPORT_CODES[self.sport_var.get()]
-            division = self.api_client.DIVISIONS[self.division_var.get()]
-            date = self.date_var.get()
-            week = self.week_var.get() if self.week_var.get() else None
-
-            response = self.api_client.fetch_contests(
-                sport_code=sport_code,
-                division=division,
-                season_year=2025,
-                contest_date=date,
-                week=int(week) if week else None
-            )
-
-            updated_contests = self.api_client.parse_contests(response)
-
-            # Update selected contests with fresh data
-            updated_selected = []
-            for selected in self.selected_contests:
-                # Find matching contest in updated data
-                matching = next((c for c in updated_contests if c.get('id') == selected.get('id')), None)
-                if matching:
-                    updated_selected.append(matching)
-                else:
-                    updated_selected.append(selected)
-
-            # Generate and save updated XML
-            metadata = {
-                'Sport': self.sport_var.get(),
-                'Division': self.division_var.get(),
-                'Date': self.date_var.get(),
-                'TotalEvents': len(updated_selected),
-                'LastUpdated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-
-            xml_string = self.xml_generator.generate_xml(updated_selected, metadata)
-            self.xml_generator.save_to_file(xml_string, self.last_xml_path)
+            # Re-fetch and write the current selection with fresh data
+            result = self.auto_update_job.run_once(self.selected_contests)
+            if self.api_server:
+                name = os.path.splitext(os.path.basename(self.last_xml_path))[0]
+                self.api_store.publish_job(name, self.auto_update_job)
+                self.event_hub.publish(result['events'])
+            stats = dict(self.xml_generator.write_stats)
+            if result['stale']:
+                self.after(0, lambda: self.status_label.configure(
+                    text=f"Update failed at {datetime.now().strftime('%H:%M:%S')}, "
+                         f"keeping the last XML (retrying)"))
+                return
 
             self.after(0, lambda: self.status_label.configure(
-                text=f"Auto-updated at {datetime.now().strftime('%H:%M:%S')}"))
+                text=f"Auto-updated at {datetime.now().strftime('%H:%M:%S')} "
+                     f"({stats['written']} written, {stats['skipped']} unchanged)"))
 
         except Exception as e:
             print(f"Auto-update error: {e}")
@@ -518,6 +575,17 @@ class NCAATrackerApp(ctk.CTk):
     def on_closing(self):
         """Handle window close"""
         self._stop_auto_update()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.api_server:
+            self.api_server.stop()
+        if self.push_sink:
+            self.push_sink.close()
+        if self.prefetcher:
+            self.prefetcher.close()
+        if self.database:
+            self.database.close()
+        self.config.close()
         self.destroy()
 
 
@@ -0,0 +1,296 @@
+"""
+Pipeline metrics with a Prometheus text-format endpoint
+
+Counters, gauges and histograms are kept in a process-wide registry and
+updated by the API client, XML generator, serializers and auto-update job.
+Start a MetricsServer to expose them at http://host:port/metrics, e.g. with
+'cli.py watch --metrics-port 9109' or "metrics_port" in config.json for the
+desktop apps.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Sequence
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Metric:
+    """Base class for a named metric with optional labels"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_string(self, key: tuple, extra: Optional[Dict] = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+    def samples(self) -> List[str]:
+        """Sample lines in text exposition format"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+    def clear(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f"{self.name}{self._label_string(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment for the duration of a with-block"""
+        self.inc(1, **labels)
+        try:
+            yield
+        finally:
+            self.dec(1, **labels)
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][index] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state['count'] if state else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, {'buckets': list(s['buckets']), 'sum': s['sum'], 'count': s['count']})
+                           for key, s in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, state['buckets']):
+                cumulative += hits
+                le = _format_value(bound) if math.isinf(bound) else repr(float(bound))
+                lines.append(f"{self.name}_bucket{self._label_string(key, {'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_string(key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{self._label_string(key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if type(existing) is not cls or existing.labelnames != tuple(labelnames):
+                    raise ValueError(f"Metric '{name}' is already registered differently")
+                return existing
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def clear(self):
+        """Reset every metric's values (keeps registrations)"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+UPSTREAM_REQUESTS = REGISTRY.counter('ncaa_upstream_requests_total', "Requests sent to the NCAA API")
+UPSTREAM_ERRORS = REGISTRY.counter('ncaa_upstream_errors_total', "NCAA API requests that failed")
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge('ncaa_upstream_in_flight', "NCAA API requests currently in flight")
+UPSTREAM_SECONDS = REGISTRY.histogram('ncaa_upstream_request_seconds', "NCAA API request duration")
+UPSTREAM_COALESCED = REGISTRY.counter('ncaa_upstream_coalesced_total',
+                                      "NCAA API calls that joined an identical request already in flight", ['mode'])
+STAGE_SECONDS = REGISTRY.histogram('ncaa_stage_seconds', "Auto-update pipeline stage duration", ['stage'])
+CYCLES = REGISTRY.counter('ncaa_auto_update_cycles_total', "Auto-update cycles by outcome", ['result'])
+CHANGE_EVENTS = REGISTRY.counter('ncaa_change_events_total', "Contest changes detected between polls", ['type'])
+FRAGMENT_CACHE = REGISTRY.counter('ncaa_fragment_cache_total', "XML contest fragment cache lookups", ['result'])
+WRITES = REGISTRY.counter('ncaa_output_writes_total', "Output file saves by outcome", ['result'])
+CHANGE_LATENCY_SECONDS = REGISTRY.histogram('ncaa_change_latency_seconds',
+                                            "Score change latency from first fetch to written output", ['stage'])
+
+
+class MetricsServer:
+    """Serves a registry at /metrics from a background thread"""
+
+    def __init__(self, port: int = 9109, host: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY):
+        self.registry = registry
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _make_handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'MetricsServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> Optional[MetricsServer]:
+    """Start serving the default registry, or print why not and return None"""
+    try:
+        server = MetricsServer(port, host).start()
+    except OSError as e:
+        print(f"Could not start metrics server on port {port}: {e}")
+        return None
+    print(f"Metrics available at {server.url}")
+    return server
@@ -0,0 +1,228 @@
+"""
+Local mock of the NCAA GraphQL endpoint for offline load testing
+
+Answers the GetContests_web persisted-query request that
+NCAAAPIClient.fetch_contests sends, serving a SyntheticSlate with live score
+progression. Latency, errors and slow (trickled) bodies can be injected.
+
+Usage:
+    python mock_server.py --port 8765 --count 500 --latency-ms 150 --error-rate 0.02
+
+    client = NCAAAPIClient(base_url="http://127.0.0.1:8765/")
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+from ncaa_api import NCAAAPIClient
+from synthetic import SyntheticSlate
+
+
+def parse_variables(raw: str) -> Dict:
+    """Parse the 'variables' query parameter
+
+    fetch_contests formats missing values with Python's None, which is not
+    valid JSON, so it is accepted here as null.
+    """
+    return json.loads(re.sub(r':\s*None\b', ':null', raw))
+
+
+class MockNCAAServer:
+    """Threaded HTTP server serving a synthetic slate"""
+
+    def __init__(self, slate: Optional[SyntheticSlate] = None, host: str = '127.0.0.1', port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 tail_rate: float = 0.0, tail_latency_ms: float = 0.0,
+                 error_rate: float = 0.0, slow_body_rate: float = 0.0,
+                 slow_body_seconds: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            slate: Slate to serve (default: SyntheticSlate())
+            host: Bind address
+            port: Bind port (0 picks a free port)
+            latency_ms: Base response latency
+            jitter_ms: Uniform random extra latency
+            tail_rate: Share of requests that get tail_latency_ms instead
+            tail_latency_ms: Latency of the slow tail
+            error_rate: Share of requests answered with HTTP 500
+            slow_body_rate: Share of responses trickled out in chunks
+            slow_body_seconds: Total time a slow body takes to send
+            seed: Random seed for fault injection
+        """
+        self.slate = slate or SyntheticSlate()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_latency_ms = tail_latency_ms
+        self.error_rate = error_rate
+        self.slow_body_rate = slow_body_rate
+        self.slow_body_seconds = slow_body_seconds
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+        self.stats = {'requests': 0, 'errors': 0, 'slow_bodies': 0, 'bad_requests': 0}
+        self._stats_lock = threading.Lock()
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to give NCAAAPIClient"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _latency(self) -> float:
+        """Seconds to wait before answering"""
+        if self.tail_rate and self._random() < self.tail_rate:
+            return self.tail_latency_ms / 1000
+        return (self.latency_ms + self.jitter_ms * self._random()) / 1000
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._count('requests')
+                query = parse_qs(urlparse(self.path).query)
+                try:
+                    if query.get('meta', [''])[0] != 'GetContests_web':
+                        raise ValueError("unknown operation")
+                    extensions = json.loads(query['extensions'][0])
+                    if extensions['persistedQuery']['sha256Hash'] != NCAAAPIClient.QUERY_HASH:
+                        raise ValueError("unknown persisted query")
+                    variables = parse_variables(query['variables'][0])
+                except (KeyError, ValueError) as e:
+                    server._count('bad_requests')
+                    self._send(400, json.dumps({'errors': [{'message': str(e)}]}).encode('utf-8'))
+                    return
+
+                delay = server._latency()
+                if delay:
+                    time.sleep(delay)
+
+                if server.error_rate and server._random() < server.error_rate:
+                    server._count('errors')
+                    self._send(500, b'{"errors": [{"message": "injected error"}]}')
+                    return
+
+                body = json.dumps(server.slate.response(
+                    variables.get('sportCode'),
+                    variables.get('division') or 1,
+                    variables.get('contestDate') or ''
+                )).encode('utf-8')
+
+                slow = server.slow_body_rate and server._random() < server.slow_body_rate
+                if slow:
+                    server._count('slow_bodies')
+                self._send(200, body, slow=slow)
+
+            def _send(self, status: int, body: bytes, slow: bool = False):
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    if not slow:
+                        self.wfile.write(body)
+                        return
+                    chunks = 10
+                    size = max(1, len(body) // chunks + 1)
+                    for start in range(0, len(body), size):
+                        self.wfile.write(body[start:start + size])
+                        self.wfile.flush()
+                        time.sleep(server.slow_body_seconds / chunks)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'MockNCAAServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve on the calling thread"""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Mock NCAA GraphQL server with a synthetic slate")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--count', type=int, default=200, help="Contests in the slate")
+    parser.add_argument('--sports', nargs='+', default=['WBB', 'MBB'],
+                        help="Sport codes, optionally weighted as CODE=WEIGHT")
+    parser.add_argument('--divisions', type=int, nargs='+', default=[1])
+    parser.add_argument('--ranked-fraction', type=float, default=0.25)
+    parser.add_argument('--tick-seconds', type=float, default=10.0, help="Seconds per score tick")
+    parser.add_argument('--game-ticks', type=int, default=120, help="Ticks from tip-off to final")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--tail-rate', type=float, default=0.0)
+    parser.add_argument('--tail-latency-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--slow-body-rate', type=float, default=0.0)
+    parser.add_argument('--slow-body-seconds', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    sports = {}
+    for item in args.sports:
+        code, _, weight = item.partition('=')
+        sports[code] = float(weight) if weight else 1.0
+
+    slate = SyntheticSlate(count=args.count, sports=sports, divisions=args.divisions,
+                           ranked_fraction=args.ranked_fraction, tick_seconds=args.tick_seconds,
+                           game_ticks=args.game_ticks, seed=args.seed)
+    server = MockNCAAServer(slate, host=args.host, port=args.port,
+                            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            tail_rate=args.tail_rate, tail_latency_ms=args.tail_latency_ms,
+                            error_rate=args.error_rate, slow_body_rate=args.slow_body_rate,
+                            slow_body_seconds=args.slow_body_seconds, seed=args.seed)
+    print(f"Mock NCAA API serving {args.count} contests at {server.url}")
+    print("Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
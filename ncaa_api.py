@@ -1,7 +1,88 @@
 """NCAA API client for fetching sports event data"""
+import asyncio
+import queue
+import threading
+import time
 import requests
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Union
+
+from hedging import HedgePolicy, get_policy
+from metrics import UPSTREAM_COALESCED, UPSTREAM_ERRORS, UPSTREAM_IN_FLIGHT, UPSTREAM_REQUESTS, UPSTREAM_SECONDS
+from recording import ResponseRecorder, ResponseReplayer
+from singleflight import AsyncSingleFlight, SingleFlight
+
+# Shared by every client in the process so separate clients (e.g. one per
+# Streamlit session) coalesce identical requests too
+_FLIGHTS = SingleFlight(on_coalesced=lambda: UPSTREAM_COALESCED.inc(mode='thread'))
+_ASYNC_FLIGHTS = AsyncSingleFlight(on_coalesced=lambda: UPSTREAM_COALESCED.inc(mode='async'))
+
+# Key added to responses served from the last-known-good cache
+STALE_FIELD = '_cache'
+# Background refresh after a failed fetch: first delay, doubling per attempt
+REVALIDATE_DELAY = 2.0
+REVALIDATE_MAX_DELAY = 60.0
+REVALIDATE_ATTEMPTS = 6
+
+# Last good response per query, shared like the flights above. Least
+# recently used queries are dropped beyond LAST_GOOD_MAX_ENTRIES, and entries
+# older than LAST_GOOD_MAX_AGE are never served again, so they are dropped too
+LAST_GOOD_MAX_ENTRIES = 256
+LAST_GOOD_MAX_AGE = 24 * 60 * 60.0
+_last_good: 'OrderedDict[tuple, Dict]' = OrderedDict()
+_revalidating: Dict[tuple, list] = {}
+_cache_lock = threading.Lock()
+
+
+def _remember(key: tuple, entry: Dict):
+    """Store a query's last good response (caller holds _cache_lock)"""
+    _last_good[key] = entry
+    _last_good.move_to_end(key)
+    while len(_last_good) > LAST_GOOD_MAX_ENTRIES:
+        _last_good.popitem(last=False)
+
+
+def _recall(key: tuple) -> Optional[Dict]:
+    """A query's last good response unless expired (caller holds _cache_lock)"""
+    entry = _last_good.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry['fetched_at'] > LAST_GOOD_MAX_AGE:
+        del _last_good[key]
+        return None
+    _last_good.move_to_end(key)
+    return entry
+
+
+class ContestSnapshot:
+    """Parsed contests of one query with their age"""
+
+    __slots__ = ('contests', 'fetched_at', 'stale', 'error')
+
+    def __init__(self, contests: List[Dict], fetched_at: Optional[float], stale: bool = False,
+                 error: Optional[str] = None):
+        """
+        Args:
+            contests: Parsed contests ([] if the query never succeeded)
+            fetched_at: time.time() of the fetch that produced them (None if
+                it never succeeded)
+            stale: True if a fresher fetch failed or is still running
+            error: Why the latest fetch failed, if it did
+        """
+        self.contests = contests
+        self.fetched_at = fetched_at
+        self.stale = stale
+        self.error = error
+
+    @property
+    def age(self) -> Optional[float]:
+        """Seconds since the data was fetched"""
+        return time.time() - self.fetched_at if self.fetched_at is not None else None
+
+    @property
+    def has_data(self) -> bool:
+        return self.fetched_at is not None
 
 
 class NCAAAPIClient:
@@ -32,11 +113,52 @@ class NCAAAPIClient:
         "Division III": 3
     }
 
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None, record_path: Optional[str] = None,
+                 replay_path: Optional[str] = None, replay_speed: Optional[float] = None,
+                 hedge: Union[bool, HedgePolicy, None] = None, database=None):
+        """
+        Args:
+            base_url: Override BASE_URL, e.g. to point at mock_server.py
+            record_path: Append every raw response to this capture file
+            replay_path: Serve responses from this capture file instead of
+                the network; once a query's captures run out its last one
+                is served again, marked stale
+            replay_speed: None for as fast as possible, N for N x real time
+            hedge: Send a duplicate request when one is slow; True uses the
+                process-wide hedging.HedgePolicy (shared budget)
+            database: contest_db.ContestDatabase that every successful
+                fetch is upserted into, including responses shared with
+                another client's identical request
+        """
+        if base_url:
+            self.BASE_URL = base_url
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        self.recorder = ResponseRecorder(record_path) if record_path else None
+        self.replayer = ResponseReplayer(replay_path, replay_speed) if replay_path else None
+        self.hedge = get_policy() if hedge is True else (hedge or None)
+        self.database = database
+        # Recording and replaying clients only coalesce with themselves
+        self._flight_scope = id(self) if (self.recorder or self.replayer) else self.BASE_URL
+
+    def _flight_key(self, kind: str, sport_code: str, division: int, season_year: int,
+                    contest_date: Optional[str], week: Optional[int]) -> tuple:
+        # Only clients with the same hedge policy share a request, so a hedged
+        # client keeps its tail protection and never spends another's budget
+        hedge_scope = id(self.hedge) if self.hedge else None
+        return (kind, self._flight_scope, hedge_scope, sport_code, division, season_year, contest_date, week)
+
+    def _cache_key(self, sport_code: str, division: int, season_year: int,
+                   contest_date: Optional[str], week: Optional[int]) -> tuple:
+        """Last-good cache key; shared by clients whatever their hedge policy"""
+        return (self._flight_scope, sport_code, division, season_year, contest_date, week)
+
+    @staticmethod
+    def is_stale(response_data: Dict) -> bool:
+        """True if a response is the last good one (or empty) served after a failed fetch"""
+        return bool(response_data.get(STALE_FIELD, {}).get('stale'))
 
     def fetch_contests(self, sport_code: str, division: int = 1,
                       season_year: int = 2025, contest_date: Optional[str] = None,
@@ -44,6 +166,13 @@ class NCAAAPIClient:
         """
         Fetch contests from NCAA API
 
+        Concurrent calls with the same arguments (from clients with the same
+        hedge policy) share one request and receive the same (read-only)
+        response. If the request fails, the
+        last good response for the same arguments is returned instead,
+        with a STALE_FIELD entry giving its age and the error (use
+        is_stale()); without one the contest list is empty.
+
         Args:
             sport_code: Sport code (e.g., 'WBB', 'MBB')
             division: Division number (1, 2, or 3)
@@ -54,6 +183,162 @@ class NCAAAPIClient:
         Returns:
             Dict containing contest data
         """
+        key = self._flight_key('raw', sport_code, division, season_year, contest_date, week)
+        data = _FLIGHTS.do(key, lambda: self._fetch_contests(sport_code, division, season_year,
+                                                              contest_date, week))
+        if self.database is not None and not self.is_stale(data):
+            # Every client stores what it receives, including responses it
+            # shared with a leader that has no (or another) database
+            self._store(self._cache_key(sport_code, division, season_year, contest_date, week), data)
+        return data
+
+    def _store(self, key: tuple, data: Dict):
+        """Upsert a fresh response into this client's database"""
+        with _cache_lock:
+            entry = _last_good.get(key)
+            contests = entry['contests'] if entry and entry['response'] is data else None
+        if contests is None:
+            contests = self.parse_contests(data)
+            with _cache_lock:
+                entry = _last_good.get(key)
+                if entry and entry['response'] is data and entry['contests'] is None:
+                    entry['contests'] = contests
+        try:
+            self.database.upsert(contests)
+        except Exception as e:
+            print(f"Error saving contests to database: {e}")
+
+    def get_contests(self, sport_code: str, division: int = 1,
+                     season_year: int = 2025, contest_date: Optional[str] = None,
+                     week: Optional[int] = None) -> List[Dict]:
+        """
+        Fetch and parse contests; concurrent identical calls share one
+        request and one parsed (read-only) list. Falls back to the last good
+        contests like fetch_contests; use get_snapshot() to tell.
+        """
+        key = self._flight_key('parsed', sport_code, division, season_year, contest_date, week)
+        return _FLIGHTS.do(key, lambda: self.parse_contests(
+            self.fetch_contests(sport_code, division, season_year, contest_date, week)))
+
+    def get_snapshot(self, sport_code: str, division: int = 1,
+                     season_year: int = 2025, contest_date: Optional[str] = None,
+                     week: Optional[int] = None, max_age: Optional[float] = None,
+                     on_fresh: Optional[Callable[[ContestSnapshot], None]] = None) -> ContestSnapshot:
+        """
+        Contests for a query, falling back to the last good data on errors
+
+        Args:
+            max_age: None fetches now (waiting for the network). A number
+                answers from the last good data without waiting whenever
+                there is some, refreshing it in the background once it is
+                older than max_age seconds.
+            on_fresh: Called from a background thread with the new snapshot
+                when a background refresh succeeds
+
+        Returns:
+            ContestSnapshot; stale when the data is older than wanted or the
+            latest fetch failed (the refresh is then retried in the background)
+        """
+        args = (sport_code, division, season_year, contest_date, week)
+        if max_age is not None:
+            cached = self.cached_snapshot(*args)
+            if cached is not None:
+                if cached.age > max_age:
+                    cached.stale = True
+                    self._revalidate(args, 0.0, on_fresh)
+                return cached
+
+        response = self.fetch_contests(*args)
+        meta = response.get(STALE_FIELD)
+        if not meta:
+            return ContestSnapshot(self.parse_contests(response), time.time())
+        self._revalidate(args, REVALIDATE_DELAY, on_fresh)
+        return ContestSnapshot(self.parse_contests(response), meta['fetched_at'], True, meta['error'])
+
+    def cached_snapshot(self, sport_code: str, division: int = 1,
+                        season_year: int = 2025, contest_date: Optional[str] = None,
+                        week: Optional[int] = None) -> Optional[ContestSnapshot]:
+        """Last good data for a query without touching the network, or None"""
+        key = self._cache_key(sport_code, division, season_year, contest_date, week)
+        with _cache_lock:
+            entry = _recall(key)
+            if entry is None:
+                return None
+            if entry['contests'] is None:
+                entry['contests'] = self.parse_contests(entry['response'])
+            return ContestSnapshot(entry['contests'], entry['fetched_at'])
+
+    def _revalidate(self, args: tuple, delay: float, on_fresh: Optional[Callable[[ContestSnapshot], None]]):
+        """Refresh a query in a background thread, retrying with backoff until it succeeds"""
+        key = self._cache_key(*args)
+        with _cache_lock:
+            listeners = _revalidating.get(key)
+            if listeners is not None:
+                # Already refreshing: just hear about the result
+                if on_fresh:
+                    listeners.append(on_fresh)
+                return
+            _revalidating[key] = [on_fresh] if on_fresh else []
+
+        def run():
+            wait = delay
+            response = None
+            try:
+                for _ in range(REVALIDATE_ATTEMPTS):
+                    if wait:
+                        time.sleep(wait)
+                    response = self.fetch_contests(*args)
+                    if not self.is_stale(response):
+                        break
+                    wait = min(max(wait * 2, REVALIDATE_DELAY), REVALIDATE_MAX_DELAY)
+            finally:
+                with _cache_lock:
+                    callbacks = _revalidating.pop(key, [])
+            if response is None or self.is_stale(response):
+                return
+            snapshot = self.cached_snapshot(*args) or ContestSnapshot(self.parse_contests(response), time.time())
+            for callback in callbacks:
+                try:
+                    callback(snapshot)
+                except Exception as e:
+                    print(f"Error in refresh callback: {e}")
+
+        threading.Thread(target=run, name='ncaa-revalidate', daemon=True).start()
+
+    async def fetch_contests_async(self, sport_code: str, division: int = 1,
+                                   season_year: int = 2025, contest_date: Optional[str] = None,
+                                   week: Optional[int] = None) -> Dict:
+        """fetch_contests for asyncio callers (runs the request in a worker thread)"""
+        key = self._flight_key('raw', sport_code, division, season_year, contest_date, week)
+        return await _ASYNC_FLIGHTS.do(key, lambda: asyncio.to_thread(
+            self.fetch_contests, sport_code, division, season_year, contest_date, week))
+
+    async def get_contests_async(self, sport_code: str, division: int = 1,
+                                 season_year: int = 2025, contest_date: Optional[str] = None,
+                                 week: Optional[int] = None) -> List[Dict]:
+        """get_contests for asyncio callers"""
+        key = self._flight_key('parsed', sport_code, division, season_year, contest_date, week)
+        return await _ASYNC_FLIGHTS.do(key, lambda: asyncio.to_thread(
+            self.get_contests, sport_code, division, season_year, contest_date, week))
+
+    def _fetch_contests(self, sport_code: str, division: int, season_year: int,
+                        contest_date: Optional[str], week: Optional[int]) -> Dict:
+        """One upstream request (or replayed capture), without coalescing"""
+        variables = {'sportCode': sport_code, 'division': division, 'seasonYear': season_year,
+                     'contestDate': contest_date, 'week': week}
+
+        if self.replayer:
+            capture = self.replayer.next_response(variables)
+            if capture is None:
+                # Out of captures: keep serving the last one, marked stale, so
+                # jobs keep their output instead of writing an empty slate
+                return self._last_good_response(sport_code, division, season_year, contest_date, week,
+                                                "no captures left to replay")
+            key = self._cache_key(sport_code, division, season_year, contest_date, week)
+            with _cache_lock:
+                _remember(key, {'response': capture['response'], 'fetched_at': time.time(), 'contests': None})
+            return capture['response']
+
         params = {
             "meta": "GetContests_web",
             "extensions": f'{{"persistedQuery":{{"version":1,"sha256Hash":"{self.QUERY_HASH}"}}}}',
@@ -61,12 +346,85 @@ class NCAAAPIClient:
         }
 
         try:
+            with UPSTREAM_SECONDS.time():
+                data = self._hedged_get(params) if self.hedge else self._get(params)
+            if self.recorder:
+                self.recorder.record(variables, data)
+            key = self._cache_key(sport_code, division, season_year, contest_date, week)
+            with _cache_lock:
+                _remember(key, {'response': data, 'fetched_at': time.time(), 'contests': None})
+            return data
+        except requests.exceptions.RequestException as e:
+            UPSTREAM_ERRORS.inc()
+            print(f"Error fetching contests: {e}")
+            return self._last_good_response(sport_code, division, season_year, contest_date, week, str(e))
+
+    def _get(self, params: Dict) -> Dict:
+        """One HTTP request"""
+        UPSTREAM_REQUESTS.inc()
+        with UPSTREAM_IN_FLIGHT.track_inprogress():
             response = self.session.get(self.BASE_URL, params=params, timeout=10)
             response.raise_for_status()
             return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching contests: {e}")
-            return {"data": {"contests": []}}
+
+    def _hedged_get(self, params: Dict) -> Dict:
+        """
+        Request with a duplicate sent if no answer arrives within the
+        policy's delay; the first successful answer wins
+        """
+        policy = self.hedge
+        policy.start_request()
+        answers = queue.Queue()
+
+        def attempt(hedged: bool):
+            started = time.perf_counter()
+            try:
+                answers.put((hedged, self._get(params), None))
+            except Exception as e:
+                answers.put((hedged, None, e))
+            finally:
+                policy.observe(time.perf_counter() - started)
+
+        threading.Thread(target=attempt, args=(False,), name='ncaa-request', daemon=True).start()
+        outstanding = 1
+        try:
+            answer = answers.get(timeout=policy.delay())
+        except queue.Empty:
+            if policy.try_hedge():
+                threading.Thread(target=attempt, args=(True,), name='ncaa-hedge', daemon=True).start()
+                outstanding += 1
+            answer = answers.get()
+
+        # The loser keeps running in its thread; its answer is dropped
+        while True:
+            hedged, data, error = answer
+            outstanding -= 1
+            if error is None:
+                if hedged:
+                    policy.record_win()
+                return data
+            if not outstanding:
+                raise error
+            answer = answers.get()
+
+    def _last_good_response(self, sport_code: str, division: int, season_year: int,
+                            contest_date: Optional[str], week: Optional[int], error: str) -> Dict:
+        """Last good response for a query marked stale, or an empty one"""
+        key = self._cache_key(sport_code, division, season_year, contest_date, week)
+        with _cache_lock:
+            entry = _recall(key)
+        if entry is None:
+            return {"data": {"contests": []},
+                    STALE_FIELD: {'stale': True, 'fetched_at': None, 'age': None, 'error': error}}
+        meta = {'stale': True, 'fetched_at': entry['fetched_at'],
+                'age': time.time() - entry['fetched_at'], 'error': error}
+        return {**entry['response'], STALE_FIELD: meta}
+
+    def close(self):
+        """Close the HTTP session and any capture file"""
+        self.session.close()
+        if self.recorder:
+            self.recorder.close()
 
     def parse_contests(self, response_data: Dict) -> List[Dict]:
         """
@@ -156,6 +514,34 @@ class NCAAAPIClient:
 
         return False
 
+    def filter_contests(self, contests: List[Dict], top25_only: bool = False,
+                        conference: Optional[str] = None) -> List[Dict]:
+        """
+        Apply the Top 25 and conference filters to a list of contests
+
+        Args:
+            contests: Parsed contest dictionaries
+            top25_only: Keep only contests involving a Top 25 team
+            conference: Case-insensitive conference substring ("All" or empty to skip)
+
+        Returns:
+            Filtered list of contests
+        """
+        filtered = contests.copy()
+
+        # Top 25 filter
+        if top25_only:
+            filtered = [c for c in filtered if self.is_top_25(c)]
+
+        # Conference filter
+        conf_filter = (conference or '').strip().lower()
+        if conf_filter and conf_filter != "all":
+            filtered = [c for c in filtered if
+                       conf_filter in c.get('home_team', {}).get('conference', '').lower() or
+                       conf_filter in c.get('away_team', {}).get('conference', '').lower()]
+
+        return filtered
+
     @staticmethod
     def format_date(date_str: str) -> str:
         """Format date string to MM/DD/YYYY"""
@@ -0,0 +1,157 @@
+"""
+Background prefetch of the views a user is likely to open next
+
+After a view loads, the Today / Tomorrow / +7 dates, the neighbouring days
+and the other divisions of the current sport are fetched in the background
+so that switching to them is answered from NCAAAPIClient's last-good cache
+instead of a cold request. Prefetching is low priority: it waits until the
+foreground has been quiet for idle_delay seconds with no upstream request
+in flight, skips views that are already fresh, and spends at most `budget`
+requests per `budget_window` seconds.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from metrics import REGISTRY, UPSTREAM_IN_FLIGHT
+from ncaa_api import NCAAAPIClient
+
+# Cached views younger than this are shown without waiting on a refetch
+VIEW_MAX_AGE = 30.0
+# Shortcut offsets from today offered by the date buttons
+BUTTON_OFFSETS = (0, 1, 7)
+DEFAULT_BUDGET = 6
+DEFAULT_BUDGET_WINDOW = 60.0
+DEFAULT_IDLE_DELAY = 1.0
+DEFAULT_FRESH_FOR = 120.0
+BUSY_POLL = 0.2
+
+PREFETCHES = REGISTRY.counter('ncaa_prefetch_total',
+                              "Prefetched views by outcome (fetched, fresh, failed, over_budget)", ['result'])
+
+
+class Prefetcher:
+    """Warms the client's cache for likely next views from one background thread"""
+
+    def __init__(self, client: NCAAAPIClient, budget: int = DEFAULT_BUDGET,
+                 budget_window: float = DEFAULT_BUDGET_WINDOW, idle_delay: float = DEFAULT_IDLE_DELAY,
+                 fresh_for: float = DEFAULT_FRESH_FOR):
+        """
+        Args:
+            client: Client whose cache is warmed
+            budget: Maximum prefetch requests per budget_window
+            budget_window: Seconds the budget applies to
+            idle_delay: Quiet seconds required after a view loads
+            fresh_for: Views cached more recently than this are not refetched
+        """
+        self.client = client
+        self.budget = budget
+        self.budget_window = budget_window
+        self.idle_delay = idle_delay
+        self.fresh_for = fresh_for
+        self.stats = {'fetched': 0, 'fresh': 0, 'failed': 0, 'over_budget': 0}
+        self._pending: List[tuple] = []
+        self._requested_at = 0.0
+        self._spent = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='ncaa-prefetch', daemon=True)
+        self._thread.start()
+
+    def views_around(self, sport_code: str, division: int, season_year: int,
+                     contest_date: Optional[str], week: Optional[int] = None) -> List[tuple]:
+        """Likely next views after this one, most likely first"""
+        views = []
+        dates = []
+        today = datetime.now()
+        dates.extend((today + timedelta(days=offset)).strftime('%m/%d/%Y') for offset in BUTTON_OFFSETS)
+        try:
+            current = datetime.strptime(contest_date or '', '%m/%d/%Y')
+            dates.extend((current + timedelta(days=offset)).strftime('%m/%d/%Y') for offset in (1, -1))
+        except ValueError:
+            pass
+        for date in dates:
+            views.append((sport_code, division, season_year, date, week))
+        for other in sorted(set(NCAAAPIClient.DIVISIONS.values())):
+            if other != division:
+                views.append((sport_code, other, season_year, contest_date, week))
+
+        current_view = (sport_code, division, season_year, contest_date, week)
+        unique = []
+        for view in views:
+            if view != current_view and view not in unique:
+                unique.append(view)
+        return unique
+
+    def prefetch_around(self, sport_code: str, division: int, season_year: int,
+                        contest_date: Optional[str], week: Optional[int] = None):
+        """Replace the pending views with those around the view that just loaded"""
+        views = self.views_around(sport_code, division, season_year, contest_date, week)
+        with self._cond:
+            self._pending = views
+            self._requested_at = time.monotonic()
+            self._cond.notify()
+
+    def _take_budget(self) -> bool:
+        now = time.monotonic()
+        while self._spent and now - self._spent[0] >= self.budget_window:
+            self._spent.popleft()
+        if len(self._spent) >= self.budget:
+            return False
+        self._spent.append(now)
+        return True
+
+    def _next_view(self) -> Optional[tuple]:
+        """Wait until a view may be prefetched; None once closed"""
+        with self._cond:
+            while not self._closed:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                quiet = time.monotonic() - self._requested_at
+                if quiet < self.idle_delay:
+                    self._cond.wait(self.idle_delay - quiet)
+                    continue
+                if UPSTREAM_IN_FLIGHT.value() > 0:
+                    # Foreground requests first
+                    self._cond.wait(BUSY_POLL)
+                    continue
+                return self._pending.pop(0)
+            return None
+
+    def _record(self, result: str):
+        self.stats[result] += 1
+        PREFETCHES.inc(result=result)
+
+    def _run(self):
+        while True:
+            view = self._next_view()
+            if view is None:
+                return
+            cached = self.client.cached_snapshot(*view)
+            if cached is not None and cached.age < self.fresh_for:
+                self._record('fresh')
+                continue
+            if not self._take_budget():
+                with self._cond:
+                    dropped = len(self._pending) + 1
+                    self._pending = []
+                for _ in range(dropped):
+                    self._record('over_budget')
+                continue
+            try:
+                response = self.client.fetch_contests(*view)
+                self._record('failed' if self.client.is_stale(response) else 'fetched')
+            except Exception as e:
+                print(f"Prefetch error: {e}")
+                self._record('failed')
+
+    def close(self):
+        """Stop the background thread (pending views are dropped)"""
+        with self._cond:
+            self._closed = True
+            self._pending = []
+            self._cond.notify()
+        self._thread.join(5)
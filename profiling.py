@@ -0,0 +1,210 @@
+"""
+Opt-in profiling for long-running auto-update pollers
+
+Activated by environment variables or config.json, and off by default. When
+off, get_profiler() returns None and AutoUpdateJob skips profiling entirely.
+
+Modes (combine with commas):
+    cprofile     cProfile each sampled cycle: .prof dump plus a text summary
+    tracemalloc  Snapshot after each sampled cycle; write the top-N
+                 allocation growth since the previous snapshot
+    objects      Count live objects by type; write the top-N with deltas
+
+Environment:
+    NCAA_PROFILE=cprofile,tracemalloc,objects
+    NCAA_PROFILE_DIR=profiles        output directory (default: profiles)
+    NCAA_PROFILE_EVERY=10            profile every Nth cycle (default: 1)
+    NCAA_PROFILE_TOP=25              lines per report (default: 25)
+
+config.json:
+    "profiling": {"modes": ["tracemalloc", "objects"], "every": 60}
+"""
+import cProfile
+import gc
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+PROFILE_MODES = ('cprofile', 'tracemalloc', 'objects')
+DEFAULT_DIR = 'profiles'
+TRACEMALLOC_FRAMES = 10
+
+
+class CycleProfiler:
+    """Profiles every Nth poll cycle and writes reports to a directory"""
+
+    def __init__(self, modes: Sequence[str], output_dir: str = DEFAULT_DIR, every: int = 1, top: int = 25):
+        """
+        Args:
+            modes: Any of PROFILE_MODES
+            output_dir: Directory for reports (created if missing)
+            every: Profile one cycle in every N
+            top: Entries per text report
+        """
+        unknown = set(modes) - set(PROFILE_MODES)
+        if unknown:
+            raise ValueError(f"Unknown profile mode(s): {', '.join(sorted(unknown))}")
+        self.modes = tuple(modes)
+        self.output_dir = output_dir
+        self.every = max(1, int(every))
+        self.top = top
+        self.cycles = 0
+        self.reports = []
+
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()
+        self._previous_snapshot = None
+        self._previous_counts: Dict[str, int] = {}
+
+        os.makedirs(output_dir, exist_ok=True)
+        self._started_tracemalloc = 'tracemalloc' in self.modes and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def _path(self, kind: str, cycle: int, extension: str) -> str:
+        return os.path.join(self.output_dir, f"{kind}_{os.getpid()}_{cycle:06d}.{extension}")
+
+    def _write(self, path: str, text: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        self.reports.append(path)
+
+    @contextmanager
+    def cycle(self):
+        """Wrap one poll cycle; only every Nth cycle is profiled"""
+        with self._lock:
+            self.cycles += 1
+            cycle = self.cycles
+        if (cycle - 1) % self.every:
+            yield
+            return
+
+        # cProfile cannot profile overlapping cycles from several threads
+        profiler = None
+        if 'cprofile' in self.modes and self._cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                self._cprofile_lock.release()
+                self._dump_cprofile(profiler, cycle)
+            with self._lock:
+                if 'tracemalloc' in self.modes:
+                    self._dump_tracemalloc(cycle)
+                if 'objects' in self.modes:
+                    self._dump_objects(cycle)
+
+    def _dump_cprofile(self, profiler: cProfile.Profile, cycle: int):
+        path = self._path('cprofile', cycle, 'prof')
+        profiler.dump_stats(path)
+        self.reports.append(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(self.top)
+        self._write(self._path('cprofile', cycle, 'txt'), summary.getvalue())
+
+    def _dump_tracemalloc(self, cycle: int):
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"# cycle {cycle} at {datetime.now().isoformat(timespec='seconds')}",
+                 f"# traced current={current} peak={peak} bytes"]
+        if self._previous_snapshot is None:
+            lines.append(f"# top {self.top} allocations (first snapshot)")
+            stats = snapshot.statistics('lineno')[:self.top]
+        else:
+            lines.append(f"# top {self.top} growth since previous snapshot")
+            stats = snapshot.compare_to(self._previous_snapshot, 'lineno')[:self.top]
+        lines.extend(str(stat) for stat in stats)
+        self._previous_snapshot = snapshot
+        self._write(self._path('tracemalloc', cycle, 'txt'), '\n'.join(lines) + '\n')
+
+    def _dump_objects(self, cycle: int):
+        gc.collect()
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+        lines = [f"# cycle {cycle} at {datetime.now().isoformat(timespec='seconds')}",
+                 f"# {sum(counts.values())} tracked objects, gc counts {gc.get_count()}",
+                 f"{'type':<40}{'count':>12}{'delta':>10}"]
+        for name, count in counts.most_common(self.top):
+            delta = count - self._previous_counts.get(name, 0)
+            lines.append(f"{name:<40}{count:>12}{delta:>+10}")
+        self._previous_counts = dict(counts)
+        self._write(self._path('objects', cycle, 'txt'), '\n'.join(lines) + '\n')
+
+    def close(self):
+        """Stop tracemalloc if this profiler started it"""
+        if self._started_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracemalloc = False
+        self._previous_snapshot = None
+
+
+_profiler: Optional[CycleProfiler] = None
+_configured = False
+
+
+def parse_modes(value) -> tuple:
+    """Modes from a comma-separated string or list ('all' selects every mode)"""
+    if not value:
+        return ()
+    items = value.split(',') if isinstance(value, str) else value
+    modes = tuple(item.strip().lower() for item in items if item.strip())
+    return PROFILE_MODES if 'all' in modes else modes
+
+
+def configure_profiler(modes=None, output_dir: Optional[str] = None, every: Optional[int] = None,
+                       top: Optional[int] = None) -> Optional[CycleProfiler]:
+    """
+    Set up the process-wide profiler
+
+    Arguments left as None fall back to the NCAA_PROFILE* environment
+    variables. With no modes the profiler is disabled.
+
+    Returns:
+        The profiler, or None when disabled
+    """
+    global _profiler, _configured
+    modes = parse_modes(modes if modes is not None else os.environ.get('NCAA_PROFILE'))
+    if _profiler:
+        _profiler.close()
+    _profiler = None
+    if modes:
+        _profiler = CycleProfiler(
+            modes,
+            output_dir or os.environ.get('NCAA_PROFILE_DIR', DEFAULT_DIR),
+            every if every is not None else int(os.environ.get('NCAA_PROFILE_EVERY', 1)),
+            top if top is not None else int(os.environ.get('NCAA_PROFILE_TOP', 25)),
+        )
+        print(f"Profiling {', '.join(modes)} every {_profiler.every} cycle(s) into {_profiler.output_dir}")
+    _configured = True
+    return _profiler
+
+
+def configure_from_config(config) -> Optional[CycleProfiler]:
+    """Configure from the "profiling" section of a ConfigManager (environment wins)"""
+    if os.environ.get('NCAA_PROFILE'):
+        return configure_profiler()
+    settings = config.get('profiling') or {}
+    try:
+        return configure_profiler(settings.get('modes', ()), settings.get('dir'),
+                                  settings.get('every'), settings.get('top'))
+    except ValueError as e:
+        print(f"Profiling disabled: {e}")
+        return None
+
+
+def get_profiler() -> Optional[CycleProfiler]:
+    """The process-wide profiler (configured from the environment on first use)"""
+    if not _configured:
+        configure_profiler()
+    return _profiler
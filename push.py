@@ -0,0 +1,238 @@
+"""
+Push delivery of contest change events
+
+Change events are computed once per poll (changes.diff_contests via
+AutoUpdateJob), encoded once, and fanned out by an EventHub to every
+subscriber whose filter matches. Each subscriber has a bounded queue that
+drops its oldest events when the consumer falls behind, so one slow client
+never holds up the poller or other subscribers.
+
+The local HTTP API streams a hub to clients as Server-Sent Events at
+/events?sport=WBB&conference=SEC&ids=123,456&types=score,status
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Iterable, Optional
+
+from changes import CHANGE_TYPES
+
+# Event types pushed by default: in-game changes, not slate membership
+DEFAULT_PUSH_TYPES = ('score', 'status', 'rank')
+DEFAULT_QUEUE_SIZE = 256
+HISTORY_SIZE = 1024
+
+
+def _csv_set(value, lower: bool = False) -> frozenset:
+    if not value:
+        return frozenset()
+    items = value.split(',') if isinstance(value, str) else value
+    return frozenset(str(item).strip().lower() if lower else str(item).strip() for item in items if str(item).strip())
+
+
+class SubscriptionFilter:
+    """Which events a subscriber wants; an empty field matches everything"""
+
+    __slots__ = ('sports', 'conferences', 'contest_ids', 'types')
+
+    def __init__(self, sports=None, conferences=None, contest_ids=None, types=None):
+        """
+        Args:
+            sports: Sport codes (e.g. 'WBB'), list or comma-separated
+            conferences: Case-insensitive conference substrings, matched
+                against either team like the GUI conference filter
+            contest_ids: Contest ids
+            types: Change types (default: DEFAULT_PUSH_TYPES)
+        """
+        self.sports = _csv_set(sports)
+        self.conferences = _csv_set(conferences, lower=True)
+        self.contest_ids = _csv_set(contest_ids)
+        self.types = _csv_set(types) or frozenset(DEFAULT_PUSH_TYPES)
+        unknown = self.types - set(CHANGE_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown change type(s): {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def from_query(cls, query: Dict[str, List[str]]) -> 'SubscriptionFilter':
+        """Build from parse_qs output (sport, conference, ids, types)"""
+        def joined(key):
+            return ','.join(query.get(key, []))
+        return cls(joined('sport'), joined('conference'), joined('ids'), joined('types'))
+
+    def matches(self, event: Dict) -> bool:
+        if event['type'] not in self.types:
+            return False
+        if self.sports and event['sport'] not in self.sports:
+            return False
+        if self.contest_ids and event['contest_id'] not in self.contest_ids:
+            return False
+        if self.conferences:
+            home, away = event['home_conference'].lower(), event['away_conference'].lower()
+            return any(conf in home or conf in away for conf in self.conferences)
+        return True
+
+
+def event_payload(event: Dict) -> Dict:
+    """Compact, JSON-ready form of a changes.diff_contests event"""
+    contest = event.get('contest') or {}
+    home = contest.get('home_team', {})
+    away = contest.get('away_team', {})
+    return {
+        'type': event['type'],
+        'contest_id': event['contest_id'],
+        'sport': event['sport'],
+        'old': event.get('old'),
+        'new': event.get('new'),
+        'status': contest.get('status', ''),
+        'home': home.get('name', ''),
+        'away': away.get('name', ''),
+        'home_score': home.get('score', ''),
+        'away_score': away.get('score', ''),
+        'home_conference': home.get('conference', ''),
+        'away_conference': away.get('conference', ''),
+    }
+
+
+class PushedEvent:
+    """A published event with its sequence id and pre-encoded JSON"""
+
+    __slots__ = ('id', 'payload', 'data', 'timestamp')
+
+    def __init__(self, event_id: int, payload: Dict):
+        self.id = event_id
+        self.payload = payload
+        self.data = json.dumps(payload, separators=(',', ':'))
+        self.timestamp = time.time()
+
+    def sse(self) -> bytes:
+        """Server-Sent Events frame"""
+        return f"id: {self.id}\nevent: {self.payload['type']}\ndata: {self.data}\n\n".encode('utf-8')
+
+
+class Subscription:
+    """A subscriber's bounded queue (drop-oldest when full)"""
+
+    def __init__(self, hub: 'EventHub', event_filter: SubscriptionFilter, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.hub = hub
+        self.filter = event_filter
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+        self._queue = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def put(self, event: PushedEvent):
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1  # deque drops the oldest on append
+            self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> List[PushedEvent]:
+        """
+        Wait for events and return all queued ones
+
+        Returns:
+            Events in order ([] on timeout or once closed)
+        """
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventHub:
+    """Fans change events out to matching subscribers"""
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE, history_size: int = HISTORY_SIZE):
+        self.queue_size = queue_size
+        self.stats = {'published': 0, 'queued': 0}
+        self._closed_dropped = 0
+        self._subscribers: List[Subscription] = []
+        self._history = deque(maxlen=history_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self) -> int:
+        """Events dropped from full subscriber queues so far"""
+        with self._lock:
+            return self._closed_dropped + sum(s.dropped for s in self._subscribers)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self, event_filter: Optional[SubscriptionFilter] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        """
+        Register a subscriber
+
+        Args:
+            event_filter: Events to receive (default: all in-game changes)
+            last_event_id: Replay matching events newer than this id from
+                recent history (SSE Last-Event-ID after a reconnect)
+        """
+        subscription = Subscription(self, event_filter or SubscriptionFilter(), self.queue_size)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event.id > last_event_id and subscription.filter.matches(event.payload):
+                        subscription.put(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+                self._closed_dropped += subscription.dropped
+
+    def publish(self, events: Iterable[Dict]) -> int:
+        """
+        Encode change events once and queue them for matching subscribers
+
+        Args:
+            events: Events from changes.diff_contests / AutoUpdateJob.run_once
+
+        Returns:
+            Number of (event, subscriber) deliveries queued
+        """
+        queued = 0
+        with self._lock:
+            # Fan out under the lock so every subscriber sees events in id order
+            for event in events:
+                item = PushedEvent(next(self._ids), event_payload(event))
+                self._history.append(item)
+                self.stats['published'] += 1
+                for subscription in self._subscribers:
+                    if subscription.filter.matches(item.payload):
+                        subscription.put(item)
+                        queued += 1
+            self.stats['queued'] += queued
+        return queued
+
+    def close(self):
+        """Close every subscription (wakes streaming handlers)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,244 @@
+"""
+Network push sink for broadcast graphics engines
+
+Sends one compact frame per changed contest to TCP or UDP (unicast or
+multicast) endpoints as soon as a poll detects the change, before the
+output file is rendered and written. Sends never block the poll loop:
+UDP datagrams go out on a non-blocking socket, and each TCP endpoint has
+its own sender thread fed through a bounded drop-oldest queue, so a dead
+or slow receiver only loses frames.
+
+Frame (UTF-8 JSON, one object per contest):
+    {"seq": 42, "ts": 1767830400.123, "id": "6123456", "sport": "WBB",
+     "status": "I", "home": "...", "away": "...", "hs": "45", "as": "40",
+     "hr": "5", "ar": "", "changes": ["score"]}
+
+Framing: 'line' appends a newline; 'length' prefixes a 4-byte big-endian
+length. UDP always sends one frame per datagram.
+
+Endpoints: udp://239.10.0.1:5005, udp://10.0.0.7:5005, tcp://10.0.0.5:7000
+"""
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+from metrics import REGISTRY
+
+FRAMINGS = ('line', 'length')
+PUSH_CHANGE_TYPES = ('score', 'status', 'rank')
+TCP_QUEUE_FRAMES = 1024
+TCP_TIMEOUT = 2.0
+TCP_RECONNECT_DELAY = 1.0
+MULTICAST_TTL = 1
+
+PUSH_FRAMES = REGISTRY.counter('ncaa_push_frames_total', "Frames handed to push sink endpoints by outcome",
+                               ['transport', 'result'])
+
+_sequence = itertools.count(1)
+
+
+def contest_frame(contest: Dict, changes: Iterable[str]) -> Dict:
+    """Compact frame describing one contest's current state"""
+    home = contest.get('home_team', {})
+    away = contest.get('away_team', {})
+    return {
+        'seq': next(_sequence),
+        'ts': round(time.time(), 3),
+        'id': str(contest.get('id', '')),
+        'sport': contest.get('sport', ''),
+        'status': contest.get('status', ''),
+        'home': home.get('short_name') or home.get('name', ''),
+        'away': away.get('short_name') or away.get('name', ''),
+        'hs': home.get('score', ''),
+        'as': away.get('score', ''),
+        'hr': home.get('rank', ''),
+        'ar': away.get('rank', ''),
+        'changes': sorted(set(changes)),
+    }
+
+
+def encode_frame(frame: Dict, framing: str = 'line') -> bytes:
+    """Serialize a frame with the given framing"""
+    body = json.dumps(frame, separators=(',', ':')).encode('utf-8')
+    if framing == 'length':
+        return struct.pack('>I', len(body)) + body
+    return body + b'\n'
+
+
+def frames_for_changes(events: List[Dict], output: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    One frame per contest with in-game changes
+
+    Args:
+        events: Change events from changes.diff_contests
+        output: If given, only contests in this list are sent (the ones the
+            output file shows)
+    """
+    wanted = {str(c.get('id', '')) for c in output} if output is not None else None
+    grouped: Dict[str, Dict] = {}
+    for event in events:
+        if event['type'] not in PUSH_CHANGE_TYPES:
+            continue
+        if wanted is not None and event['contest_id'] not in wanted:
+            continue
+        entry = grouped.setdefault(event['contest_id'], {'contest': event['contest'], 'changes': []})
+        entry['changes'].append(event['type'])
+    return [contest_frame(entry['contest'], entry['changes']) for entry in grouped.values()]
+
+
+class UDPSink:
+    """Sends frames as datagrams from a non-blocking socket"""
+
+    transport = 'udp'
+
+    def __init__(self, host: str, port: int, ttl: int = MULTICAST_TTL):
+        self.address = (host, port)
+        self.sent = 0
+        self.dropped = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        if socket.inet_aton(host)[0] & 0xF0 == 0xE0:  # 224.0.0.0/4
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+            self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+
+    def send(self, payloads: List[bytes]):
+        for payload in payloads:
+            try:
+                self._sock.sendto(payload, self.address)
+                self.sent += 1
+                PUSH_FRAMES.inc(transport='udp', result='sent')
+            except OSError:
+                # Full socket buffer or unreachable network: drop, never wait
+                self.dropped += 1
+                PUSH_FRAMES.inc(transport='udp', result='dropped')
+
+    def close(self):
+        self._sock.close()
+
+
+class TCPSink:
+    """Streams frames to one TCP receiver from a background sender thread"""
+
+    transport = 'tcp'
+
+    def __init__(self, host: str, port: int, queue_frames: int = TCP_QUEUE_FRAMES,
+                 timeout: float = TCP_TIMEOUT, reconnect_delay: float = TCP_RECONNECT_DELAY):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.sent = 0
+        self.dropped = 0
+        self.connected = False
+        self._queue = deque(maxlen=queue_frames)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._sock = None
+        self._thread = threading.Thread(target=self._run, name=f"push-tcp-{host}:{port}", daemon=True)
+        self._thread.start()
+
+    def send(self, payloads: List[bytes]):
+        """Queue frames; returns immediately (oldest frames drop when full)"""
+        with self._cond:
+            for payload in payloads:
+                if len(self._queue) == self._queue.maxlen:
+                    self.dropped += 1
+                    PUSH_FRAMES.inc(transport='tcp', result='dropped')
+                self._queue.append(payload)
+            self._cond.notify()
+
+    def _connect(self) -> bool:
+        try:
+            self._sock = socket.create_connection(self.address, timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connected = True
+            return True
+        except OSError:
+            self._sock = None
+            return False
+
+    def _disconnect(self):
+        self.connected = False
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                batch = list(self._queue)
+                self._queue.clear()
+
+            if self._sock is None and not self._connect():
+                # Receiver down: these frames are stale by the time it is back
+                self.dropped += len(batch)
+                PUSH_FRAMES.inc(len(batch), transport='tcp', result='dropped')
+                with self._cond:
+                    self._cond.wait(self.reconnect_delay)
+                continue
+            try:
+                self._sock.sendall(b''.join(batch))
+                self.sent += len(batch)
+                PUSH_FRAMES.inc(len(batch), transport='tcp', result='sent')
+            except OSError:
+                self.dropped += len(batch)
+                PUSH_FRAMES.inc(len(batch), transport='tcp', result='dropped')
+                self._disconnect()
+        self._disconnect()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(self.timeout + 1)
+
+
+def create_sink(endpoint: str):
+    """Sink for a tcp://host:port or udp://host:port endpoint"""
+    url = urlparse(endpoint)
+    if url.scheme not in ('tcp', 'udp') or not url.hostname or not url.port:
+        raise ValueError(f"Invalid push endpoint '{endpoint}' (expected tcp://host:port or udp://host:port)")
+    if url.scheme == 'udp':
+        return UDPSink(socket.gethostbyname(url.hostname), url.port)
+    return TCPSink(url.hostname, url.port)
+
+
+class PushSinkGroup:
+    """Encodes change frames once and hands them to every endpoint"""
+
+    def __init__(self, endpoints: Iterable[str], framing: str = 'line'):
+        if framing not in FRAMINGS:
+            raise ValueError(f"Unknown framing '{framing}', expected one of: {', '.join(FRAMINGS)}")
+        self.framing = framing
+        self.sinks = [create_sink(endpoint) for endpoint in endpoints]
+
+    def send_changes(self, events: List[Dict], output: Optional[List[Dict]] = None) -> int:
+        """
+        Send a frame per changed contest to every endpoint without blocking
+
+        Returns:
+            Number of frames per endpoint
+        """
+        frames = frames_for_changes(events, output)
+        if not frames:
+            return 0
+        payloads = [encode_frame(frame, self.framing) for frame in frames]
+        for sink in self.sinks:
+            sink.send(payloads)
+        return len(frames)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,140 @@
+"""Record and replay raw NCAA API responses
+
+Captures are gzip-compressed NDJSON, one line per response:
+
+    {"ts": 1767830400.12, "variables": {...}, "response": {...}}
+
+A ResponseReplayer serves captures back per query in time order, either as
+fast as possible or paced at N times real time, so a recorded game day can
+be rerun through the polling, diffing and XML pipeline.
+"""
+import gzip
+import json
+import threading
+import time
+import zlib
+from typing import List, Dict, Optional
+
+
+def request_key(variables: Dict) -> str:
+    """Stable key identifying one upstream query"""
+    return json.dumps(variables, sort_keys=True)
+
+
+class ResponseRecorder:
+    """Appends raw responses to a compressed NDJSON capture file"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(file_path, 'at', encoding='utf-8')
+
+    def record(self, variables: Dict, response: Dict, timestamp: Optional[float] = None):
+        """Write one capture (flushed so the file stays readable after a crash)"""
+        line = json.dumps({'ts': timestamp if timestamp is not None else time.time(),
+                           'variables': variables, 'response': response})
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        """Close the capture file"""
+        with self._lock:
+            self._file.close()
+
+
+def load_captures(file_path: str) -> List[Dict]:
+    """
+    Read a capture file, sorted by timestamp
+
+    A truncated tail (e.g. from a crash while recording) is ignored.
+    """
+    captures = []
+    try:
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        captures.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+    except (EOFError, zlib.error, gzip.BadGzipFile):
+        pass
+    captures.sort(key=lambda c: c['ts'])
+    return captures
+
+
+class ResponseReplayer:
+    """Serves recorded responses back in time order"""
+
+    def __init__(self, file_path: str, speed: Optional[float] = None):
+        """
+        Args:
+            file_path: Capture file written by ResponseRecorder
+            speed: None or 0 to replay as fast as possible, N to pace
+                responses at N times real time
+        """
+        self.captures = load_captures(file_path)
+        self.speed = speed
+        self._lock = threading.Lock()
+
+        # query key -> capture indexes in time order
+        self._pending: Dict[str, List[int]] = {}
+        for index, capture in enumerate(self.captures):
+            self._pending.setdefault(request_key(capture['variables']), []).append(index)
+        self._cursors = {key: 0 for key in self._pending}
+        self._served = set()
+        self._position = 0
+        self._first_ts = self.captures[0]['ts'] if self.captures else 0.0
+        self._started = None
+
+    def keys(self) -> List[Dict]:
+        """Variables of every query in the capture"""
+        return [self.captures[indexes[0]]['variables'] for indexes in self._pending.values()]
+
+    def next_variables(self) -> Optional[Dict]:
+        """Variables of the earliest unserved capture (None when all are served)"""
+        with self._lock:
+            while self._position < len(self.captures) and self._position in self._served:
+                self._position += 1
+            if self._position >= len(self.captures):
+                return None
+            return self.captures[self._position]['variables']
+
+    @property
+    def finished(self) -> bool:
+        """True once every capture has been served"""
+        return self.next_variables() is None
+
+    def replay_time(self, capture: Dict) -> float:
+        """Wall-clock time (time.monotonic) at which a capture is due"""
+        return self._started + (capture['ts'] - self._first_ts) / self.speed
+
+    def next_response(self, variables: Dict) -> Optional[Dict]:
+        """
+        Return the next capture for a query, waiting for its replay time
+
+        Returns:
+            The capture dict ({'ts', 'variables', 'response'}), or None when
+            that query has no captures left
+        """
+        key = request_key(variables)
+        with self._lock:
+            indexes = self._pending.get(key)
+            cursor = self._cursors.get(key, 0)
+            if not indexes or cursor >= len(indexes):
+                return None
+            self._cursors[key] = cursor + 1
+            self._served.add(indexes[cursor])
+            capture = self.captures[indexes[cursor]]
+            if self._started is None:
+                self._started = time.monotonic()
+
+        if self.speed:
+            delay = self.replay_time(capture) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return capture
@@ -0,0 +1,244 @@
+"""Output serializers for NCAA contest data
+
+Every format renders the same contest selection and metadata from one shared
+intermediate document (see build_document), so consumers can pick the format
+they need without converting from XML.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import List, Dict, Optional, Union
+
+from file_utils import atomic_write
+from metrics import WRITES
+from xml_generator import XMLGenerator
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+CONTEST_FIELDS = ['id', 'date', 'time', 'location', 'venue', 'status', 'broadcast',
+                  'tournament', 'sport', 'division']
+TEAM_FIELDS = ['name', 'short_name', 'score', 'rank', 'conference', 'record']
+
+
+def build_document(contests: List[Dict], metadata: Dict = None) -> Dict:
+    """
+    Build the intermediate document shared by all serializers
+
+    Args:
+        contests: List of contest dictionaries
+        metadata: Optional metadata to include
+
+    Returns:
+        Dict with 'metadata' and 'contests' keys
+    """
+    meta = {key: value for key, value in (metadata or {}).items()}
+    meta['GeneratedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    return {
+        'metadata': meta,
+        'contests': [
+            dict(contest,
+                 home_team=dict(contest.get('home_team') or {}),
+                 away_team=dict(contest.get('away_team') or {}))
+            for contest in contests
+        ]
+    }
+
+
+def flatten_contest(contest: Dict) -> Dict:
+    """Flatten a contest into a single-level row (home_*/away_* team columns)"""
+    row = {key: contest.get(key, '') for key in CONTEST_FIELDS}
+    for side in ('home', 'away'):
+        team = contest.get(f'{side}_team') or {}
+        for key in TEAM_FIELDS:
+            row[f'{side}_{key}'] = team.get(key, '')
+    return row
+
+
+class Serializer:
+    """Base class for output serializers"""
+
+    name = ''
+    label = ''
+    extension = ''
+    mime_type = 'application/octet-stream'
+    binary = False
+
+    def serialize(self, document: Dict) -> Union[str, bytes]:
+        """Render an intermediate document"""
+        raise NotImplementedError
+
+
+class XMLSerializer(Serializer):
+    """Pretty-printed XML (same output as XMLGenerator)"""
+
+    name = 'xml'
+    label = 'XML files'
+    extension = '.xml'
+    mime_type = 'application/xml'
+
+    def __init__(self, generator: Optional[XMLGenerator] = None):
+        self.generator = generator or XMLGenerator()
+
+    def serialize(self, document: Dict) -> str:
+        # XMLGenerator adds its own GeneratedAt element
+        metadata = {key: value for key, value in document['metadata'].items()
+                    if key != 'GeneratedAt'}
+        return self.generator.generate_xml(document['contests'], metadata)
+
+
+class JSONSerializer(Serializer):
+    """Single JSON document"""
+
+    name = 'json'
+    label = 'JSON files'
+    extension = '.json'
+    mime_type = 'application/json'
+
+    def serialize(self, document: Dict) -> str:
+        return json.dumps(document, indent=2, default=str) + '\n'
+
+
+class NDJSONSerializer(Serializer):
+    """Newline-delimited JSON: one metadata line, then one line per contest"""
+
+    name = 'ndjson'
+    label = 'NDJSON files'
+    extension = '.ndjson'
+    mime_type = 'application/x-ndjson'
+
+    def serialize(self, document: Dict) -> str:
+        lines = [json.dumps({'metadata': document['metadata']}, default=str)]
+        lines.extend(json.dumps(contest, default=str) for contest in document['contests'])
+        return '\n'.join(lines) + '\n'
+
+
+class CSVSerializer(Serializer):
+    """One CSV row per contest; metadata is not included"""
+
+    name = 'csv'
+    label = 'CSV files'
+    extension = '.csv'
+    mime_type = 'text/csv'
+
+    def serialize(self, document: Dict) -> str:
+        output = io.StringIO()
+        columns = CONTEST_FIELDS + [f'{side}_{key}' for side in ('home', 'away') for key in TEAM_FIELDS]
+        writer = csv.DictWriter(output, fieldnames=columns, lineterminator='\n')
+        writer.writeheader()
+        for contest in document['contests']:
+            writer.writerow(flatten_contest(contest))
+        return output.getvalue()
+
+
+class MessagePackSerializer(Serializer):
+    """MessagePack encoding of the intermediate document (requires msgpack)"""
+
+    name = 'msgpack'
+    label = 'MessagePack files'
+    extension = '.msgpack'
+    mime_type = 'application/x-msgpack'
+    binary = True
+
+    def serialize(self, document: Dict) -> bytes:
+        if msgpack is None:
+            raise RuntimeError("MessagePack output requires the 'msgpack' package (pip install msgpack)")
+        return msgpack.packb(document, default=str, use_bin_type=True)
+
+
+SERIALIZERS: Dict[str, Serializer] = {}
+
+
+def register_serializer(serializer: Serializer):
+    """Register a serializer under its name"""
+    SERIALIZERS[serializer.name] = serializer
+
+
+for _serializer in (XMLSerializer(), JSONSerializer(), NDJSONSerializer(),
+                    CSVSerializer(), MessagePackSerializer()):
+    register_serializer(_serializer)
+
+
+def available_formats() -> List[str]:
+    """Return the names of the formats usable in this environment"""
+    return [name for name in SERIALIZERS if name != 'msgpack' or msgpack is not None]
+
+
+def get_serializer(fmt: str) -> Serializer:
+    """Look up a serializer by format name"""
+    try:
+        return SERIALIZERS[fmt.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown output format '{fmt}'. Choose from: {', '.join(SERIALIZERS)}")
+
+
+def file_dialog_types() -> List[tuple]:
+    """Return (label, pattern) pairs for file dialogs, XML first"""
+    types = [(SERIALIZERS[name].label, '*' + SERIALIZERS[name].extension) for name in available_formats()]
+    return types + [("All files", "*.*")]
+
+
+def format_for_path(file_path: str, default: str = 'xml') -> str:
+    """Guess the output format from a file extension"""
+    ext = os.path.splitext(file_path)[1].lower()
+    for name, serializer in SERIALIZERS.items():
+        if serializer.extension == ext:
+            return name
+    return default
+
+
+def serialize(contests: List[Dict], metadata: Dict = None, fmt: str = 'xml') -> Union[str, bytes]:
+    """
+    Render contests and metadata in the requested format
+
+    Args:
+        contests: List of contest dictionaries
+        metadata: Optional metadata to include
+        fmt: Format name (xml, json, ndjson, csv, msgpack)
+
+    Returns:
+        Rendered output (bytes for binary formats)
+    """
+    return get_serializer(fmt).serialize(build_document(contests, metadata))
+
+
+def save_output(data: Union[str, bytes], file_path: str) -> bool:
+    """Atomically save serialized output to a file"""
+    try:
+        atomic_write(file_path, data)
+        WRITES.inc(result='written')
+        return True
+    except Exception as e:
+        WRITES.inc(result='failed')
+        print(f"Error saving output: {e}")
+        return False
+
+
+def write_output(contests: List[Dict], metadata: Dict, file_path: str,
+                 generator: Optional[XMLGenerator] = None) -> bool:
+    """
+    Render contests in the format implied by the file extension and save them
+
+    XML goes through the generator so its fragment cache and change-aware
+    writes apply; other formats are serialized and written atomically.
+
+    Args:
+        contests: List of contest dictionaries
+        metadata: Metadata to include
+        file_path: Destination file (its extension selects the format)
+        generator: XMLGenerator to reuse across calls
+
+    Returns:
+        True on success
+    """
+    fmt = format_for_path(file_path)
+    if fmt == 'xml':
+        generator = generator or XMLGenerator()
+        return generator.save_to_file(generator.generate_xml(contests, metadata), file_path)
+    return save_output(serialize(contests, metadata, fmt), file_path)
@@ -0,0 +1,306 @@
+"""
+Multi-process polling sharded with SQLite leases
+
+One poller process becomes CPU-bound once every sport, division and job is
+parsing, diffing and rendering. ShardPool runs N worker processes that split
+the upstream query keys ("WBB:1:01/07/2026") between them through a lease
+table in a local SQLite file:
+
+- Every worker heartbeats and, each interval, renews its leases and claims
+  unowned or expired ones up to its fair share (keys / live workers).
+  Workers holding more than their share hand the extras back, so keys
+  rebalance as workers join.
+- A worker that dies stops renewing; its heartbeat and leases expire after
+  the lease TTL and the remaining workers claim them.
+- Each owned key runs an AutoUpdateJob writing its own output file, and every
+  fetch is upserted into one shared ContestDatabase.
+
+Leases are claimed in BEGIN IMMEDIATE transactions, so two workers never
+own a key at the same time (except for a poll already running when its
+lease expired).
+"""
+import math
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from auto_update import AutoUpdateJob
+from contest_db import ContestDatabase, iso_day
+from ncaa_api import NCAAAPIClient
+
+DEFAULT_LEASE_PATH = 'leases.db'
+DEFAULT_INTERVAL = 30.0
+# Leases and heartbeats outlive this many missed intervals
+TTL_INTERVALS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT,
+    expires REAL NOT NULL DEFAULT 0,
+    polls INTEGER NOT NULL DEFAULT 0,
+    polled REAL
+);
+CREATE TABLE IF NOT EXISTS workers (
+    owner TEXT PRIMARY KEY,
+    pid INTEGER,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_owner ON leases(owner, expires);
+"""
+
+
+def query_key(sport_code: str, division: int, contest_date: str) -> str:
+    """Lease key of one upstream query"""
+    return f"{sport_code}:{division}:{contest_date}"
+
+
+def parse_key(key: str) -> tuple:
+    """(sport code, division, contest date) of a lease key"""
+    sport_code, division, contest_date = key.split(':', 2)
+    return sport_code, int(division), contest_date
+
+
+def output_name(key: str, extension: str) -> str:
+    """File name a key's job writes, e.g. WBB_d1_2026-01-07.xml"""
+    sport_code, division, contest_date = parse_key(key)
+    day = iso_day(contest_date) or contest_date.replace('/', '-')
+    return f"{sport_code}_d{division}_{day}{extension}"
+
+
+class LeaseTable:
+    """Query key leases shared by worker processes through one SQLite file"""
+
+    def __init__(self, path: str = DEFAULT_LEASE_PATH, ttl: float = DEFAULT_INTERVAL * TTL_INTERVALS):
+        """
+        Args:
+            path: Lease database file, shared by every worker
+            ttl: Seconds a lease or heartbeat stays valid without renewal
+        """
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def set_keys(self, keys: Iterable[str]):
+        """Make exactly these keys available for leasing (existing leases on them are kept)"""
+        keys = list(keys)
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany('INSERT OR IGNORE INTO leases (key) VALUES (?)', [(key,) for key in keys])
+            self._conn.execute(f"DELETE FROM leases WHERE key NOT IN ({','.join('?' * len(keys))})"
+                               if keys else 'DELETE FROM leases', keys)
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def acquire(self, owner: str, now: Optional[float] = None) -> List[str]:
+        """
+        Heartbeat, renew owned leases and claim or release keys to reach the fair share
+
+        Returns:
+            Keys owned by this worker until now + ttl
+        """
+        now = time.time() if now is None else now
+        conn = self._conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT INTO workers (owner, pid, heartbeat) VALUES (?, ?, ?) '
+                         'ON CONFLICT(owner) DO UPDATE SET pid=excluded.pid, heartbeat=excluded.heartbeat',
+                         (owner, os.getpid(), now))
+            conn.execute('DELETE FROM workers WHERE heartbeat <= ?', (now - self.ttl,))
+            live = conn.execute('SELECT COUNT(*) FROM workers').fetchone()[0]
+            total = conn.execute('SELECT COUNT(*) FROM leases').fetchone()[0]
+            share = math.ceil(total / max(live, 1))
+
+            owned = [row[0] for row in conn.execute(
+                'SELECT key FROM leases WHERE owner = ? AND expires > ? ORDER BY key', (owner, now))]
+            if len(owned) > share:
+                extra = owned[share:]
+                owned = owned[:share]
+                conn.executemany('UPDATE leases SET owner = NULL, expires = 0 WHERE key = ?',
+                                 [(key,) for key in extra])
+            elif len(owned) < share:
+                free = [row[0] for row in conn.execute(
+                    'SELECT key FROM leases WHERE owner IS NULL OR expires <= ? ORDER BY expires, key LIMIT ?',
+                    (now, share - len(owned)))]
+                owned.extend(free)
+            conn.executemany('UPDATE leases SET owner = ?, expires = ? WHERE key = ?',
+                             [(owner, now + self.ttl, key) for key in owned])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return sorted(owned)
+
+    def mark_polled(self, key: str, now: Optional[float] = None):
+        self._conn.execute('UPDATE leases SET polls = polls + 1, polled = ? WHERE key = ?',
+                           (time.time() if now is None else now, key))
+
+    def release(self, owner: str):
+        """Hand back every lease of a worker that is shutting down"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.execute('UPDATE leases SET owner = NULL, expires = 0 WHERE owner = ?', (owner,))
+            self._conn.execute('DELETE FROM workers WHERE owner = ?', (owner,))
+            self._conn.execute('COMMIT')
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def assignments(self, now: Optional[float] = None) -> Dict[str, Dict]:
+        """Every key with its current owner (None when unowned or expired) and poll count"""
+        now = time.time() if now is None else now
+        rows = self._conn.execute('SELECT key, owner, expires, polls, polled FROM leases ORDER BY key')
+        return {key: {'owner': owner if owner and expires > now else None, 'polls': polls, 'polled': polled}
+                for key, owner, expires, polls, polled in rows}
+
+    def close(self):
+        self._conn.close()
+
+
+class ShardWorker:
+    """Polls the keys one process holds leases for"""
+
+    def __init__(self, owner: str, lease_path: str, output_dir: str, extension: str = '.xml',
+                 db_path: Optional[str] = None, base_url: Optional[str] = None,
+                 interval: float = DEFAULT_INTERVAL, season_year: int = 2025):
+        """
+        Args:
+            owner: Worker name recorded on its leases
+            lease_path: Shared lease database file
+            output_dir: Directory for every key's output file
+            extension: Output file extension (selects the format)
+            db_path: Shared ContestDatabase every fetch is stored in (optional)
+            base_url: Override the upstream URL, e.g. a mock_server.py
+            interval: Seconds between polls; leases last TTL_INTERVALS of them
+            season_year: Season year of every query
+        """
+        self.owner = owner
+        self.output_dir = output_dir
+        self.extension = extension
+        self.interval = interval
+        self.season_year = season_year
+        self.leases = LeaseTable(lease_path, interval * TTL_INTERVALS)
+        self.database = ContestDatabase(db_path) if db_path else None
+        self.client = NCAAAPIClient(base_url=base_url, database=self.database)
+        self.jobs: Dict[str, AutoUpdateJob] = {}
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _job(self, key: str) -> AutoUpdateJob:
+        job = self.jobs.get(key)
+        if job is None:
+            sport_code, division, contest_date = parse_key(key)
+            job = self.jobs[key] = AutoUpdateJob(
+                client=self.client,
+                sport_code=sport_code,
+                division=division,
+                contest_date=contest_date,
+                output_path=os.path.join(self.output_dir, output_name(key, self.extension)),
+                season_year=self.season_year,
+                metadata={'Sport': sport_code, 'Division': division, 'Date': contest_date}
+            )
+        return job
+
+    def poll_once(self) -> Dict[str, Dict]:
+        """Renew leases and run one cycle for every owned key"""
+        keys = self.leases.acquire(self.owner)
+        for key in [key for key in self.jobs if key not in keys]:
+            # Lease moved to another worker
+            del self.jobs[key]
+        results = {}
+        for key in keys:
+            try:
+                results[key] = self._job(key).run_once()
+                self.leases.mark_polled(key)
+            except Exception as e:
+                print(f"{self.owner}: {key} failed: {e}")
+        return results
+
+    def run(self, stop_event):
+        """Poll every interval until stop_event is set"""
+        while not stop_event.is_set():
+            started = time.monotonic()
+            self.poll_once()
+            stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def close(self):
+        self.leases.release(self.owner)
+        self.leases.close()
+        self.client.close()
+        if self.database:
+            self.database.close()
+
+
+def run_worker(owner: str, options: Dict):
+    """Process entry point: poll leased keys until SIGTERM or Ctrl+C"""
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    worker = ShardWorker(owner, **options)
+    try:
+        worker.run(stop_event)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+
+
+class ShardPool:
+    """Starts and stops N worker processes sharing one lease table"""
+
+    def __init__(self, keys: Iterable[str], workers: int, lease_path: str, output_dir: str, **options):
+        """
+        Args:
+            keys: Query keys to poll (see query_key)
+            workers: Number of worker processes
+            lease_path: Shared lease database file
+            output_dir: Directory for every key's output file
+            **options: Other ShardWorker options (extension, db_path,
+                base_url, interval, season_year)
+        """
+        if workers < 1:
+            raise ValueError(f"Need at least one worker, got {workers}")
+        self.keys = list(keys)
+        self.workers = workers
+        self.lease_path = lease_path
+        self.options = dict(options, lease_path=lease_path, output_dir=output_dir)
+        self.leases = LeaseTable(lease_path, options.get('interval', DEFAULT_INTERVAL) * TTL_INTERVALS)
+        self.leases.set_keys(self.keys)
+        self.processes: List[multiprocessing.Process] = []
+
+    def start(self) -> 'ShardPool':
+        for i in range(self.workers):
+            process = multiprocessing.Process(target=run_worker, name=f"ncaa-shard-{i}",
+                                              args=(f"worker-{i}", self.options), daemon=True)
+            process.start()
+            self.processes.append(process)
+        return self
+
+    def alive(self) -> int:
+        return sum(process.is_alive() for process in self.processes)
+
+    def assignments(self) -> Dict[str, Dict]:
+        return self.leases.assignments()
+
+    def stop(self, timeout: float = 10.0):
+        """Ask every worker (SIGTERM) to release its leases and exit"""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self.leases.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,507 @@
+"""
+Latest contest snapshot in shared memory for renderer processes
+
+One poller publishes each cycle's contests into a multiprocessing
+shared_memory segment; renderer processes (XML, JSON, the graphics push
+sink, ...) attach to it by name and pick up new snapshots without fetching
+upstream themselves and without a pickle round-trip through a pipe.
+
+Segment layout (little-endian, fixed 64-byte header, then the payload):
+
+    offset  size  field
+    0       4     magic b'NCAA'
+    4       2     layout version
+    6       2     flags (1: the publisher closed the segment)
+    8       8     sequence number (odd while a write is in progress)
+    16      8     payload length in bytes
+    24      8     payload capacity in bytes
+    32      8     publish time (Unix seconds, double)
+    40      8     generation (random, fixed for the segment's lifetime)
+    48      16    reserved
+    64      ...   payload
+
+Payload layout (offsets relative to the payload):
+
+    0       20    count, record size, string count, string bytes,
+                  metadata string (5 x uint32)
+    20      ...   count fixed-width contest records (RECORD)
+    ...     ...   string count x uint32 end offsets (in characters)
+    ...     ...   UTF-8 string bytes
+
+A record holds a presence bitmask, one string table index per text field
+(id, venue, status, team names, ...; equal strings are stored once, so
+status and sport are effectively codes), the division and the team scores
+and ranks as integers, and the index of a JSON string with any values that
+do not fit those slots (other keys, other types). Metadata is a small JSON
+string in the table.
+
+There is one writer. It bumps the sequence number to odd, writes the
+payload and length, then bumps it to even again (a seqlock): readers never
+lock, they retry when the number was odd or changed while they read.
+Readers unpack the records straight from the shared buffer, decode the
+string bytes once, and only build the fields they ask for
+(read(fields=...)), so a scorebug renderer reading ids, status and scores
+skips venues, broadcasts and the rest.
+
+A restarted publisher creates a new segment under the same name, which
+readers still mapping the old one would never see. Publishers set the
+closed flag before unlinking, and waiting readers also re-open the name
+every REATTACH_INTERVAL seconds; when the generation there differs they
+switch to the new segment, whose sequence numbers start over.
+"""
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional
+
+from metrics import REGISTRY
+
+DEFAULT_SEGMENT = 'ncaa_snapshot'
+# Enough for several thousand contests
+DEFAULT_SIZE = 16 * 1024 * 1024
+MAGIC = b'NCAA'
+LAYOUT_VERSION = 2
+HEADER = struct.Struct('<4sHHQQQd')
+HEADER_SIZE = 64
+SEQ = struct.Struct('<Q')
+SEQ_OFFSET = 8
+FLAGS = struct.Struct('<H')
+FLAGS_OFFSET = 6
+FLAG_CLOSED = 1
+GENERATION = struct.Struct('<Q')
+GENERATION_OFFSET = 40
+READ_RETRIES = 100
+POLL_INTERVAL = 0.05
+REATTACH_INTERVAL = 1.0
+
+# Payload field kinds: table string, int32, and decimal string stored as an
+# int32 (BLANK for '') such as scores and ranks
+TEXT, INT, DIGITS = 'I', 'i', 'd'
+BLANK = -1
+CONTEST_FIELDS = (('id', TEXT), ('date', TEXT), ('time', TEXT), ('location', TEXT), ('venue', TEXT),
+                  ('status', TEXT), ('broadcast', TEXT), ('tournament', TEXT), ('sport', TEXT),
+                  ('division', INT))
+TEAM_KEYS = ('home_team', 'away_team')
+TEAM_FIELDS = (('name', TEXT), ('short_name', TEXT), ('score', DIGITS), ('rank', DIGITS),
+               ('conference', TEXT), ('record', TEXT))
+CONTEST_KEYS = frozenset([key for key, _ in CONTEST_FIELDS] + list(TEAM_KEYS))
+TEAM_FIELD_KEYS = frozenset(key for key, _ in TEAM_FIELDS)
+# Presence bits: contest fields, then one per team dict, then each team's fields
+TEAM_BIT = len(CONTEST_FIELDS)
+TEAM_FIELD_BIT = TEAM_BIT + len(TEAM_KEYS)
+ALL_FIELDS = (1 << (TEAM_FIELD_BIT + len(TEAM_KEYS) * len(TEAM_FIELDS))) - 1
+PAYLOAD_HEADER = struct.Struct('<5I')
+RECORD = struct.Struct('<I' + ''.join('i' if kind != TEXT else 'I' for _, kind in CONTEST_FIELDS)
+                       + ''.join('i' if kind != TEXT else 'I' for _, kind in TEAM_FIELDS) * len(TEAM_KEYS)
+                       + 'I')
+# Decimal strings of small slot values, shifted by one for BLANK
+_DIGITS = [''] + [str(value) for value in range(1000)]
+_DIGITS_MAX = len(_DIGITS) - 1
+INT32_MAX = 2 ** 31 - 1
+
+# Segments created by publishers in this process
+_owned = set()
+
+SHM_PUBLISHES = REGISTRY.counter('ncaa_shm_publishes_total',
+                                 "Snapshots offered to shared memory by outcome (published, unchanged)",
+                                 ['result'])
+
+
+class SharedSnapshot:
+    """One decoded snapshot"""
+
+    __slots__ = ('seq', 'published_at', 'contests', 'metadata')
+
+    def __init__(self, seq: int, published_at: float, contests: List[Dict], metadata: Dict):
+        self.seq = seq
+        self.published_at = published_at
+        self.contests = contests
+        self.metadata = metadata
+
+
+def _encode_fields(mapping: Dict, fields: tuple, strings: Dict[str, int], values: list, extras: Dict) -> int:
+    """
+    Append the slots of fields to values and return their presence bits;
+    values that do not fit a slot go to extras
+    """
+    bits = 0
+    for bit, (key, kind) in enumerate(fields):
+        if key not in mapping:
+            values.append(0)
+            continue
+        value = mapping[key]
+        slot = None
+        if kind == TEXT:
+            if type(value) is str:
+                slot = strings.setdefault(value, len(strings))
+        elif kind == INT:
+            if type(value) is int and -INT32_MAX <= value <= INT32_MAX:
+                slot = value
+        elif value == '':
+            slot = BLANK
+        elif type(value) is str and value.isascii() and value.isdigit() and len(value) < 10 \
+                and (value[0] != '0' or value == '0'):
+            slot = int(value)
+        if slot is None:
+            values.append(0)
+            extras[key] = value
+        else:
+            values.append(slot)
+            bits |= 1 << bit
+    return bits
+
+
+def encode_snapshot(contests: List[Dict], metadata: Dict) -> bytes:
+    """Payload bytes for a snapshot (see the module docstring)"""
+    strings = {'': 0}
+    records = bytearray(RECORD.size * len(contests))
+    for n, contest in enumerate(contests):
+        values = [0]
+        extras = {}
+        contest_extras = {}
+        mask = _encode_fields(contest, CONTEST_FIELDS, strings, values, contest_extras)
+        for team_index, team_key in enumerate(TEAM_KEYS):
+            team = contest.get(team_key)
+            if isinstance(team, dict):
+                team_extras = {}
+                bits = _encode_fields(team, TEAM_FIELDS, strings, values, team_extras)
+                mask |= 1 << (TEAM_BIT + team_index)
+                mask |= bits << (TEAM_FIELD_BIT + team_index * len(TEAM_FIELDS))
+                if not TEAM_FIELD_KEYS.issuperset(team):
+                    team_extras.update((key, value) for key, value in team.items() if key not in TEAM_FIELD_KEYS)
+                if team_extras:
+                    extras[team_key] = team_extras
+            else:
+                values.extend([0] * len(TEAM_FIELDS))
+                if team_key in contest:
+                    contest_extras[team_key] = team
+        if not CONTEST_KEYS.issuperset(contest):
+            contest_extras.update((key, value) for key, value in contest.items() if key not in CONTEST_KEYS)
+        if contest_extras:
+            extras['contest'] = contest_extras
+        values[0] = mask
+        if extras:
+            text = json.dumps(extras, separators=(',', ':'), default=str)
+            values.append(strings.setdefault(text, len(strings)))
+        else:
+            values.append(0)
+        RECORD.pack_into(records, n * RECORD.size, *values)
+
+    text = json.dumps(metadata, separators=(',', ':'), default=str)
+    metadata_ref = strings.setdefault(text, len(strings))
+    ends = list(accumulate(map(len, strings)))
+    blob = ''.join(strings).encode('utf-8')
+    header = PAYLOAD_HEADER.pack(len(contests), RECORD.size, len(ends), len(blob), metadata_ref)
+    return b''.join((header, records, struct.pack(f'<{len(ends)}I', *ends), blob))
+
+
+def _group(masks: array, count: int, columns: List[tuple]) -> List[Dict]:
+    """One dict per record from (key, presence bit, values) columns"""
+    if not columns:
+        return [{} for _ in range(count)]
+    keys = [key for key, _, _ in columns]
+    bits = [bit for _, bit, _ in columns]
+    full = sum(bits)
+    rows = zip(*[values for _, _, values in columns])
+    if masks.count(ALL_FIELDS) == count:
+        # Every record has every field (the usual case for parsed contests)
+        return [dict(zip(keys, row)) for row in rows]
+    return [dict(zip(keys, row)) if mask & full == full else
+            {key: value for key, bit, value in zip(keys, bits, row) if mask & bit}
+            for mask, row in zip(masks, rows)]
+
+
+def decode_snapshot(view, fields: Optional[Iterable[str]] = None) -> tuple:
+    """
+    (contests, metadata) from payload bytes or a memoryview over them
+
+    Records are unpacked a column at a time, so only the selected fields
+    are converted.
+
+    Args:
+        fields: Contest keys to decode (None for all); 'home_team.score'
+            decodes one team field
+
+    Raises:
+        ValueError, IndexError, struct.error: Malformed (e.g. torn) payload
+    """
+    count, record_size, string_count, string_bytes, metadata_ref = PAYLOAD_HEADER.unpack_from(view, 0)
+    if record_size != RECORD.size:
+        raise ValueError(f"Unexpected record size {record_size}")
+    records_at = PAYLOAD_HEADER.size
+    index_at = records_at + count * RECORD.size
+    strings_at = index_at + string_count * 4
+    if strings_at + string_bytes > len(view):
+        raise ValueError("Payload shorter than its header says")
+    # The string bytes are decoded in one go; strings are sliced out by
+    # character offset, all at once for full reads, on use otherwise
+    ends = struct.unpack_from(f'<{string_count}I', view, index_at)
+    starts = (0,) + ends
+    blob = str(view[strings_at:strings_at + string_bytes], 'utf-8')
+    if fields is None:
+        text = [blob[start:end] for start, end in zip(starts, ends)].__getitem__
+    else:
+        def text(ref: int) -> str:
+            return blob[starts[ref]:ends[ref]]
+
+    # Every record slot is a 4-byte int
+    slots = array('i')
+    with memoryview(view) as whole, whole[records_at:index_at] as records:
+        slots.frombytes(records)
+    if sys.byteorder != 'little':
+        slots.byteswap()
+    width = RECORD.size // 4
+    masks = slots[0::width]
+
+    def column(slot: int, kind: str) -> list:
+        values = slots[slot::width]
+        if kind == TEXT:
+            return list(map(text, values))
+        if kind == DIGITS:
+            return [_DIGITS[value + 1] if value < _DIGITS_MAX else str(value) for value in values]
+        return values.tolist()
+
+    wanted = None if fields is None else set(fields)
+    contests = _group(masks, count, [
+        (key, 1 << bit, column(1 + bit, kind))
+        for bit, (key, kind) in enumerate(CONTEST_FIELDS) if wanted is None or key in wanted])
+    for team_index, team_key in enumerate(TEAM_KEYS):
+        if wanted is None or team_key in wanted:
+            team_wanted = None
+        else:
+            team_wanted = {field.split('.', 1)[1] for field in wanted if field.startswith(team_key + '.')}
+            if not team_wanted:
+                continue
+        first = 1 + len(CONTEST_FIELDS) + team_index * len(TEAM_FIELDS)
+        base = TEAM_FIELD_BIT + team_index * len(TEAM_FIELDS)
+        teams = _group(masks, count, [(key, 1 << (base + n), column(first + n, kind))
+                                      for n, (key, kind) in enumerate(TEAM_FIELDS)
+                                      if team_wanted is None or key in team_wanted])
+        team_bit = 1 << (TEAM_BIT + team_index)
+        for contest, mask, team in zip(contests, masks, teams):
+            if mask & team_bit:
+                contest[team_key] = team
+
+    for contest, ref in zip(contests, slots[width - 1::width]):
+        if not ref:
+            continue
+        extras = json.loads(text(ref))
+        for team_key in TEAM_KEYS:
+            if team_key in extras and team_key in contest:
+                contest[team_key].update((key, value) for key, value in extras[team_key].items()
+                                         if wanted is None or team_key in wanted
+                                         or f'{team_key}.{key}' in wanted)
+        for key, value in extras.get('contest', {}).items():
+            if wanted is None or key in wanted:
+                contest[key] = value
+    return contests, json.loads(text(metadata_ref))
+
+
+class SnapshotPublisher:
+    """Owns a shared memory segment and writes snapshots into it (single writer)"""
+
+    def __init__(self, name: str = DEFAULT_SEGMENT, size: int = DEFAULT_SIZE):
+        """
+        Args:
+            name: Segment name readers attach to
+            size: Segment size in bytes (header included); fixed for its lifetime
+        """
+        if size <= HEADER_SIZE:
+            raise ValueError(f"Shared snapshot size must exceed {HEADER_SIZE} bytes, got {size}")
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.name = self._shm.name
+        _owned.add(self._shm._name)
+        self.capacity = size - HEADER_SIZE
+        self.seq = 0
+        self._payload = b''
+        self.generation = int.from_bytes(os.urandom(8), 'little')
+        HEADER.pack_into(self._shm.buf, 0, MAGIC, LAYOUT_VERSION, 0, 0, 0, self.capacity, 0.0)
+        GENERATION.pack_into(self._shm.buf, GENERATION_OFFSET, self.generation)
+
+    def publish(self, contests: List[Dict], metadata: Optional[Dict] = None) -> int:
+        """
+        Write a snapshot unless it equals the current one
+
+        Returns:
+            Sequence number readers will see for it
+
+        Raises:
+            ValueError: The encoded snapshot does not fit the segment
+        """
+        payload = encode_snapshot(contests, metadata or {})
+        if payload == self._payload:
+            SHM_PUBLISHES.inc(result='unchanged')
+            return self.seq
+        if len(payload) > self.capacity:
+            raise ValueError(f"Snapshot of {len(payload)} bytes does not fit the "
+                             f"{self.capacity} byte shared segment '{self.name}'")
+
+        buf = self._shm.buf
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq + 1)
+        buf[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        HEADER.pack_into(buf, 0, MAGIC, LAYOUT_VERSION, 0, self.seq + 1, len(payload), self.capacity, time.time())
+        self.seq += 2
+        SEQ.pack_into(buf, SEQ_OFFSET, self.seq)
+        self._payload = payload
+        SHM_PUBLISHES.inc(result='published')
+        return self.seq
+
+    def publish_job(self, job) -> int:
+        """Publish an AutoUpdateJob's latest parsed contests and metadata"""
+        return self.publish(job.contests, job.metadata)
+
+    def close(self):
+        """Detach and remove the segment (attached readers keep their mapping)"""
+        FLAGS.pack_into(self._shm.buf, FLAGS_OFFSET, FLAG_CLOSED)
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        _owned.discard(self._shm._name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotReader:
+    """Attaches to a publisher's segment and decodes consistent snapshots"""
+
+    def __init__(self, name: str = DEFAULT_SEGMENT):
+        """
+        Raises:
+            FileNotFoundError: No segment with this name
+            ValueError: The segment is not a snapshot segment
+        """
+        self.name = name
+        self._shm = self._attach()
+        self.generation = GENERATION.unpack_from(self._shm.buf, GENERATION_OFFSET)[0]
+        self.stats = {'reads': 0, 'retries': 0, 'reattached': 0}
+
+    def _attach(self) -> shared_memory.SharedMemory:
+        shm = shared_memory.SharedMemory(name=self.name)
+        # Only the publisher may unlink the segment; without this the
+        # resource tracker removes it when a reader process exits
+        if shm._name not in _owned:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        magic, version = HEADER.unpack_from(shm.buf, 0)[:2]
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            shm.close()
+            raise ValueError(f"Shared memory segment '{self.name}' is not a contest snapshot")
+        return shm
+
+    @property
+    def closed(self) -> bool:
+        """True once the publisher of the attached segment closed it"""
+        return bool(FLAGS.unpack_from(self._shm.buf, FLAGS_OFFSET)[0] & FLAG_CLOSED)
+
+    def reattach(self) -> bool:
+        """
+        Switch to the segment now published under this name if it is a
+        different one (a restarted publisher)
+
+        Returns:
+            True if the reader switched segments
+        """
+        try:
+            shm = self._attach()
+        except (FileNotFoundError, ValueError):
+            # No publisher right now; keep the old mapping until one appears
+            return False
+        generation = GENERATION.unpack_from(shm.buf, GENERATION_OFFSET)[0]
+        if generation == self.generation:
+            shm.close()
+            return False
+        self._shm.close()
+        self._shm = shm
+        self.generation = generation
+        self.stats['reattached'] += 1
+        return True
+
+    @property
+    def seq(self) -> int:
+        """Current sequence number (odd while a write is in progress)"""
+        return SEQ.unpack_from(self._shm.buf, SEQ_OFFSET)[0]
+
+    def read(self, fields: Optional[Iterable[str]] = None) -> Optional[SharedSnapshot]:
+        """
+        The current snapshot, or None before the first publish
+
+        Args:
+            fields: Contest keys to decode, e.g. ('id', 'status',
+                'home_team.short_name', 'home_team.score', ...) for a
+                scorebug; None for all
+
+        Raises:
+            TimeoutError: No consistent read after READ_RETRIES attempts
+        """
+        buf = self._shm.buf
+        for _ in range(READ_RETRIES):
+            before = SEQ.unpack_from(buf, SEQ_OFFSET)[0]
+            if before & 1:
+                self.stats['retries'] += 1
+                time.sleep(0)
+                continue
+            if before == 0:
+                return None
+            length, _, published_at = HEADER.unpack_from(buf, 0)[4:]
+            decoded = None
+            with buf[HEADER_SIZE:HEADER_SIZE + length] as view:
+                try:
+                    if length <= len(view):
+                        decoded = decode_snapshot(view, fields)
+                except (ValueError, IndexError, struct.error):
+                    # Torn by a concurrent write; the sequence check retries
+                    pass
+            if SEQ.unpack_from(buf, SEQ_OFFSET)[0] != before or decoded is None:
+                self.stats['retries'] += 1
+                continue
+            self.stats['reads'] += 1
+            return SharedSnapshot(before, published_at, *decoded)
+        raise TimeoutError(f"No consistent snapshot in '{self.name}' after {READ_RETRIES} attempts")
+
+    def wait(self, after: int = 0, timeout: Optional[float] = None,
+             fields: Optional[Iterable[str]] = None) -> Optional[SharedSnapshot]:
+        """
+        Block until a snapshot newer than sequence number `after` is published
+
+        If the publisher restarts, the reader switches to its new segment and
+        returns that segment's first snapshot whatever its sequence number.
+
+        Returns:
+            The snapshot, or None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        next_check = time.monotonic() + REATTACH_INTERVAL
+        while True:
+            seq = self.seq
+            if seq > after and not seq & 1:
+                snapshot = self.read(fields)
+                if snapshot is not None and snapshot.seq > after:
+                    return snapshot
+            now = time.monotonic()
+            if self.closed or now >= next_check:
+                next_check = now + REATTACH_INTERVAL
+                if self.reattach():
+                    after = 0
+                    continue
+            if deadline is not None and now >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def close(self):
+        self._shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,122 @@
+"""
+Coalescing of identical in-flight calls ("singleflight")
+
+When several callers ask for the same key while a call for it is already
+running, only the first (the leader) runs it; the others wait and receive
+the leader's result, or its exception. Once the call finishes the key is
+forgotten, so the next request goes out fresh: nothing is cached.
+
+SingleFlight serves threads; AsyncSingleFlight serves coroutines on an
+event loop. NCAAAPIClient uses both so the GUI fetch thread, the
+auto-update thread and concurrent Streamlit sessions share one upstream
+request per (sport, division, date, ...).
+
+Results are shared between every waiter: treat them as read-only.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time across threads"""
+
+    def __init__(self, on_coalesced: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            on_coalesced: Called once for every caller that joined a call
+                already in flight (e.g. to count it in a metric)
+        """
+        self.on_coalesced = on_coalesced
+        self.stats = {'calls': 0, 'coalesced': 0}
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Return fn()'s result, sharing it with concurrent callers of the same key
+
+        Raises:
+            Whatever the leader's fn() raised, in every waiter
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['calls'] += 1
+            else:
+                call.waiters += 1
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            if self.on_coalesced:
+                self.on_coalesced()
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """Number of keys with a call currently running"""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Runs at most one task per key at a time on each event loop"""
+
+    def __init__(self, on_coalesced: Optional[Callable[[], None]] = None):
+        self.on_coalesced = on_coalesced
+        self.stats = {'calls': 0, 'coalesced': 0}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await factory()'s result, sharing it with concurrent awaiters of the same key
+
+        The shared task is shielded: a cancelled waiter does not cancel it
+        for the others.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(loop_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[loop_key] = loop.create_task(factory())
+                self.stats['calls'] += 1
+                task.add_done_callback(lambda done: self._forget(loop_key, done))
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader and self.on_coalesced:
+            self.on_coalesced()
+        return await asyncio.shield(task)
+
+    def _forget(self, loop_key: tuple, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(loop_key) is task:
+                del self._tasks[loop_key]
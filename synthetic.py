@@ -0,0 +1,148 @@
+"""Synthetic NCAA contest data for benchmarks and offline testing
+
+Contests are generated in the raw shape returned by the GetContests_web
+query, so they exercise NCAAAPIClient.parse_contests like real responses.
+"""
+import random
+import threading
+import time
+from typing import List, Dict, Optional
+
+from ncaa_api import NCAAAPIClient
+
+CONFERENCES = ['SEC', 'Big Ten', 'ACC', 'Big 12', 'Big East', 'Pac-12', 'Mountain West', 'WCC']
+STATES = ['P', 'I', 'F']
+
+
+def make_raw_team(index: int, side: str, score: int, rank: str) -> Dict:
+    """Create one team in the raw API shape"""
+    label = 'University' if side == 'home' else 'College'
+    return {
+        'names': {'full': f'{side.title()} {label} {index}', 'short': f'{side.title()} {index}'},
+        'score': str(score),
+        'rank': rank,
+        'conferences': [{'conferenceName': CONFERENCES[(index + (side == 'away')) % len(CONFERENCES)]}],
+        'currentRecord': f'{index % 20}-{index % 7}'
+    }
+
+
+def make_raw_contest(index: int, sport_code: str = 'WBB', division: int = 1,
+                     contest_date: str = '01/07/2026') -> Dict:
+    """Create one contest in the raw API shape"""
+    state = STATES[index % len(STATES)]
+    scored = state != 'P'
+    return {
+        'id': str(100000 + index),
+        'startDate': contest_date,
+        'startTime': f'{1 + index % 11}:00 PM',
+        'location': f'City {index % 50}, ST',
+        'venue': f'Arena {index}',
+        'contestState': state,
+        'broadcast': ['ESPN', 'FOX', ''][index % 3],
+        'tournament': '',
+        'sport': sport_code,
+        'division': division,
+        'home': make_raw_team(index, 'home', index % 90 if scored else 0,
+                              str(1 + index % 40) if index % 4 == 0 else ''),
+        'away': make_raw_team(index, 'away', (index * 7) % 90 if scored else 0,
+                              str(1 + (index * 3) % 40) if index % 6 == 0 else ''),
+    }
+
+
+def make_response(count: int, sport_code: str = 'WBB', division: int = 1,
+                  contest_date: str = '01/07/2026') -> Dict:
+    """Create a raw GetContests_web response with count contests"""
+    return {'data': {'contests': [make_raw_contest(i, sport_code, division, contest_date)
+                                  for i in range(count)]}}
+
+
+def make_contests(count: int) -> List[Dict]:
+    """Create count synthetic contests in parsed form"""
+    return NCAAAPIClient().parse_contests(make_response(count))
+
+
+class SyntheticSlate:
+    """
+    A configurable synthetic slate with live score progression
+
+    Every contest has a fixed start tick, game length and final score derived
+    from the seed. The slate clock either follows wall time (tick_seconds per
+    tick) or is advanced manually, and each contest moves from pre-game ('P')
+    through live ('I', scores rising towards the final) to final ('F').
+    """
+
+    def __init__(self, count: int = 50, sports: Optional[Dict[str, float]] = None,
+                 divisions: Optional[List[int]] = None, ranked_fraction: float = 0.25,
+                 tick_seconds: float = 10.0, game_ticks: int = 120, seed: int = 0):
+        """
+        Args:
+            count: Number of contests in the slate
+            sports: Sport code -> weight (default: WBB and MBB evenly)
+            divisions: Divisions contests are spread over (default: [1])
+            ranked_fraction: Share of teams with a Top 25 rank
+            tick_seconds: Wall-clock seconds per tick (0 for a manual clock)
+            game_ticks: Ticks from tip-off to final
+            seed: Random seed; equal seeds produce equal slates
+        """
+        rng = random.Random(seed)
+        sports = sports or {'WBB': 1.0, 'MBB': 1.0}
+        divisions = divisions or [1]
+        codes = list(sports)
+        weights = [sports[code] for code in codes]
+
+        self.tick_seconds = tick_seconds
+        self.game_ticks = game_ticks
+        self._started = time.monotonic()
+        self._manual_tick = 0
+        self._lock = threading.Lock()
+
+        self.contests = []
+        for i in range(count):
+            ranks = []
+            for _ in range(2):
+                ranks.append(str(rng.randint(1, 25)) if rng.random() < ranked_fraction else '')
+            self.contests.append({
+                'index': i,
+                'sport': rng.choices(codes, weights)[0],
+                'division': rng.choice(divisions),
+                'start_tick': rng.randint(-game_ticks, game_ticks),
+                'final': (rng.randint(45, 95), rng.randint(45, 95)),
+                'ranks': ranks,
+            })
+
+    def current_tick(self) -> int:
+        """Return the slate clock"""
+        if self.tick_seconds <= 0:
+            return self._manual_tick
+        return int((time.monotonic() - self._started) / self.tick_seconds) + self._manual_tick
+
+    def advance(self, ticks: int = 1):
+        """Move the slate clock forward"""
+        with self._lock:
+            self._manual_tick += ticks
+
+    def contest_state(self, contest: Dict, tick: int) -> tuple:
+        """Return (state, home score, away score) for a contest at a tick"""
+        elapsed = tick - contest['start_tick']
+        if elapsed < 0:
+            return 'P', 0, 0
+        if elapsed >= self.game_ticks:
+            return 'F', contest['final'][0], contest['final'][1]
+        progress = elapsed / self.game_ticks
+        return 'I', int(contest['final'][0] * progress), int(contest['final'][1] * progress)
+
+    def response(self, sport_code: str, division: int = 1, contest_date: str = '01/07/2026') -> Dict:
+        """Build a raw GetContests_web response for one sport and division"""
+        tick = self.current_tick()
+        contests = []
+        for contest in self.contests:
+            if contest['sport'] != sport_code or contest['division'] != division:
+                continue
+            raw = make_raw_contest(contest['index'], sport_code, division, contest_date)
+            state, home_score, away_score = self.contest_state(contest, tick)
+            raw['contestState'] = state
+            raw['home']['score'] = str(home_score) if state != 'P' else ''
+            raw['away']['score'] = str(away_score) if state != 'P' else ''
+            raw['home']['rank'], raw['away']['rank'] = contest['ranks']
+            contests.append(raw)
+        return {'data': {'contests': contests}}
@@ -0,0 +1,315 @@
+"""Precompiled output templates for broadcast graphics systems
+
+A template is a small dictionary (usually loaded from a JSON file) describing
+element names, field mapping, ordering and score formatting. compile_template
+turns it into a CompiledTemplate once; rendering a contest then only walks
+precomputed tag strings, so it can be reused every tick for every contest.
+
+Two template types are supported:
+
+    xml   Element-per-field XML. DEFAULT_TEMPLATE reproduces XMLGenerator
+          output byte for byte.
+    text  One formatted line per contest, e.g. for character generators.
+"""
+import json
+import string
+from datetime import datetime
+from typing import List, Dict, Optional, Callable
+
+from serializers import flatten_contest
+
+DEFAULT_TEMPLATE = {
+    'type': 'xml',
+    'root_element': 'NCAASports',
+    'metadata_element': 'Metadata',
+    'contests_element': 'Contests',
+    'count_attribute': 'count',
+    'contest_element': 'Contest',
+    'id_attribute': 'id',
+    # Contest fields in output order: [key, element name]
+    'fields': [[key, key.replace('_', '').title()] for key in
+               ['date', 'time', 'location', 'venue', 'status', 'broadcast',
+                'tournament', 'sport', 'division']],
+    # Teams in output order: [key, element name]
+    'teams': [['home_team', 'HomeTeam'], ['away_team', 'AwayTeam']],
+    # None keeps every team key in dictionary order
+    'team_fields': None,
+    # Score timeline (history.ScoreHistory.attach); None leaves it out
+    'history_element': 'History',
+    'history_point_element': 'Point',
+    'score_format': '{}',
+    'indent': '  ',
+}
+
+SCOREBUG_TEXT_TEMPLATE = {
+    'type': 'text',
+    'header': '',
+    'line': '{id}|{away_short_name}|{away_score}|{home_short_name}|{home_score}|{status}',
+    'footer': '',
+    'score_format': '{}',
+}
+
+# File extension of each template type's output
+TEMPLATE_EXTENSIONS = {'xml': '.xml', 'text': '.txt'}
+
+
+def escape_attribute(value) -> str:
+    """Escape an attribute value the way xml.dom.minidom writes it"""
+    return (str(value).replace('&', '&amp;').replace('<', '&lt;')
+            .replace('"', '&quot;').replace('>', '&gt;'))
+
+
+def escape_xml(value) -> str:
+    """Escape element text the way xml.dom.minidom writes it"""
+    text = str(value)
+    if '\r' in text:
+        # The XML parser normalizes line endings in the ElementTree round trip
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return escape_attribute(text)
+
+
+def default_element_name(key: str) -> str:
+    """Element name XMLGenerator derives from a dictionary key"""
+    return key.replace('_', '').title()
+
+
+class CompiledTemplate:
+    """A template compiled into render functions"""
+
+    def __init__(self, spec: Dict, render_contest: Callable[[Dict], str],
+                 render_header: Callable[[Dict, int], str], render_footer: Callable[[int], str]):
+        self.spec = spec
+        self.render_contest = render_contest
+        self.render_header = render_header
+        self.render_footer = render_footer
+
+    @property
+    def extension(self) -> str:
+        """File extension for documents rendered with this template"""
+        return TEMPLATE_EXTENSIONS[self.spec['type']]
+
+    def render_document(self, contests: List[Dict], metadata: Dict = None,
+                        fragments: Optional[List[str]] = None) -> str:
+        """
+        Render a complete document
+
+        Args:
+            contests: List of contest dictionaries
+            metadata: Optional metadata (GeneratedAt is added)
+            fragments: Pre-rendered contest fragments, e.g. from a cache
+
+        Returns:
+            Rendered document
+        """
+        meta = dict(metadata or {})
+        meta['GeneratedAt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if fragments is None:
+            fragments = [self.render_contest(contest) for contest in contests]
+        return self.render_header(meta, len(contests)) + ''.join(fragments) + self.render_footer(len(contests))
+
+
+def _compile_xml(spec: Dict) -> CompiledTemplate:
+    """Compile an xml-type template"""
+    indent = spec['indent']
+    score_format = spec['score_format']
+    contest_indent = indent * 2
+    child_indent = indent * 3
+    team_child_indent = indent * 4
+
+    contest_open = f"{contest_indent}<{spec['contest_element']} {spec['id_attribute']}=\""
+    contest_empty_close = '"/>\n'
+    contest_close = f"{contest_indent}</{spec['contest_element']}>\n"
+
+    # Precomputed (key, opening tag, closing tag) per contest field
+    fields = [(key, f'{child_indent}<{element}>', f'</{element}>\n') for key, element in spec['fields']]
+
+    # Precomputed (key, opening tag, closing tag, empty tag) per team
+    teams = [(key, f'{child_indent}<{element}>\n', f'{child_indent}</{element}>\n', f'{child_indent}<{element}/>\n')
+             for key, element in spec['teams']]
+
+    team_fields = None
+    if spec.get('team_fields') is not None:
+        team_fields = [(key, f'{team_child_indent}<{element}>', f'</{element}>\n')
+                       for key, element in spec['team_fields']]
+    dynamic_tags: Dict[str, tuple] = {}
+
+    history_element = spec.get('history_element')
+    history_open = f'{child_indent}<{history_element} leadChanges="'
+    history_close = f'{child_indent}</{history_element}>\n'
+    point_open = f"{team_child_indent}<{spec['history_point_element']} "
+
+    def format_team_value(key, value) -> str:
+        if key == 'score' and score_format != '{}':
+            return escape_xml(score_format.format(value))
+        return escape_xml(value)
+
+    def render_team(team: Dict) -> List[str]:
+        parts = []
+        if team_fields is None:
+            for key, value in team.items():
+                if value:
+                    tags = dynamic_tags.get(key)
+                    if tags is None:
+                        element = default_element_name(key)
+                        tags = dynamic_tags[key] = (f'{team_child_indent}<{element}>', f'</{element}>\n')
+                    parts.append(tags[0] + format_team_value(key, value) + tags[1])
+        else:
+            for key, open_tag, close_tag in team_fields:
+                value = team.get(key)
+                if value:
+                    parts.append(open_tag + format_team_value(key, value) + close_tag)
+        return parts
+
+    def render_history(history: Dict) -> str:
+        head = history_open + escape_attribute(history.get('lead_changes', 0)) + '"'
+        points = history.get('points', [])
+        if not points:
+            return head + '/>\n'
+        parts = [head, '>\n']
+        for point in points:
+            parts.append(point_open)
+            parts.append(' '.join(f'{key}="{escape_attribute(point.get(key, ""))}"'
+                                  for key in ('time', 'home', 'away', 'status')))
+            parts.append('/>\n')
+        parts.append(history_close)
+        return ''.join(parts)
+
+    def render_contest(contest: Dict) -> str:
+        parts = []
+        for key, open_tag, close_tag in fields:
+            value = contest.get(key)
+            if value:
+                parts.append(open_tag + escape_xml(value) + close_tag)
+
+        for key, open_tag, close_tag, empty_tag in teams:
+            team = contest.get(key)
+            if team:
+                team_parts = render_team(team)
+                if team_parts:
+                    parts.append(open_tag)
+                    parts.extend(team_parts)
+                    parts.append(close_tag)
+                else:
+                    parts.append(empty_tag)
+
+        history = contest.get('history') if history_element else None
+        if history:
+            parts.append(render_history(history))
+
+        contest_id = escape_attribute(contest.get('id', ''))
+        if not parts:
+            return contest_open + contest_id + contest_empty_close
+        return contest_open + contest_id + '">\n' + ''.join(parts) + contest_close
+
+    root_open = f"<?xml version=\"1.0\" ?>\n<{spec['root_element']}>\n"
+    root_close = f"</{spec['root_element']}>\n"
+    meta_open = f"{indent}<{spec['metadata_element']}>\n"
+    meta_close = f"{indent}</{spec['metadata_element']}>\n"
+    contests_element = spec['contests_element']
+    count_attribute = spec['count_attribute']
+
+    def render_header(metadata: Dict, count: int) -> str:
+        parts = [root_open, meta_open]
+        for key, value in metadata.items():
+            text = escape_xml(value)
+            if text:
+                parts.append(f'{indent * 2}<{key}>{text}</{key}>\n')
+            else:
+                parts.append(f'{indent * 2}<{key}/>\n')
+        parts.append(meta_close)
+        if count:
+            parts.append(f'{indent}<{contests_element} {count_attribute}="{count}">\n')
+        else:
+            parts.append(f'{indent}<{contests_element} {count_attribute}="0"/>\n')
+        return ''.join(parts)
+
+    def render_footer(count: int) -> str:
+        if count:
+            return f'{indent}</{contests_element}>\n' + root_close
+        return root_close
+
+    return CompiledTemplate(spec, render_contest, render_header, render_footer)
+
+
+class _BlankMissing(dict):
+    """Format mapping that renders metadata a document does not have as ''"""
+
+    def __missing__(self, key):
+        return ''
+
+
+def _check_fields(text: str, part: str, known: Optional[set] = None):
+    """
+    Raise ValueError for a malformed format string, fields that are not
+    plain names or, when known is given, fields outside it
+    """
+    try:
+        fields = [field_name for _, field_name, _, _ in string.Formatter().parse(text)]
+    except ValueError as e:
+        raise ValueError(f"Invalid text template {part}: {e}") from None
+    for field_name in fields:
+        if field_name is None:
+            continue
+        if not field_name.isidentifier() or (known is not None and field_name not in known):
+            raise ValueError(f"Unknown field '{field_name}' in text template {part}")
+
+
+def _compile_text(spec: Dict) -> CompiledTemplate:
+    """Compile a text-type template"""
+    line = spec['line']
+    score_format = spec['score_format']
+    header = spec['header']
+    footer = spec['footer']
+
+    # Validate the field names once, at compile time. The header may use any
+    # metadata key plus count; the footer only gets count
+    _check_fields(line, 'line', set(flatten_contest({})))
+    _check_fields(header, 'header')
+    _check_fields(footer, 'footer', {'count'})
+    line_format = (line + '\n').format_map
+
+    def render_contest(contest: Dict) -> str:
+        row = flatten_contest(contest)
+        if score_format != '{}':
+            for key in ('home_score', 'away_score'):
+                if row[key] != '':
+                    row[key] = score_format.format(row[key])
+        return line_format(row)
+
+    def render_header(metadata: Dict, count: int) -> str:
+        return header.format_map(_BlankMissing(metadata, count=count)) if header else ''
+
+    def render_footer(count: int) -> str:
+        return footer.format_map({'count': count}) if footer else ''
+
+    return CompiledTemplate(spec, render_contest, render_header, render_footer)
+
+
+def compile_template(spec: Optional[Dict] = None) -> CompiledTemplate:
+    """
+    Compile a template specification
+
+    Missing keys are taken from the defaults for the template type, so a
+    template only needs to list what it changes.
+
+    Args:
+        spec: Template dictionary (None for DEFAULT_TEMPLATE)
+
+    Returns:
+        CompiledTemplate ready to render contests
+    """
+    spec = spec or {}
+    template_type = spec.get('type', 'xml')
+    if template_type == 'xml':
+        merged = dict(DEFAULT_TEMPLATE, **spec)
+        return _compile_xml(merged)
+    if template_type == 'text':
+        merged = dict(SCOREBUG_TEXT_TEMPLATE, **spec)
+        return _compile_text(merged)
+    raise ValueError(f"Unknown template type '{template_type}'")
+
+
+def load_template(file_path: str) -> CompiledTemplate:
+    """Load and compile a JSON template file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return compile_template(json.load(f))
@@ -18,6 +18,81 @@ def test_config_manager():
     print("✓ ConfigManager working")
 
 
+def test_config_buffered_reload():
+    """Test debounced atomic config writes and external edit reload"""
+    print("\nTesting buffered config and hot reload...")
+    import json
+    import os
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'config.json')
+        config = ConfigManager(path, flush_delay=0.2, reload_interval=0)
+
+        # A burst of set() calls is one background write
+        for i in range(5):
+            config.set('update_interval', 10 + i)
+        assert config.dirty and not os.path.exists(path)
+        deadline = time.monotonic() + 5
+        while config.dirty and time.monotonic() < deadline:
+            time.sleep(0.05)
+        with open(path, 'r') as f:
+            assert json.load(f)['update_interval'] == 14
+        assert [name for name in os.listdir(tmp_dir)] == ['config.json']
+
+        # External edits are picked up and reported; our own write is not
+        assert not config.reload_if_changed()
+        changes = []
+        config.on_change(changes.append)
+        time.sleep(0.01)
+        with open(path, 'w') as f:
+            json.dump({**config.config, 'update_interval': 5, 'default_sport': 'MBB'}, f)
+        assert config.get('update_interval') == 5 and config.get('default_sport') == 'MBB'
+        assert changes == [{'update_interval': 5, 'default_sport': 'MBB'}]
+
+        # Unflushed local changes win over the reloaded file
+        config.set('last_save_directory', '/tmp/a')
+        with open(path, 'w') as f:
+            json.dump({**config.config, 'last_save_directory': '/tmp/b', 'update_interval': 7, 'x': 1}, f)
+        assert config.reload_if_changed()
+        assert config.get('last_save_directory') == '/tmp/a' and config.get('update_interval') == 7
+        config.close()
+        with open(path, 'r') as f:
+            assert json.load(f)['last_save_directory'] == '/tmp/a'
+
+        # A flush does not overwrite an edit made before the next reload check
+        config = ConfigManager(path, flush_delay=0, reload_interval=3600)
+        time.sleep(0.01)
+        with open(path, 'w') as f:
+            json.dump({**config.config, 'default_sport': 'WVB'}, f)
+        config.set('update_interval', 45)
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        assert saved['default_sport'] == 'WVB' and saved['update_interval'] == 45
+        assert config.config['default_sport'] == 'WVB'
+        config.close()
+
+        # Open managers are flushed at exit; dropped ones are not kept alive
+        import gc
+        import config_manager
+        config = ConfigManager(path, flush_delay=3600, reload_interval=3600)
+        config.set('update_interval', 90)
+        config_manager._flush_all()
+        with open(path, 'r') as f:
+            assert json.load(f)['update_interval'] == 90
+        assert config in config_manager._managers
+        config.close()
+        assert config not in config_manager._managers
+        before = len(config_manager._managers)
+        for _ in range(20):
+            ConfigManager(path)
+        gc.collect()
+        assert len(config_manager._managers) == before
+
+    print("✓ Buffered config and hot reload working")
+
+
 def test_ncaa_api():
     """Test NCAA API client"""
     print("\nTesting NCAA API Client...")
@@ -74,6 +149,1415 @@ def test_xml_generator():
     print("  - Pretty printing enabled")
 
 
+def test_xml_fragment_cache():
+    """Test incremental XML assembly from cached contest fragments"""
+    print("\nTesting XML fragment cache...")
+    generator = XMLGenerator()
+
+    contests = [
+        {'id': str(i), 'venue': f'Arena {i}',
+         'home_team': {'name': f'Home {i}', 'score': '0'},
+         'away_team': {'name': f'Away {i}', 'score': '0'}}
+        for i in range(5)
+    ]
+
+    first = generator.generate_xml(contests, {'Sport': 'Test'})
+    assert generator.cache_stats == {'hits': 0, 'misses': 5}, generator.cache_stats
+
+    # Only the contest whose score moved is re-serialized
+    contests[2] = dict(contests[2], home_team={'name': 'Home 2', 'score': '3'})
+    second = generator.generate_xml(contests, {'Sport': 'Test'})
+    assert generator.cache_stats == {'hits': 4, 'misses': 6}, generator.cache_stats
+    assert '<Score>3</Score>' in second and '<Score>3</Score>' not in first
+
+    # Output matches a full-document minidom render
+    import xml.etree.ElementTree as ET
+    root = ET.Element('NCAASports')
+    meta = ET.SubElement(root, 'Metadata')
+    ET.SubElement(meta, 'Sport').text = 'Test'
+    ET.SubElement(meta, 'GeneratedAt').text = 'now'
+    contests_elem = ET.SubElement(root, 'Contests')
+    contests_elem.set('count', str(len(contests)))
+    for contest in contests:
+        generator._add_contest(contests_elem, contest)
+    from xml.dom import minidom
+    full = minidom.parseString(ET.tostring(root, encoding='unicode')).toprettyxml(indent='  ')
+    strip = lambda xml: [l for l in xml.splitlines() if 'GeneratedAt' not in l]
+    assert strip(second) == strip(full), "Cached output differs from full render"
+
+    # Alternating documents on one generator keep their fragments
+    other = [dict(c, id=f'other-{c["id"]}') for c in contests]
+    generator.generate_xml(other)
+    hits = generator.cache_stats['hits']
+    assert generator.generate_xml(contests, {'Sport': 'Test'}).count('<Contest ') == 5
+    generator.generate_xml(other)
+    assert generator.cache_stats['hits'] == hits + 10, generator.cache_stats
+
+    # Least recently used fragments are dropped beyond the limit
+    generator.FRAGMENT_CACHE_MAX_ENTRIES = 5
+    generator.generate_xml(other)
+    assert len(generator._fragment_cache) == 5
+    generator.generate_xml(contests)
+    assert generator.cache_stats['hits'] == hits + 15, generator.cache_stats
+
+    # Threads sharing a generator (manual save plus auto-update) get their own documents
+    import threading
+    shared = XMLGenerator()
+    expected = {id(doc): XMLGenerator().generate_xml(doc) for doc in (contests, other)}
+    mismatches = []
+
+    def render(doc):
+        for _ in range(50):
+            if strip(shared.generate_xml(doc)) != strip(expected[id(doc)]):
+                mismatches.append(id(doc))
+
+    threads = [threading.Thread(target=render, args=(doc,)) for doc in (contests, other) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not mismatches
+
+    print("✓ XML fragment cache working")
+
+
+def test_xml_change_aware_save():
+    """Test atomic XML writes that skip unchanged payloads"""
+    print("\nTesting change-aware XML save...")
+    import os
+    import tempfile
+
+    generator = XMLGenerator()
+    contest = {'id': '1', 'home_team': {'name': 'Home', 'score': '0'}}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'scores.xml')
+
+        xml_string = generator.generate_xml([contest], {'LastUpdated': 'first'})
+        assert generator.save_to_file(xml_string, path)
+
+        # Only volatile metadata differs: the write is skipped
+        xml_string = generator.generate_xml([contest], {'LastUpdated': 'second'})
+        assert generator.save_to_file(xml_string, path)
+        assert generator.write_stats == {'written': 1, 'skipped': 1}, generator.write_stats
+        with open(path, encoding='utf-8') as f:
+            assert 'first' in f.read(), "Unchanged payload was rewritten"
+
+        # A score change is written
+        contest['home_team']['score'] = '2'
+        xml_string = generator.generate_xml([contest], {'LastUpdated': 'third'})
+        assert generator.save_to_file(xml_string, path)
+        assert generator.write_stats == {'written': 2, 'skipped': 1}, generator.write_stats
+
+        # A fresh generator compares against the file on disk
+        other = XMLGenerator()
+        assert other.save_to_file(xml_string, path)
+        assert other.write_stats == {'written': 0, 'skipped': 1}, other.write_stats
+
+        # A file that cannot be decoded counts as changed and is replaced
+        with open(path, 'wb') as f:
+            f.write(b'\xff\xfe not utf-8')
+        assert other.save_to_file(xml_string, path)
+        assert other.write_stats == {'written': 1, 'skipped': 1}, other.write_stats
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == xml_string
+
+        assert os.listdir(tmp_dir) == ['scores.xml'], "Temporary files left behind"
+
+    print("✓ Change-aware XML save working")
+
+
+def test_serializers():
+    """Test JSON/NDJSON/CSV output from the shared intermediate form"""
+    print("\nTesting output serializers...")
+    import contextlib
+    import csv
+    import io
+    import json
+    from serializers import available_formats, format_for_path, serialize
+
+    contests = [{
+        'id': 'test123',
+        'venue': 'Test Arena',
+        'home_team': {'name': 'Home Team', 'score': '75', 'rank': '5'},
+        'away_team': {'name': 'Away Team', 'score': '70'}
+    }]
+    metadata = {'Sport': 'Test', 'TotalEvents': 1}
+
+    for fmt in ('xml', 'json', 'ndjson', 'csv'):
+        assert fmt in available_formats(), f"{fmt} serializer missing"
+
+    document = json.loads(serialize(contests, metadata, 'json'))
+    assert document['metadata']['Sport'] == 'Test'
+    assert document['contests'][0]['home_team']['score'] == '75'
+
+    lines = serialize(contests, metadata, 'ndjson').splitlines()
+    assert len(lines) == 2 and json.loads(lines[1])['id'] == 'test123'
+
+    rows = list(csv.DictReader(io.StringIO(serialize(contests, metadata, 'csv'))))
+    assert rows[0]['home_name'] == 'Home Team' and rows[0]['away_score'] == '70'
+
+    assert '<Venue>Test Arena</Venue>' in serialize(contests, metadata, 'xml')
+    assert format_for_path('scores.ndjson') == 'ndjson'
+    assert format_for_path('scores.txt') == 'xml'
+
+    # The CLI only offers formats usable here
+    from cli import build_parser
+    for fmt in ('json', 'msgpack'):
+        try:
+            with contextlib.redirect_stderr(io.StringIO()):
+                args = build_parser().parse_args(['export', '--format', fmt])
+            assert args.format in available_formats()
+        except SystemExit:
+            assert fmt not in available_formats()
+
+    print("✓ Serializers working")
+    print(f"  - Formats: {', '.join(available_formats())}")
+
+
+def test_output_templates():
+    """Test precompiled output templates"""
+    print("\nTesting output templates...")
+    import re
+    from templates import compile_template
+
+    contests = [
+        {'id': 'a&1', 'date': '01/07/2026', 'venue': 'Arena "One" <North>',
+         'home_team': {'name': 'Home', 'score': 0, 'rank': '5', 'record': '10-2'},
+         'away_team': {'name': 'Away', 'score': '7'}},
+        {'id': '2'},
+    ]
+    metadata = {'Sport': "Women's Basketball", 'TotalEvents': 2}
+    strip = lambda xml: re.sub(r'<GeneratedAt>[^<]*</GeneratedAt>', '', xml)
+
+    # Default template is byte-identical to the built-in generator
+    expected = XMLGenerator().generate_xml(contests, metadata)
+    templated = XMLGenerator(template=compile_template()).generate_xml(contests, metadata)
+    assert strip(templated) == strip(expected), "Default template output differs"
+
+    # Including score timelines
+    timeline = {'lead_changes': 1, 'dropped': 0, 'points': [
+        {'time': '2026-01-07T19:00:00', 'home': '', 'away': '', 'status': 'P'},
+        {'time': '2026-01-07T19:05:00', 'home': '2', 'away': '0', 'status': 'I'},
+        {'time': '2026-01-07T19:09:00', 'home': '2', 'away': '3', 'status': 'I'}]}
+    with_history = [dict(contests[0], history=timeline), dict(contests[1], history={'lead_changes': 0, 'points': []})]
+    expected = XMLGenerator().generate_xml(with_history, metadata)
+    templated = XMLGenerator(template=compile_template()).generate_xml(with_history, metadata)
+    assert '<Point time="2026-01-07T19:09:00" home="2" away="3" status="I"/>' in expected
+    assert strip(templated) == strip(expected), "Default template output differs with history"
+    renamed = compile_template({'history_element': 'Timeline', 'history_point_element': 'Score'})
+    assert '<Timeline leadChanges="1">' in renamed.render_contest(with_history[0])
+    assert '<Score time=' in renamed.render_contest(with_history[0])
+    assert 'History' not in compile_template({'history_element': None}).render_contest(with_history[0])
+
+    # Custom element names, ordering and score formatting
+    template = compile_template({
+        'contest_element': 'Game',
+        'fields': [['venue', 'Arena']],
+        'teams': [['away_team', 'Visitor'], ['home_team', 'Home']],
+        'team_fields': [['score', 'Pts'], ['name', 'Team']],
+        'score_format': '{:>3}',
+    })
+    fragment = template.render_contest(contests[0])
+    assert '<Game id="a&amp;1">' in fragment
+    assert fragment.index('<Visitor>') < fragment.index('<Home>')
+    assert '<Pts>  7</Pts>' in fragment and '<Team>Away</Team>' in fragment
+
+    text = compile_template({'type': 'text', 'line': '{away_name} {away_score} @ {home_name} {home_score}'})
+    assert text.render_contest(contests[0]) == 'Away 7 @ Home 0\n'
+
+    # Header and footer fields are checked when compiling, like the line
+    text = compile_template({'type': 'text', 'header': '{Sport} ({count}) {Missing}\n', 'footer': '{count} games\n'})
+    document = text.render_document(contests, dict(metadata, count='ignored'))
+    assert document.startswith("Women's Basketball (2) \n") and document.endswith('2 games\n')
+    for bad in ({'header': '{0}'}, {'header': '{Sport'}, {'footer': '{Sport}'}, {'line': '{home_name.upper}'}):
+        try:
+            compile_template(dict(bad, type='text'))
+            assert False, f"{bad} should not compile"
+        except ValueError:
+            pass
+
+    print("✓ Output templates working")
+
+
+def test_batch_export():
+    """Test parallel multi-file export"""
+    print("\nTesting batch export...")
+    import os
+    import tempfile
+    from batch_export import BatchExporter, export_batch, split_selection
+
+    contests = [{'id': str(i), 'sport': ['WBB', 'MBB'][i % 2],
+                 'home_team': {'name': f'Home {i}', 'score': '0'}} for i in range(6)]
+
+    assert list(split_selection(contests, 'sport')) == ['sport_WBB', 'sport_MBB']
+    # Ids sanitizing to the same name keep separate files
+    assert list(split_selection([{'id': ''}, {'id': 'unknown'}, {'id': '?'}, {'id': ''}])) == \
+        ['contest_unknown', 'contest_unknown_2', 'contest_unknown_3']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        exporter = BatchExporter(tmp_dir, split_by='contest', workers=3)
+        try:
+            summary = exporter.export(contests, {'Sport': 'Test'})
+            assert summary['documents'] == 6 and summary['written'] == 6, summary
+            assert sorted(os.listdir(tmp_dir)) == [f'contest_{i}.xml' for i in range(6)]
+            assert all(f['render_seconds'] >= 0 and f['error'] is None for f in summary['files'])
+
+            # Second tick with one score change rewrites only that file
+            contests[4] = dict(contests[4], home_team={'name': 'Home 4', 'score': '2'})
+            summary = exporter.export(contests, {'Sport': 'Test'})
+            assert summary['written'] == 1 and summary['skipped'] == 5, summary
+        finally:
+            exporter.close()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        summary = export_batch(contests, tmp_dir, split_by='sport', template_spec={'type': 'text'})
+        assert summary['failed'] == 0, summary
+        assert sorted(os.listdir(tmp_dir)) == ['sport_MBB.txt', 'sport_WBB.txt']
+
+    print("✓ Batch export working")
+
+
+def test_benchmark_suite():
+    """Test the pipeline benchmark suite and baseline comparison"""
+    print("\nTesting benchmark suite...")
+    import copy
+    from benchmark import compare, run_suite
+
+    suite = run_suite([10], repeat=1)
+    stages = {r['stage'] for r in suite['results']}
+    assert {'parse', 'is_top_25', 'filter', 'render_cold', 'write'} <= stages, stages
+    assert all(r['peak_bytes'] >= 0 and r['seconds'] >= 0 for r in suite['results'])
+
+    assert not any(row['regression'] for row in compare(suite, suite))
+
+    slower = copy.deepcopy(suite)
+    slower['results'][0]['seconds'] *= 2
+    rows = compare(suite, slower, threshold=0.25)
+    assert rows[0]['regression'] and not any(row['regression'] for row in rows[1:])
+
+    print("✓ Benchmark suite working")
+
+
+def test_mock_server():
+    """Test the local mock NCAA GraphQL server"""
+    print("\nTesting mock NCAA server...")
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    slate = SyntheticSlate(count=30, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=10, seed=3)
+    with MockNCAAServer(slate) as server:
+        client = NCAAAPIClient(base_url=server.url)
+        before = client.parse_contests(client.fetch_contests('WBB', 1, 2025, '01/07/2026'))
+        assert len(before) == 30, len(before)
+        assert all(c['sport'] == 'WBB' and c['date'] == '01/07/2026' for c in before)
+
+        # Scores only move forward as the slate clock advances
+        slate.advance(20)
+        after = client.parse_contests(client.fetch_contests('WBB', 1, 2025, '01/07/2026'))
+        assert all(c['status'] == 'F' for c in after)
+        assert after != before
+
+        assert client.parse_contests(client.fetch_contests('MBB', 1, 2025, '01/07/2026')) == []
+        assert server.stats['requests'] == 3 and server.stats['bad_requests'] == 0
+
+    with MockNCAAServer(error_rate=1.0) as server:
+        client = NCAAAPIClient(base_url=server.url)
+        response = client.fetch_contests('WBB')
+        assert client.parse_contests(response) == [] and client.is_stale(response)
+        assert server.stats['errors'] == 1
+
+    print("✓ Mock NCAA server working")
+
+
+def test_record_replay():
+    """Test recording responses from the mock server and replaying them"""
+    print("\nTesting record/replay...")
+    import os
+    import tempfile
+    from auto_update import AutoUpdateJob
+    from changes import diff_contests
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        capture = os.path.join(tmp_dir, 'capture.ndjson.gz')
+        slate = SyntheticSlate(count=10, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=6, seed=5)
+        with MockNCAAServer(slate) as server:
+            client = NCAAAPIClient(base_url=server.url, record_path=capture)
+            live = []
+            for _ in range(4):
+                live.append(client.parse_contests(client.fetch_contests('WBB', 1, 2025, '01/07/2026')))
+                slate.advance(2)
+            client.close()
+        assert client.recorder.count == 4
+
+        # Replay as fast as possible through the auto-update pipeline
+        replay_client = NCAAAPIClient(replay_path=capture)
+        output = os.path.join(tmp_dir, 'replay.xml')
+        job = AutoUpdateJob(replay_client, 'WBB', 1, '01/07/2026', output, metadata={'Sport': 'WBB'})
+        results = []
+        while replay_client.replayer.next_variables() is not None:
+            results.append(job.run_once())
+        assert len(results) == 4 and replay_client.replayer.finished
+        assert job.contests == live[-1]
+        assert results[0]['events'] == [] and results[0]['written']
+        assert any(e['type'] == 'score' for r in results[1:] for e in r['events'])
+        assert all(r['written'] for r in results[1:] if r['events'])
+
+        # Exhausted replays keep serving the last capture, marked stale, instead
+        # of blocking or blanking the output
+        response = replay_client.fetch_contests('WBB', 1, 2025, '01/07/2026')
+        assert replay_client.is_stale(response) and replay_client.parse_contests(response) == live[-1]
+        with open(output, 'rb') as f:
+            written = f.read()
+        result = job.run_once()
+        assert result['stale'] and not result['written'] and result['events'] == []
+        assert job.contests == live[-1]
+        with open(output, 'rb') as f:
+            assert f.read() == written
+        response = replay_client.fetch_contests('MBB', 1, 2025, '01/07/2026')
+        assert replay_client.is_stale(response) and replay_client.parse_contests(response) == []
+
+    a = {'id': '1', 'status': 'I', 'home_team': {'score': '10', 'rank': ''}, 'away_team': {'score': '8', 'rank': '5'}}
+    b = {'id': '1', 'status': 'F', 'home_team': {'score': '12', 'rank': ''}, 'away_team': {'score': '8', 'rank': '5'}}
+    c = {'id': '2', 'status': 'P', 'home_team': {}, 'away_team': {}}
+    assert diff_contests(None, [a]) == []
+    assert [e['type'] for e in diff_contests([a], [b])] == ['score', 'status']
+    assert [e['type'] for e in diff_contests([a], [c])] == ['added', 'removed']
+
+    print("✓ Record/replay working")
+
+
+def test_load_harness():
+    """Test the load-test harness against an in-process mock"""
+    print("\nTesting load harness...")
+    from loadtest import percentile, run_level
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    assert percentile(list(range(1, 101)), 50) == 50
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile([], 95) is None
+
+    slate = SyntheticSlate(count=20, sports={'WBB': 1.0}, tick_seconds=0)
+    with MockNCAAServer(slate) as server:
+        for mode in ('session', 'job'):
+            result = run_level(server.url, sessions=3, duration=0.3, mode=mode)
+            assert result['cycles'] > 0 and result['empty_cycles'] == 0
+            assert result['latency_p50'] <= result['latency_p95'] <= result['latency_p99']
+            assert result['upstream_requests_per_second'] > 0 and result['cpu_seconds'] >= 0
+        # Sessions polling the same slate at once share upstream requests
+        assert 0 < server.stats['requests'] <= result['cycles'] * 2
+        assert result['upstream_requests_per_second'] * result['seconds'] <= result['cycles']
+
+    print("✓ Load harness working")
+
+
+def test_metrics():
+    """Test pipeline metrics and the /metrics endpoint"""
+    print("\nTesting metrics...")
+    import os
+    import tempfile
+    import urllib.request
+    from auto_update import AutoUpdateJob
+    from metrics import MetricsRegistry, MetricsServer, REGISTRY
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    registry = MetricsRegistry()
+    hist = registry.histogram('demo_seconds', "Demo", ['stage'], buckets=(0.1, 1.0))
+    hist.observe(0.05, stage='a')
+    hist.observe(0.5, stage='a')
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{stage="a"} 2' in text
+
+    REGISTRY.clear()
+    slate = SyntheticSlate(count=10, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=6, seed=2)
+    with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate) as mock:
+        client = NCAAAPIClient(base_url=mock.url)
+        job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', os.path.join(tmp_dir, 'out.xml'))
+        job.run_once()
+        job.run_once()
+        slate.advance(2)
+        job.run_once()
+
+    server = MetricsServer(port=0).start()
+    try:
+        with urllib.request.urlopen(server.url) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            text = response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+    assert 'ncaa_upstream_requests_total 3' in text
+    assert 'ncaa_upstream_in_flight 0' in text
+    assert 'ncaa_stage_seconds_count{stage="render"} 3' in text
+    assert 'ncaa_output_writes_total{result="skipped"} 1' in text
+    assert 'ncaa_output_writes_total{result="written"} 2' in text
+    assert REGISTRY.get('ncaa_fragment_cache_total').value(result='hit') >= 10
+    assert 'ncaa_change_events_total{type="score"}' in text
+
+    print("✓ Metrics working")
+
+
+def test_profiling():
+    """Test opt-in cycle profiling"""
+    print("\nTesting profiling hooks...")
+    import os
+    import tempfile
+    import tracemalloc
+    from auto_update import AutoUpdateJob
+    from mock_server import MockNCAAServer
+    from profiling import CycleProfiler, configure_profiler, get_profiler
+    from synthetic import SyntheticSlate
+
+    # Disabled unless configured: jobs get no profiler at all
+    assert configure_profiler(modes=()) is None and get_profiler() is None
+
+    slate = SyntheticSlate(count=10, sports={'WBB': 1.0}, tick_seconds=0, seed=4)
+    with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate) as mock:
+        profile_dir = os.path.join(tmp_dir, 'profiles')
+        profiler = CycleProfiler(('cprofile', 'tracemalloc', 'objects'), profile_dir, every=2, top=5)
+        try:
+            client = NCAAAPIClient(base_url=mock.url)
+            job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', os.path.join(tmp_dir, 'out.xml'),
+                                profiler=profiler)
+            for _ in range(3):
+                job.run_once()
+        finally:
+            profiler.close()
+        assert not tracemalloc.is_tracing()
+
+        names = sorted(os.listdir(profile_dir))
+        assert len(names) == 8, names  # cycles 1 and 3: .prof, cprofile/tracemalloc/objects .txt
+        assert all(name.endswith(('_000001.prof', '_000001.txt', '_000003.prof', '_000003.txt')) for name in names)
+        growth = [n for n in names if n.startswith('tracemalloc') and n.endswith('_000003.txt')][0]
+        with open(os.path.join(profile_dir, growth), 'r', encoding='utf-8') as f:
+            assert 'growth since previous snapshot' in f.read()
+
+    print("✓ Profiling hooks working")
+
+
+def test_change_latency():
+    """Test end-to-end score change latency tracking"""
+    print("\nTesting change latency tracking...")
+    import os
+    import tempfile
+    from auto_update import AutoUpdateJob
+    from latency import ChangeLatencyTracker
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    slate = SyntheticSlate(count=12, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=8, seed=6)
+    with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate, latency_ms=5) as mock:
+        client = NCAAAPIClient(base_url=mock.url)
+        job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', os.path.join(tmp_dir, 'out.xml'))
+        score_changes = 0
+        for _ in range(4):
+            result = job.run_once()
+            score_changes += sum(1 for e in result['events'] if e['type'] == 'score')
+            slate.advance(2)
+
+    summary = job.latency.summary()
+    assert score_changes > 0 and summary['total']['count'] == score_changes
+    assert all(summary[stage]['count'] == score_changes for stage in ('fetch', 'parse', 'render', 'write'))
+    assert summary['fetch']['p50'] >= 0.005
+    assert summary['total']['p50'] >= summary['fetch']['p50'] and job.latency.pending == 0
+
+    # A failed write keeps the change pending; the next good write reports it
+    tracker = ChangeLatencyTracker()
+    event = {'type': 'score', 'contest_id': '7'}
+    marks = {'started': 0.0, 'fetched': 0.1, 'parsed': 0.2, 'filtered': 0.3, 'rendered': 0.4, 'finished': 0.5}
+    tracker.observe([event], [{'id': 7}], marks, ok=False)
+    assert tracker.pending == 1 and tracker.summary()['total']['count'] == 0
+    tracker.observe([], [{'id': 7}], {**marks, 'started': 10.0, 'finished': 10.5}, ok=True)
+    assert tracker.pending == 0 and tracker.summary()['total']['max'] == 10.5
+    tracker.observe([{'type': 'score', 'contest_id': '8'}], [{'id': 7}], marks, ok=True)
+    assert tracker.summary()['total']['count'] == 1  # contest 8 is not in the output
+
+    print("✓ Change latency tracking working")
+
+
+def test_http_api():
+    """Test the local contest API: ETags, gzip and in-memory serving"""
+    print("\nTesting local HTTP API...")
+    import gzip
+    import json
+    import os
+    import tempfile
+    import urllib.error
+    import urllib.request
+    from auto_update import AutoUpdateJob
+    from http_api import ContestAPIServer, SnapshotStore
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    def get(url, headers=None):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), e.read()
+
+    store = SnapshotStore()
+    slate = SyntheticSlate(count=15, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=6, seed=8)
+    with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate) as mock, ContestAPIServer(store, 0) as api:
+        client = NCAAAPIClient(base_url=mock.url)
+        job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', os.path.join(tmp_dir, 'scores.xml'))
+        job.run_once()
+        store.publish_job('scores', job)
+        upstream_requests = mock.stats['requests']
+
+        status, headers, body = get(f"{api.url}/jobs/scores/output.xml")
+        assert status == 200 and headers['Content-Type'].startswith('application/xml')
+        with open(os.path.join(tmp_dir, 'scores.xml'), 'rb') as f:
+            assert body == f.read()
+        etag = headers['ETag']
+
+        status, headers, _ = get(f"{api.url}/jobs/scores/output.xml", {'If-None-Match': etag})
+        assert status == 304 and headers['ETag'] == etag
+
+        status, headers, gz = get(f"{api.url}/jobs/scores/output.xml", {'Accept-Encoding': 'gzip'})
+        assert headers['Content-Encoding'] == 'gzip' and gzip.decompress(gz) == body
+        assert get(f"{api.url}/jobs/scores/output.xml", {'If-None-Match': headers['ETag']})[0] == 304
+
+        status, _, contests = get(f"{api.url}/jobs/scores/contests.json")
+        assert status == 200 and len(json.loads(contests)) == 15
+        assert json.loads(get(f"{api.url}/jobs")[2])['jobs'][0]['output'] == '/jobs/scores/output.xml'
+        assert get(f"{api.url}/jobs/missing/contests.json")[0] == 404
+
+        # An unchanged slate keeps the ETag even though LastUpdated moved on
+        job.run_once()
+        store.publish_job('scores', job)
+        assert get(f"{api.url}/jobs/scores/output.xml", {'If-None-Match': etag})[0] == 304
+        slate.advance(2)
+        job.run_once()
+        store.publish_job('scores', job)
+        assert get(f"{api.url}/jobs/scores/output.xml", {'If-None-Match': etag})[0] == 200
+
+        # Serving never reaches upstream
+        assert mock.stats['requests'] == upstream_requests + 2
+        assert api.stats['not_modified'] == 3
+
+    print("✓ Local HTTP API working")
+
+
+def test_push_events():
+    """Test change event fan-out and the SSE stream"""
+    print("\nTesting push delivery...")
+    import http.client
+    import json
+    from http_api import ContestAPIServer, SnapshotStore
+    from push import EventHub, SubscriptionFilter
+
+    def event(contest_id, sport='WBB', change='score', conference='SEC'):
+        contest = {'id': contest_id, 'status': 'I',
+                   'home_team': {'name': 'Home', 'score': '10', 'conference': conference},
+                   'away_team': {'name': 'Away', 'score': '8', 'conference': 'ACC'}}
+        return {'type': change, 'contest_id': contest_id, 'sport': sport, 'old': None, 'new': None,
+                'contest': contest}
+
+    hub = EventHub(queue_size=3)
+    sec = hub.subscribe(SubscriptionFilter(conferences='sec'))
+    mbb = hub.subscribe(SubscriptionFilter(sports='MBB', types='score,status'))
+    one = hub.subscribe(SubscriptionFilter(contest_ids=['2']))
+    hub.publish([event('1'), event('2', conference='Big Ten'), event('3', sport='MBB', change='added')])
+    assert [e.payload['contest_id'] for e in sec.get(0)] == ['1']
+    assert mbb.get(0) == []  # 'added' is not a subscribed type
+    assert [e.payload['contest_id'] for e in one.get(0)] == ['2']
+
+    # A slow subscriber keeps only the newest queue_size events
+    hub.publish([event(str(i)) for i in range(10, 15)])
+    assert [e.payload['contest_id'] for e in sec.get(0)] == ['12', '13', '14'] and sec.dropped == 2
+    late = hub.subscribe(SubscriptionFilter(contest_ids='2'), last_event_id=0)
+    assert [e.payload['contest_id'] for e in late.get(0)] == ['2']
+    for subscription in (sec, mbb, one, late):
+        subscription.close()
+    assert hub.subscriber_count == 0
+
+    with ContestAPIServer(SnapshotStore(), 0, hub=hub) as api:
+        host, port = api.url.split('//')[1].split(':')
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        conn.request('GET', '/events?sport=WBB&ids=21')
+        response = conn.getresponse()
+        assert response.status == 200 and response.getheader('Content-Type').startswith('text/event-stream')
+        assert response.readline() == b'retry: 3000\n' and response.readline() == b'\n'
+        hub.publish([event('20'), event('21'), event('21', sport='MBB')])
+        lines = [response.readline() for _ in range(3)]
+        assert lines[1] == b'event: score\n'
+        assert json.loads(lines[2][len(b'data: '):])['contest_id'] == '21'
+        conn.close()
+
+        bad = http.client.HTTPConnection(host, int(port), timeout=5)
+        bad.request('GET', '/events?types=bogus')
+        assert bad.getresponse().status == 400
+
+    print("✓ Push delivery working")
+
+
+def test_push_sink():
+    """Test TCP/UDP push frames and non-blocking sends"""
+    print("\nTesting push sink...")
+    import json
+    import os
+    import socket
+    import struct
+    import tempfile
+    import time
+    from auto_update import AutoUpdateJob
+    from mock_server import MockNCAAServer
+    from push_sink import PushSinkGroup
+    from synthetic import SyntheticSlate
+
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.bind(('127.0.0.1', 0))
+    udp.settimeout(5)
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    listener.settimeout(5)
+    dead = socket.socket()
+    dead.bind(('127.0.0.1', 0))
+    dead_port = dead.getsockname()[1]
+    dead.close()  # nothing listens here
+
+    endpoints = [f"udp://127.0.0.1:{udp.getsockname()[1]}", f"tcp://127.0.0.1:{listener.getsockname()[1]}",
+                 f"tcp://127.0.0.1:{dead_port}"]
+    sink = PushSinkGroup(endpoints, framing='length')
+    slate = SyntheticSlate(count=8, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=6, seed=9)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate) as mock:
+            client = NCAAAPIClient(base_url=mock.url)
+            job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', os.path.join(tmp_dir, 'out.xml'), push_sink=sink)
+            job.run_once()
+            slate.advance(2)
+            started = time.perf_counter()
+            result = job.run_once()
+            # The dead receiver must not hold up the cycle
+            assert time.perf_counter() - started < 1.0
+        changed = {e['contest_id'] for e in result['events'] if e['type'] in ('score', 'status', 'rank')}
+        assert changed
+
+        datagrams = [json.loads(udp.recv(65535)[4:]) for _ in changed]
+        assert {frame['id'] for frame in datagrams} == changed
+        assert all('score' in frame['changes'] or 'status' in frame['changes'] for frame in datagrams)
+
+        conn, _ = listener.accept()
+        conn.settimeout(5)
+        stream = b''
+        frames = []
+        while len(frames) < len(changed):
+            stream += conn.recv(65535)
+            while len(stream) >= 4 and len(stream) >= 4 + struct.unpack('>I', stream[:4])[0]:
+                size = struct.unpack('>I', stream[:4])[0]
+                frames.append(json.loads(stream[4:4 + size]))
+                stream = stream[4 + size:]
+        assert {frame['id'] for frame in frames} == changed
+        assert frames[0]['hs'] == job.contests[[c['id'] for c in job.contests].index(frames[0]['id'])]['home_team']['score']
+        conn.close()
+    finally:
+        sink.close()
+        udp.close()
+        listener.close()
+    assert sink.sinks[2].dropped == len(changed) and sink.sinks[2].sent == 0
+
+    print("✓ Push sink working")
+
+
+def test_singleflight():
+    """Test that identical concurrent requests share one upstream call"""
+    print("\nTesting request coalescing...")
+    import asyncio
+    import threading
+    from metrics import UPSTREAM_COALESCED
+    from mock_server import MockNCAAServer
+    from singleflight import SingleFlight
+    from synthetic import SyntheticSlate
+
+    flight = SingleFlight()
+    try:
+        flight.do('key', lambda: 1 / 0)
+        assert False, "leader error should propagate"
+    except ZeroDivisionError:
+        pass
+    assert flight.in_flight() == 0 and flight.do('key', lambda: 7) == 7
+
+    slate = SyntheticSlate(count=6, sports={'WBB': 1.0}, seed=4)
+    with MockNCAAServer(slate, latency_ms=300) as mock:
+        clients = [NCAAAPIClient(base_url=mock.url) for _ in range(2)]
+        coalesced = UPSTREAM_COALESCED.value(mode='thread')
+        results = []
+        start = threading.Barrier(8)
+
+        def worker(index):
+            start.wait()
+            results.append(clients[index % 2].get_contests('WBB', 1, 2025, '01/07/2026'))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert mock.stats['requests'] == 1
+        assert len(results) == 8 and all(r is results[0] for r in results) and len(results[0]) == 6
+        assert UPSTREAM_COALESCED.value(mode='thread') == coalesced + 7
+
+        # A different date is a different request
+        clients[0].fetch_contests('WBB', 1, 2025, '01/08/2026')
+        assert mock.stats['requests'] == 2
+
+        async def gather():
+            return await asyncio.gather(*(clients[0].get_contests_async('WBB', 1, 2025, '01/07/2026')
+                                          for _ in range(5)))
+
+        async_coalesced = UPSTREAM_COALESCED.value(mode='async')
+        parsed = asyncio.run(gather())
+        assert mock.stats['requests'] == 3
+        assert all(r is parsed[0] for r in parsed) and len(parsed[0]) == 6
+        assert UPSTREAM_COALESCED.value(mode='async') == async_coalesced + 4
+
+        # Finished calls are not cached
+        clients[1].fetch_contests('WBB', 1, 2025, '01/07/2026')
+        assert mock.stats['requests'] == 4
+        for client in clients:
+            client.close()
+
+    print("✓ Request coalescing working")
+
+
+def test_stale_fallback():
+    """Test last-known-good fallback and background revalidation"""
+    print("\nTesting stale-while-revalidate...")
+    import os
+    import tempfile
+    import threading
+    import time
+    import ncaa_api
+    from auto_update import AutoUpdateJob
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    slate = SyntheticSlate(count=6, sports={'WBB': 1.0}, tick_seconds=0, seed=12)
+    delay = ncaa_api.REVALIDATE_DELAY
+    ncaa_api.REVALIDATE_DELAY = 0.05
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir, MockNCAAServer(slate) as mock:
+            client = NCAAAPIClient(base_url=mock.url)
+            output_path = os.path.join(tmp_dir, 'out.xml')
+            job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', output_path)
+            assert job.run_once()['stale'] is None
+            snapshot = client.get_snapshot('WBB', 1, 2025, '01/07/2026')
+            assert not snapshot.stale and len(snapshot.contests) == 6 and snapshot.age < 5
+            with open(output_path, 'rb') as f:
+                written = f.read()
+
+            # Upstream down: last good data, marked stale, instead of nothing
+            mock.error_rate = 1.0
+            response = client.fetch_contests('WBB', 1, 2025, '01/07/2026')
+            assert client.is_stale(response) and len(client.parse_contests(response)) == 6
+            assert response[ncaa_api.STALE_FIELD]['age'] >= 0
+
+            result = job.run_once()
+            assert result['stale'] and not result['written'] and result['selected'] == 6
+            assert len(job.contests) == 6
+            with open(output_path, 'rb') as f:
+                assert f.read() == written
+
+            empty = client.get_snapshot('WBB', 1, 2025, '01/08/2026')
+            assert empty.stale and not empty.has_data and empty.contests == [] and empty.error
+
+            fresh = []
+            arrived = threading.Event()
+            stale = client.get_snapshot('WBB', 1, 2025, '01/07/2026',
+                                        on_fresh=lambda snap: (fresh.append(snap), arrived.set()))
+            assert stale.stale and stale.error and len(stale.contests) == 6
+            mock.error_rate = 0.0
+            assert arrived.wait(5)
+            assert not fresh[0].stale and fresh[0].age < 1
+
+            # Cached reads never wait on the network; old data refreshes behind them
+            requests = mock.stats['requests']
+            cached = client.get_snapshot('WBB', 1, 2025, '01/07/2026', max_age=60)
+            assert not cached.stale and mock.stats['requests'] == requests
+            time.sleep(0.02)
+            old = client.get_snapshot('WBB', 1, 2025, '01/07/2026', max_age=0.01)
+            assert old.stale and not old.error
+            deadline = time.time() + 5
+            while mock.stats['requests'] == requests and time.time() < deadline:
+                time.sleep(0.01)
+            assert mock.stats['requests'] == requests + 1
+
+            assert not job.run_once()['stale']
+
+            # The cache is bounded: old data expires, least recently used queries go first
+            max_entries, max_age = ncaa_api.LAST_GOOD_MAX_ENTRIES, ncaa_api.LAST_GOOD_MAX_AGE
+            try:
+                ncaa_api.LAST_GOOD_MAX_AGE = 0.0
+                time.sleep(0.01)
+                assert client.cached_snapshot('WBB', 1, 2025, '01/07/2026') is None
+                ncaa_api.LAST_GOOD_MAX_AGE = max_age
+                ncaa_api.LAST_GOOD_MAX_ENTRIES = 2
+                for day in ('01/07/2026', '01/08/2026', '01/09/2026'):
+                    client.fetch_contests('WBB', 1, 2025, day)
+                assert len(ncaa_api._last_good) == 2
+                assert client.cached_snapshot('WBB', 1, 2025, '01/07/2026') is None
+                assert client.cached_snapshot('WBB', 1, 2025, '01/09/2026') is not None
+            finally:
+                ncaa_api.LAST_GOOD_MAX_ENTRIES, ncaa_api.LAST_GOOD_MAX_AGE = max_entries, max_age
+            client.close()
+    finally:
+        ncaa_api.REVALIDATE_DELAY = delay
+
+    print("✓ Stale-while-revalidate working")
+
+
+def test_hedged_requests():
+    """Test hedging slow upstream requests within the budget"""
+    print("\nTesting hedged requests...")
+    import threading
+    import time
+    from hedging import UPSTREAM_HEDGES, HedgePolicy
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    class SlowOnDemand(MockNCAAServer):
+        slow = 0
+
+        def _latency(self):
+            with self._stats_lock:
+                if self.slow:
+                    self.slow -= 1
+                    return 1.0
+            return 0.005
+
+    class FixedDelay(HedgePolicy):
+        """Hedge delay set by the test instead of observed latencies"""
+        fixed = 5.0
+
+        def delay(self):
+            return self.fixed
+
+    def wait_for(condition):
+        deadline = time.time() + 10
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    # The delay follows the latency percentile, within its bounds
+    adaptive = HedgePolicy(pct=95, initial_delay=0.5, min_samples=5)
+    assert adaptive.delay() == 0.5
+    for latency in (0.1, 0.1, 0.1, 0.2, 0.3):
+        adaptive.observe(latency)
+    assert 0.2 <= adaptive.delay() <= 0.3
+    for _ in range(200):
+        adaptive.observe(0.001)
+    assert adaptive.delay() == adaptive.min_delay
+
+    policy = FixedDelay(max_ratio=0.5, burst=1)
+    slate = SyntheticSlate(count=4, sports={'WBB': 1.0}, seed=8)
+    with SlowOnDemand(slate) as mock:
+        client = NCAAAPIClient(base_url=mock.url, hedge=policy)
+        # Answers well within the delay are never hedged
+        for _ in range(10):
+            assert len(client.parse_contests(client.fetch_contests('WBB', 1, 2025, '01/07/2026'))) == 4
+        assert policy.stats['sent'] == 0 and mock.stats['requests'] == 10
+
+        won = UPSTREAM_HEDGES.value(result='won')
+        policy.fixed = 0.1
+        mock.slow = 1
+        started = time.perf_counter()
+        contests = client.parse_contests(client.fetch_contests('WBB', 1, 2025, '01/07/2026'))
+        assert time.perf_counter() - started < 0.5 and len(contests) == 4
+        assert policy.stats['sent'] == 1 and policy.stats['won'] == 1
+        assert UPSTREAM_HEDGES.value(result='won') == won + 1
+        # The slow original still finishes in the background
+        assert wait_for(lambda: len(policy._latencies) == 12)
+        assert mock.stats['requests'] == 12
+
+        # No budget: the slow request is waited out
+        capped = FixedDelay(max_ratio=0.0, burst=0)
+        capped.fixed = 0.05
+        client.hedge = capped
+        mock.slow = 1
+        started = time.perf_counter()
+        client.fetch_contests('WBB', 1, 2025, '01/07/2026')
+        assert time.perf_counter() - started >= 1.0
+        assert capped.stats['skipped'] == 1 and capped.stats['sent'] == 0
+        assert mock.stats['requests'] == 13
+        summary = policy.summary()
+        assert summary['hedge_rate'] == 1 / 11 and summary['win_rate'] == 1.0
+        client.close()
+
+        # Hedged and plain clients never share a request
+        plain = NCAAAPIClient(base_url=mock.url)
+        own = FixedDelay(max_ratio=0.5, burst=1)
+        hedged = NCAAAPIClient(base_url=mock.url, hedge=own)
+        mock.slow = 1
+        leader = threading.Thread(target=plain.fetch_contests, args=('WBB', 1, 2025, '01/07/2026'))
+        leader.start()
+        assert wait_for(lambda: mock.stats['requests'] == 14)
+        hedged.fetch_contests('WBB', 1, 2025, '01/07/2026')
+        leader.join()
+        assert own.stats['requests'] == 1 and mock.stats['requests'] == 15
+        plain.close()
+        hedged.close()
+
+    print("✓ Hedged requests working")
+
+
+def test_prefetch():
+    """Test background prefetch of adjacent views within its budget"""
+    print("\nTesting prefetch...")
+    import time
+    from datetime import datetime, timedelta
+    from mock_server import MockNCAAServer
+    from prefetch import Prefetcher
+    from synthetic import SyntheticSlate
+
+    def wait_for(condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    today = datetime.now().strftime('%m/%d/%Y')
+    slate = SyntheticSlate(count=5, sports={'WBB': 1.0}, seed=21)
+    with MockNCAAServer(slate) as mock:
+        client = NCAAAPIClient(base_url=mock.url)
+        prefetcher = Prefetcher(client, budget=4, idle_delay=0.2)
+        try:
+            views = prefetcher.views_around('WBB', 1, 2025, today)
+            tomorrow = (datetime.now() + timedelta(days=1)).strftime('%m/%d/%Y')
+            assert views[0] == ('WBB', 1, 2025, tomorrow, None)
+            assert ('WBB', 2, 2025, today, None) in views and ('WBB', 3, 2025, today, None) in views
+            assert ('WBB', 1, 2025, today, None) not in views and len(set(views)) == len(views)
+
+            client.fetch_contests('WBB', 1, 2025, today)
+            prefetcher.prefetch_around('WBB', 1, 2025, today)
+            time.sleep(0.05)
+            assert mock.stats['requests'] == 1  # waits for the foreground to go quiet
+
+            assert wait_for(lambda: prefetcher.stats['fetched'] + prefetcher.stats['over_budget'] == len(views))
+            assert prefetcher.stats['fetched'] == 4 and mock.stats['requests'] == 5
+            warmed = client.cached_snapshot(*views[0])
+            assert warmed is not None and warmed.age < 5
+
+            # Warm views are not fetched again; the budget stays spent
+            prefetcher.prefetch_around('WBB', 1, 2025, today)
+            assert wait_for(lambda: prefetcher.stats['fresh'] == 4)
+            assert wait_for(lambda: prefetcher.stats['over_budget'] == 2 * (len(views) - 4))
+            assert mock.stats['requests'] == 5
+        finally:
+            prefetcher.close()
+            client.close()
+
+    print("✓ Prefetch working")
+
+
+def test_contest_db():
+    """Test the SQLite contest store, its queries, CLI and HTTP route"""
+    print("\nTesting contest database...")
+    import json
+    import os
+    import sqlite3
+    import tempfile
+    import threading
+    import time
+    import urllib.error
+    import urllib.request
+    from cli import main as cli_main
+    from contest_db import ContestDatabase
+    from http_api import ContestAPIServer, SnapshotStore
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate, make_raw_contest
+
+    parser = NCAAAPIClient()
+    days = ['01/06/2026', '01/07/2026', '01/08/2026']
+    contests = parser.parse_contests({'data': {'contests': [
+        make_raw_contest(i, 'WBB', 1, days[i % 3]) for i in range(60)]}})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'contests.db')
+        with ContestDatabase(path) as db:
+            assert db.upsert(contests) == 60 and db.count() == 60
+
+            team = contests[3]['home_team']
+            assert [c['id'] for c in db.query(team=team['name'])] == [contests[3]['id']]
+            assert [c['id'] for c in db.query(team=team['short_name'].upper())] == [contests[3]['id']]
+            plan = ' '.join(str(tuple(row)) for row in db._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT contest_id FROM contest_teams WHERE team = ?", ('x',)))
+            assert 'contest_teams_team' in plan
+
+            def expected(predicate):
+                return sorted(c['id'] for c in contests if predicate(c))
+
+            def ranked(side):
+                return side['rank'] != '' and 1 <= int(side['rank']) <= 25
+
+            sec = db.query(conference='sec', date_from='01/07/2026', date_to='2026-01-08')
+            assert sorted(c['id'] for c in sec) == expected(
+                lambda c: c['date'] != '01/06/2026' and 'SEC' in (c['home_team']['conference'],
+                                                                  c['away_team']['conference']))
+            both = db.query(ranked='both')
+            assert sorted(c['id'] for c in both) == expected(
+                lambda c: ranked(c['home_team']) and ranked(c['away_team']))
+            assert len(db.query(ranked='either')) >= len(both)
+            assert len(db.query(status='F')) == len([c for c in contests if c['status'] == 'F'])
+            days_seen = [c['date'] for c in db.query(sport='WBB')]
+            assert days_seen == sorted(days_seen, key=lambda d: d[6:] + d[:5])
+            # '10:00 PM' sorts after '1:00 PM'
+            times = [c['time'] for c in db.query(date_from='01/07/2026', date_to='01/07/2026')]
+            assert '10:00 PM' in times and times == sorted(times, key=lambda t: int(t.split(':')[0]))
+            assert len(db.query(limit=5)) == 5 and db.query(ids=[]) == []
+
+            # Upserts replace rows in place
+            updated = json.loads(json.dumps(contests[3]))
+            updated['home_team']['score'] = '99'
+            db.upsert([updated])
+            assert db.count() == 60 and db.query(team=team['name'])[0]['home_team']['score'] == '99'
+
+            slate = SyntheticSlate(count=7, sports={'MBB': 1.0}, seed=2)
+            with MockNCAAServer(slate) as mock:
+                client = NCAAAPIClient(base_url=mock.url, database=db)
+                client.fetch_contests('MBB', 1, 2025, '01/09/2026')
+                assert len(db.query(sport='MBB', date_from='01/09/2026')) == 7
+                client.close()
+
+            # A client with a database that joins another client's request still stores it
+            with MockNCAAServer(SyntheticSlate(count=5, sports={'MSO': 1.0}, seed=4), latency_ms=500) as mock:
+                plain = NCAAAPIClient(base_url=mock.url)
+                stored = NCAAAPIClient(base_url=mock.url, database=db)
+                leader = threading.Thread(target=plain.fetch_contests, args=('MSO', 1, 2025, '01/09/2026'))
+                leader.start()
+                deadline = time.time() + 5
+                while not mock.stats['requests'] and time.time() < deadline:
+                    time.sleep(0.005)
+                stored.fetch_contests('MSO', 1, 2025, '01/09/2026')
+                leader.join()
+                assert mock.stats['requests'] == 1
+                assert len(db.query(sport='MSO', date_from='01/09/2026')) == 5
+                plain.close()
+                stored.close()
+
+            with ContestAPIServer(SnapshotStore(), 0, database=db) as api:
+                with urllib.request.urlopen(f"{api.url}/db/contests?conference=SEC&ranked=either") as response:
+                    body = json.loads(response.read())
+                assert body['count'] == len(db.query(conference='SEC', ranked='either'))
+                try:
+                    urllib.request.urlopen(f"{api.url}/db/contests?ranked=sometimes")
+                    assert False, "bad ranked mode should be rejected"
+                except urllib.error.HTTPError as e:
+                    assert e.code == 400
+
+        # Files created before start_minutes existed are migrated on open
+        old_path = os.path.join(tmp_dir, 'old.db')
+        conn = sqlite3.connect(old_path)
+        conn.execute("""CREATE TABLE contests (id TEXT PRIMARY KEY, sport TEXT NOT NULL, division TEXT NOT NULL,
+                        day TEXT, start_time TEXT, status TEXT, venue TEXT, location TEXT, broadcast TEXT,
+                        tournament TEXT, body TEXT NOT NULL, updated REAL NOT NULL)""")
+        for contest in contests[:2]:
+            conn.execute("INSERT INTO contests VALUES (?, 'WBB', '1', '2026-01-07', ?, '', '', '', '', '', ?, 0)",
+                         (contest['id'], contest['time'], json.dumps(contest)))
+        conn.commit()
+        conn.close()
+        with ContestDatabase(old_path) as db:
+            assert [c['id'] for c in db.query()] == sorted(
+                [c['id'] for c in contests[:2]], key=lambda i: int(contests[int(i) - 100000]['time'].split(':')[0]))
+
+        out = os.path.join(tmp_dir, 'duke.json')
+        assert cli_main(['query', '--db', path, '--team', team['name'], '-o', out]) == 0
+        with open(out) as f:
+            assert json.load(f)['contests'][0]['id'] == contests[3]['id']
+
+    print("✓ Contest database working")
+
+
+def test_watchlist():
+    """Test the team index and the multi-sport watchlist job"""
+    print("\nTesting team watchlist...")
+    import copy
+    import os
+    import tempfile
+    import xml.etree.ElementTree as ET
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate, make_raw_contest
+    from watchlist import TeamIndex, WatchlistJob, normalize_team
+
+    assert normalize_team('  Texas A&M ') == normalize_team('texas a and m') == 'texas a and m'
+    assert normalize_team("St. John's (NY)") == 'st john s ny'
+
+    parser = NCAAAPIClient()
+    contests = parser.parse_contests({'data': {'contests': [make_raw_contest(i) for i in range(20)]}})
+    index = TeamIndex()
+    assert index.sync(contests)['added'] == 20 and len(index) == 20
+    assert [c['id'] for c in index.lookup(['HOME university 3', 'Away 5'])] == [contests[3]['id'], contests[5]['id']]
+    assert index.lookup(['Nobody']) == []
+
+    # Score changes swap the stored contest; team changes re-index it
+    changed = copy.deepcopy(contests[:19])
+    changed[3]['home_team']['score'] = '99'
+    changed[4]['home_team'] = dict(changed[4]['home_team'], name='Renamed U', short_name='Renamed')
+    counts = index.sync(changed)
+    assert counts == {'added': 0, 'updated': 18, 'reindexed': 1, 'removed': 1}
+    assert index.lookup(['Home 3'])[0]['home_team']['score'] == '99'
+    assert index.lookup(['Home 4']) == [] and index.lookup(['renamed'])[0]['id'] == contests[4]['id']
+    assert index.lookup(['Home 19']) == [] and 'home 19' not in index.teams()
+
+    slate = SyntheticSlate(count=40, sports={'WBB': 1.0, 'MBB': 1.0, 'WVB': 1.0}, tick_seconds=0, seed=5)
+    wanted = [slate.contests[i] for i in (1, 2, 3) if slate.contests[i]['sport'] != 'WVB']
+    teams = [f"Home {c['index']}" for c in wanted] + ['Unknown Team']
+    with MockNCAAServer(slate) as mock, tempfile.TemporaryDirectory() as tmp_dir:
+        client = NCAAAPIClient(base_url=mock.url)
+        output = os.path.join(tmp_dir, 'teams.xml')
+        job = WatchlistJob(client, teams, ['WBB', 'MBB'], '01/07/2026', output)
+        result = job.run_once()
+        assert result['written'] and result['selected'] == len(wanted)
+        expected = {c['index'] for c in wanted}
+        assert len(job.index) == len([c for c in slate.contests if c['sport'] in ('WBB', 'MBB')])
+        written = {int(e.get('id')) - 100000 for e in ET.parse(output).getroot().iter('Contest')}
+        assert written == expected
+        slate.advance(500)
+        assert job.run_once()['selected'] == len(wanted)
+        assert job.index_stats['added'] == 0 and job.index_stats['updated'] == len(job.index)
+
+        # Contest filters narrow the watched games
+        first = str(100000 + wanted[0]['index'])
+        filtered = WatchlistJob(client, teams, ['WBB', 'MBB'], '01/07/2026', output, ids=[first])
+        assert filtered.run_once()['selected'] == 1
+        assert [e.get('id') for e in ET.parse(output).getroot().iter('Contest')] == [first]
+        client.close()
+
+    print("✓ Team watchlist working")
+
+
+def test_score_history():
+    """Test per-contest score timelines and their XML/API export"""
+    print("\nTesting score history...")
+    import json
+    import os
+    import tempfile
+    import urllib.request
+    import xml.etree.ElementTree as ET
+    from auto_update import AutoUpdateJob
+    from history import ScoreHistory
+    from http_api import ContestAPIServer, SnapshotStore
+    from mock_server import MockNCAAServer
+    from synthetic import SyntheticSlate
+
+    def contest(contest_id, home, away, status='I'):
+        return {'id': contest_id, 'status': status,
+                'home_team': {'score': home}, 'away_team': {'score': away}}
+
+    history = ScoreHistory(capacity=4, max_contests=3)
+    assert history.record([contest('1', '', '', 'P')], now=1000.0) == 1
+    assert history.record([contest('1', '', '', 'P')], now=1010.0) == 0
+    for t, (home, away) in enumerate([(2, 0), (2, 3), (2, 3), (5, 3), (5, 7)]):
+        history.record([contest('1', str(home), str(away))], now=1100.0 + t)
+    summary = history.summary('1')
+    assert len(summary['points']) == 4 and summary['dropped'] == 1
+    assert [(p['home'], p['away']) for p in summary['points']] == [('2', '0'), ('2', '3'), ('5', '3'), ('5', '7')]
+    assert summary['lead_changes'] == 3 and history.timeline('missing') == []
+
+    # Over max_contests, finished games go first
+    history.record([contest('2', '60', '50', 'F')], now=1200.0)
+    history.record([contest('3', '1', '0')], now=1201.0)
+    history.record([contest('4', '0', '0', 'P')], now=1202.0)
+    assert len(history) == 3 and history.summary('2') is None and history.summary('1') is not None
+    assert history.nbytes == 3 * 4 * (8 + 2 + 2 + 1)
+
+    slate = SyntheticSlate(count=10, sports={'WBB': 1.0}, tick_seconds=0, game_ticks=6, seed=3)
+    with MockNCAAServer(slate) as mock, tempfile.TemporaryDirectory() as tmp_dir:
+        client = NCAAAPIClient(base_url=mock.url)
+        output = os.path.join(tmp_dir, 'scores.xml')
+        job = AutoUpdateJob(client, 'WBB', 1, '01/07/2026', output, history=ScoreHistory())
+        for _ in range(8):
+            job.run_once()
+            slate.advance(1)
+        root = ET.parse(output).getroot()
+        timelines = {e.get('id'): e.find('History') for e in root.iter('Contest')}
+        assert len(timelines) == 10 and all(h is not None for h in timelines.values())
+        for contest_id, element in timelines.items():
+            points = element.findall('Point')
+            assert len(points) == len(job.history.timeline(contest_id)) >= 1
+            assert len({(p.get('home'), p.get('away'), p.get('status')) for p in points}) == len(points)
+
+        store = SnapshotStore()
+        store.publish_job('scores', job)
+        with ContestAPIServer(store, 0) as api:
+            with urllib.request.urlopen(f"{api.url}/jobs/scores/history.json") as response:
+                exported = json.loads(response.read())
+        assert set(exported) == set(timelines)
+        client.close()
+
+    print("✓ Score history working")
+
+
+def test_shared_snapshot():
+    """Test the shared memory snapshot publisher, readers and render command"""
+    print("\nTesting shared memory snapshot...")
+    import json
+    import multiprocessing
+    import os
+    import tempfile
+    import threading
+    from cli import main as cli_main
+    from shared_snapshot import SnapshotPublisher, SnapshotReader
+    from synthetic import make_response
+
+    contests = NCAAAPIClient().parse_contests(make_response(40))
+    name = f"ncaa_test_{os.getpid()}"
+    with SnapshotPublisher(name, size=1 << 20) as publisher, SnapshotReader(name) as reader:
+        assert reader.read() is None and reader.wait(0, timeout=0.1) is None
+        seq = publisher.publish(contests, {'Sport': 'WBB'})
+        snapshot = reader.read()
+        assert snapshot.seq == seq and snapshot.contests == contests and snapshot.metadata == {'Sport': 'WBB'}
+        assert publisher.publish(contests, {'Sport': 'WBB'}) == seq
+        try:
+            publisher.publish([{'id': 'x' * (1 << 20)}])
+            assert False, "oversized snapshot should be rejected"
+        except ValueError:
+            pass
+        assert reader.read().seq == seq
+
+        # Records round-trip odd values, and readers can ask for a few fields
+        odd = [{'id': 7, 'status': 'live', 'home_team': None, 'tv': ['ESPN'],
+                'away_team': {'name': 'Ünïcode ✓', 'score': 1 << 40, 'rank': '07', 'seed': 3}},
+               {}]
+        publisher.publish(odd)
+        assert reader.read().contests == odd
+        publisher.publish(contests)
+        partial = reader.read(fields=('id', 'status', 'home_team.score'))
+        assert partial.contests == [{'id': c['id'], 'status': c['status'],
+                                     'home_team': {'score': c['home_team']['score']}} for c in contests]
+        seq = publisher.publish(contests, {'Sport': 'WBB'})
+
+        # Readers never see a half-written snapshot
+        torn = []
+        done = threading.Event()
+        publisher.publish(contests, {'count': len(contests)})
+
+        def read_loop():
+            while not done.is_set():
+                current = reader.read()
+                if len(current.contests) != current.metadata['count']:
+                    torn.append(current.seq)
+
+        thread = threading.Thread(target=read_loop)
+        thread.start()
+        for i in range(300):
+            subset = contests[:i % 40 + 1]
+            publisher.publish(subset, {'count': len(subset)})
+        done.set()
+        thread.join()
+        assert not torn and reader.stats['reads'] > 1
+
+        # A separate render process picks up the snapshot without fetching
+        publisher.publish(contests, {'Sport': 'WBB'})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'top25.json')
+            process = multiprocessing.Process(target=cli_main, args=(
+                ['render', '--shm', name, '--top25', '--once', '-o', output],))
+            process.start()
+            process.join(30)
+            assert process.exitcode == 0
+            with open(output) as f:
+                written = json.load(f)
+            expected = NCAAAPIClient().filter_contests(contests, top25_only=True)
+            assert [c['id'] for c in written['contests']] == [c['id'] for c in expected]
+            assert written['metadata']['Sport'] == 'WBB'
+        assert cli_main(['render', '--shm', f"{name}_missing", '--once', '-o', 'unused.json']) == 1
+    assert not os.path.exists(f"/dev/shm/{name}")
+
+    # Readers follow a publisher that restarts under the same name
+    publisher = SnapshotPublisher(name, size=1 << 20)
+    with SnapshotReader(name) as reader:
+        for i in range(3):
+            seq = publisher.publish(contests[:i + 1])
+        publisher.close()
+        with SnapshotPublisher(name, size=1 << 20) as restarted:
+            restarted.publish(contests[:1], {'Restarted': True})
+            snapshot = reader.wait(seq, timeout=5)
+            assert snapshot is not None and snapshot.metadata == {'Restarted': True}
+            assert snapshot.seq < seq and reader.stats['reattached'] == 1
+            restarted.publish(contests[:2])
+            assert len(reader.wait(snapshot.seq, timeout=5).contests) == 2
+    assert not os.path.exists(f"/dev/shm/{name}")
+
+    print("✓ Shared memory snapshot working")
+
+
+def test_sharding():
+    """Test lease-sharded polling across worker processes, with failover"""
+    print("\nTesting sharded polling...")
+    import os
+    import tempfile
+    import time
+    from contest_db import ContestDatabase
+    from mock_server import MockNCAAServer
+    from sharding import LeaseTable, ShardPool, output_name, parse_key, query_key
+    from synthetic import SyntheticSlate
+
+    key = query_key('WBB', 2, '01/07/2026')
+    assert parse_key(key) == ('WBB', 2, '01/07/2026') and output_name(key, '.xml') == 'WBB_d2_2026-01-07.xml'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Fair shares, rebalancing when a worker joins and expiry when one stops
+        leases = LeaseTable(os.path.join(tmp_dir, 'unit.db'), ttl=10)
+        keys = [query_key(sport, 1, '01/07/2026') for sport in ('WBB', 'MBB', 'WVB', 'WSOC', 'MSOC')]
+        leases.set_keys(keys)
+        assert len(leases.acquire('a', now=100)) == 5
+        assert leases.acquire('b', now=101) == []
+        assert len(leases.acquire('a', now=102)) == 3
+        assert len(leases.acquire('b', now=103)) == 2
+        assert len(leases.acquire('b', now=113)) == 5
+        leases.release('b')
+        assert all(lease['owner'] is None for lease in leases.assignments(now=114).values())
+        leases.close()
+
+        slate = SyntheticSlate(count=60, sports={'WBB': 1.0, 'MBB': 1.0}, divisions=[1, 2], tick_seconds=0, seed=4)
+        keys = [query_key(sport, division, '01/07/2026') for sport in ('WBB', 'MBB') for division in (1, 2)]
+        output_dir = os.path.join(tmp_dir, 'out')
+        db_path = os.path.join(tmp_dir, 'contests.db')
+        with MockNCAAServer(slate) as mock:
+            pool = ShardPool(keys, 2, os.path.join(tmp_dir, 'leases.db'), output_dir,
+                             db_path=db_path, base_url=mock.url, interval=0.2)
+            pool.start()
+            try:
+                def wait_for(predicate, timeout=15.0):
+                    deadline = time.monotonic() + timeout
+                    while time.monotonic() < deadline:
+                        if predicate():
+                            return True
+                        time.sleep(0.1)
+                    return False
+
+                def owners():
+                    return [lease['owner'] for lease in pool.assignments().values()]
+
+                assert wait_for(lambda: sorted(map(str, owners())) == ['worker-0'] * 2 + ['worker-1'] * 2)
+                assert wait_for(lambda: all(os.path.exists(os.path.join(output_dir, output_name(k, '.xml')))
+                                            for k in keys))
+
+                # A dead worker's leases fail over once they expire
+                pool.processes[0].kill()
+                assert wait_for(lambda: owners() == ['worker-1'] * 4)
+                polls = {k: lease['polls'] for k, lease in pool.assignments().items()}
+                assert wait_for(lambda: all(lease['polls'] > polls[k] for k, lease in pool.assignments().items()))
+            finally:
+                pool.stop()
+            leases = LeaseTable(os.path.join(tmp_dir, 'leases.db'))
+            assert all(lease['owner'] is None for lease in leases.assignments().values())
+            leases.close()
+
+        with ContestDatabase(db_path) as db:
+            assert db.count() == 60
+
+    print("✓ Sharded polling working")
+
+
 def test_api_fetch():
     """Test actual API fetch (requires internet)"""
     print("\nTesting API Fetch (requires internet)...")
@@ -111,8 +1595,33 @@ def run_all_tests():
 
     try:
         test_config_manager()
+        test_config_buffered_reload()
         test_ncaa_api()
         test_xml_generator()
+        test_xml_fragment_cache()
+        test_xml_change_aware_save()
+        test_serializers()
+        test_output_templates()
+        test_batch_export()
+        test_benchmark_suite()
+        test_mock_server()
+        test_record_replay()
+        test_load_harness()
+        test_metrics()
+        test_profiling()
+        test_change_latency()
+        test_http_api()
+        test_push_events()
+        test_push_sink()
+        test_singleflight()
+        test_stale_fallback()
+        test_hedged_requests()
+        test_prefetch()
+        test_contest_db()
+        test_watchlist()
+        test_score_history()
+        test_shared_snapshot()
+        test_sharding()
         test_api_fetch()
 
         print("\n" + "=" * 60)
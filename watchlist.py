@@ -0,0 +1,169 @@
+"""
+Team watchlists across sports
+
+A TeamIndex maps normalized team names (full and short) to the ids of the
+contests they play in. It is fed by a multi-sport fetch and updated
+incrementally each poll: only contests whose teams changed are re-indexed,
+and contests that left the slate are dropped. "All games for my teams
+today" is then one lookup per team instead of a scan of every sport.
+
+WatchlistJob runs the usual auto-update pipeline (diff, push, render,
+write) over every watched team's games in the watched sports.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
+
+from auto_update import AutoUpdateJob
+from ncaa_api import STALE_FIELD, NCAAAPIClient
+
+SIDES = ('home_team', 'away_team')
+
+
+def normalize_team(name: str) -> str:
+    """Case-, punctuation- and spacing-insensitive form of a team name"""
+    name = (name or '').casefold().replace('&', ' and ')
+    return re.sub(r'[^0-9a-z]+', ' ', name).strip()
+
+
+def team_keys(contest: Dict) -> Set[str]:
+    """Normalized full and short names of both teams"""
+    keys = set()
+    for side in SIDES:
+        team = contest.get(side) or {}
+        for field in ('name', 'short_name'):
+            key = normalize_team(team.get(field, ''))
+            if key:
+                keys.add(key)
+    return keys
+
+
+class TeamIndex:
+    """Inverted index from normalized team name to contests"""
+
+    def __init__(self):
+        self.contests: Dict[str, Dict] = {}
+        self._teams: Dict[str, Set[str]] = {}
+        self._keys: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.contests)
+
+    def add(self, contest: Dict):
+        """Index or re-index one contest"""
+        contest_id = str(contest.get('id', ''))
+        keys = team_keys(contest)
+        old_keys = self._keys.get(contest_id, set())
+        for key in old_keys - keys:
+            self._discard(key, contest_id)
+        for key in keys - old_keys:
+            self._teams.setdefault(key, set()).add(contest_id)
+        self._keys[contest_id] = keys
+        self.contests[contest_id] = contest
+
+    def remove(self, contest_id: str):
+        for key in self._keys.pop(contest_id, ()):
+            self._discard(key, contest_id)
+        self.contests.pop(contest_id, None)
+
+    def _discard(self, key: str, contest_id: str):
+        ids = self._teams.get(key)
+        if ids is not None:
+            ids.discard(contest_id)
+            if not ids:
+                del self._teams[key]
+
+    def sync(self, contests: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Make the index match a freshly fetched slate
+
+        Returns:
+            Counts of contests added, updated (teams unchanged, so only the
+            stored contest was swapped), reindexed and removed
+        """
+        counts = {'added': 0, 'updated': 0, 'reindexed': 0, 'removed': 0}
+        seen = set()
+        for contest in contests:
+            contest_id = str(contest.get('id', ''))
+            seen.add(contest_id)
+            if contest_id not in self.contests:
+                self.add(contest)
+                counts['added'] += 1
+            elif team_keys(contest) == self._keys[contest_id]:
+                self.contests[contest_id] = contest
+                counts['updated'] += 1
+            else:
+                self.add(contest)
+                counts['reindexed'] += 1
+        for contest_id in [cid for cid in self.contests if cid not in seen]:
+            self.remove(contest_id)
+            counts['removed'] += 1
+        return counts
+
+    def lookup(self, teams: Iterable[str]) -> List[Dict]:
+        """Contests involving any of the teams (raw or normalized names), in index order"""
+        ids = set()
+        for team in teams:
+            ids |= self._teams.get(normalize_team(team), set())
+        return [contest for contest_id, contest in self.contests.items() if contest_id in ids]
+
+    def teams(self) -> List[str]:
+        """Every indexed team key"""
+        return sorted(self._teams)
+
+
+def fetch_sports(client: NCAAAPIClient, sports: Iterable[str], division: int = 1, season_year: int = 2025,
+                 contest_date: Optional[str] = None, week: Optional[int] = None) -> Dict:
+    """
+    Fetch several sports concurrently into one raw response
+
+    The result is stale (NCAAAPIClient.is_stale) only if every sport's
+    fetch failed; a failed sport contributes its last good contests.
+    """
+    sports = list(sports)
+    with ThreadPoolExecutor(max_workers=min(8, len(sports)) or 1) as pool:
+        responses = list(pool.map(
+            lambda sport: client.fetch_contests(sport, division, season_year, contest_date, week), sports))
+
+    combined = []
+    for response in responses:
+        combined.extend(response.get('data', {}).get('contests', []) or [])
+    merged = {'data': {'contests': combined}}
+    stale = [response[STALE_FIELD] for response in responses if client.is_stale(response)]
+    if responses and len(stale) == len(responses):
+        ages = [meta['age'] for meta in stale if meta['age'] is not None]
+        merged[STALE_FIELD] = {'stale': True, 'fetched_at': None if not ages else stale[0]['fetched_at'],
+                               'age': max(ages) if ages else None, 'error': stale[0]['error']}
+    return merged
+
+
+class WatchlistJob(AutoUpdateJob):
+    """Keeps an output file current with every game of the watched teams"""
+
+    def __init__(self, client: NCAAAPIClient, teams: Iterable[str], sports: Iterable[str],
+                 contest_date: Optional[str], output_path: str, division: int = 1, **kwargs):
+        """
+        Args:
+            client: API client used for every poll
+            teams: Team names to follow (full or short, any case)
+            sports: Sport codes fetched each poll
+            contest_date: Date in MM/DD/YYYY format
+            output_path: File to keep current (extension selects the format)
+            division: Division number
+            **kwargs: Other AutoUpdateJob options (metadata, generator, ...).
+                The top25_only, conference and ids filters narrow the
+                watched teams' games
+        """
+        self.sports = list(sports)
+        self.teams = [team for team in teams if normalize_team(team)]
+        self.index = TeamIndex()
+        self.index_stats = {}
+        super().__init__(client, ','.join(self.sports), division, contest_date, output_path, **kwargs)
+
+    def fetch(self) -> Dict:
+        return fetch_sports(self.client, self.sports, self.division, self.season_year,
+                            self.contest_date, self.week)
+
+    def select(self, contests: List[Dict]) -> List[Dict]:
+        self.index_stats = self.index.sync(contests)
+        return super().select(self.index.lookup(self.teams))
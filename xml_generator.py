@@ -1,20 +1,64 @@
 """XML generator for NCAA contest data"""
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
-from typing import List, Dict
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+from file_utils import atomic_write
+from metrics import FRAGMENT_CACHE, WRITES
 
 
 class XMLGenerator:
-    """Generates pretty-printed XML from contest data"""
+    """
+    Generates pretty-printed XML from contest data
+
+    One generator can be shared between threads (a GUI's manual save and its
+    auto-update job) and between documents: fragments are cached by content,
+    so each document keeps its hits, and access is serialized by a lock.
+    """
+
+    INDENT = '  '
+
+    # Fragments kept across documents; least recently used ones are dropped
+    FRAGMENT_CACHE_MAX_ENTRIES = 4096
 
-    def __init__(self):
-        pass
+    # Metadata elements that change on every render and never affect the payload
+    VOLATILE_METADATA = ('GeneratedAt', 'LastUpdated')
+
+    def __init__(self, template=None):
+        """
+        Args:
+            template: Optional CompiledTemplate (see templates.py) that
+                replaces the built-in layout
+        """
+        self.template = template
+
+        # content hash -> pretty-printed <Contest> fragment, least recently used first
+        self._fragment_cache: 'OrderedDict[str, str]' = OrderedDict()
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+        # file path -> (payload hash, (mtime_ns, size)) of the last document written there
+        self._written_hashes: Dict[str, Tuple[str, Tuple[int, int]]] = {}
+        self.write_stats = {'written': 0, 'skipped': 0}
+        self._write_lock = threading.Lock()
+        self._volatile_re = re.compile(
+            r'<(%s)>[^<]*</\1>' % '|'.join(self.VOLATILE_METADATA))
 
     def generate_xml(self, contests: List[Dict], metadata: Dict = None) -> str:
         """
         Generate pretty-printed XML from contest data
 
+        Unchanged contests are served from the fragment cache, so only
+        contests whose content changed since the last call are re-serialized.
+
         Args:
             contests: List of contest dictionaries
             metadata: Optional metadata to include in XML
@@ -22,10 +66,11 @@ class XMLGenerator:
         Returns:
             Pretty-printed XML string
         """
-        root = ET.Element('NCAASports')
+        if self.template is not None:
+            return self.template.render_document(contests, metadata, self._contest_fragments(contests))
 
         # Add metadata
-        meta_elem = ET.SubElement(root, 'Metadata')
+        meta_elem = ET.Element('Metadata')
         if metadata:
             for key, value in metadata.items():
                 meta_child = ET.SubElement(meta_elem, key)
@@ -35,15 +80,68 @@ class XMLGenerator:
         timestamp = ET.SubElement(meta_elem, 'GeneratedAt')
         timestamp.text = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-        # Add contests
-        contests_elem = ET.SubElement(root, 'Contests')
-        contests_elem.set('count', str(len(contests)))
-
-        for contest in contests:
-            self._add_contest(contests_elem, contest)
+        parts = ['<?xml version="1.0" ?>\n', '<NCAASports>\n',
+                 self._prettify_fragment(meta_elem, depth=1)]
 
-        # Pretty print
-        return self._prettify_xml(root)
+        # Add contests
+        if contests:
+            parts.append(f'{self.INDENT}<Contests count="{len(contests)}">\n')
+            parts.extend(self._contest_fragments(contests))
+            parts.append(f'{self.INDENT}</Contests>\n')
+        else:
+            parts.append(f'{self.INDENT}<Contests count="0"/>\n')
+
+        parts.append('</NCAASports>\n')
+        return ''.join(parts)
+
+    def _contest_fragments(self, contests: List[Dict]) -> List[str]:
+        """Return <Contest> fragments, re-rendering only changed contests"""
+        fragments = []
+        hits = 0
+
+        with self._lock:
+            cache = self._fragment_cache
+            for contest in contests:
+                digest = self.contest_hash(contest)
+                fragment = cache.get(digest)
+
+                if fragment is not None:
+                    cache.move_to_end(digest)
+                    hits += 1
+                else:
+                    fragment = self._render_contest(contest)
+                    cache[digest] = fragment
+
+                fragments.append(fragment)
+
+            while len(cache) > self.FRAGMENT_CACHE_MAX_ENTRIES:
+                cache.popitem(last=False)
+
+            misses = len(contests) - hits
+            self.cache_stats['hits'] += hits
+            self.cache_stats['misses'] += misses
+        FRAGMENT_CACHE.inc(hits, result='hit')
+        FRAGMENT_CACHE.inc(misses, result='miss')
+        return fragments
+
+    def _render_contest(self, contest: Dict) -> str:
+        """Render one <Contest> fragment at its nesting depth"""
+        if self.template is not None:
+            return self.template.render_contest(contest)
+        contests_elem = ET.Element('Contests')
+        self._add_contest(contests_elem, contest)
+        return self._prettify_fragment(contests_elem[0], depth=2)
+
+    @staticmethod
+    def contest_hash(contest: Dict) -> str:
+        """Return a stable content hash for a contest dictionary"""
+        payload = json.dumps(contest, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def clear_cache(self):
+        """Discard all cached contest fragments"""
+        with self._lock:
+            self._fragment_cache.clear()
 
     def _add_contest(self, parent: ET.Element, contest: Dict):
         """Add a single contest to the XML tree"""
@@ -67,6 +165,16 @@ class XMLGenerator:
             away_elem = ET.SubElement(contest_elem, 'AwayTeam')
             self._add_team(away_elem, contest['away_team'])
 
+        # Score timeline (history.ScoreHistory.attach)
+        if contest.get('history'):
+            history = contest['history']
+            history_elem = ET.SubElement(contest_elem, 'History')
+            history_elem.set('leadChanges', str(history.get('lead_changes', 0)))
+            for point in history.get('points', []):
+                point_elem = ET.SubElement(history_elem, 'Point')
+                for key in ('time', 'home', 'away', 'status'):
+                    point_elem.set(key, str(point.get(key, '')))
+
     def _add_team(self, parent: ET.Element, team: Dict):
         """Add team information to XML"""
         for key, value in team.items():
@@ -74,18 +182,73 @@ class XMLGenerator:
                 elem = ET.SubElement(parent, key.replace('_', '').title())
                 elem.text = str(value)
 
-    def _prettify_xml(self, elem: ET.Element) -> str:
-        """Return a pretty-printed XML string"""
+    def _prettify_fragment(self, elem: ET.Element, depth: int) -> str:
+        """Pretty-print a single element as it would appear nested at depth"""
         rough_string = ET.tostring(elem, encoding='unicode')
         reparsed = minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent='  ')
+        writer = io.StringIO()
+        reparsed.documentElement.writexml(writer, self.INDENT * depth, self.INDENT, '\n')
+        return writer.getvalue()
 
-    def save_to_file(self, xml_string: str, file_path: str):
-        """Save XML string to file"""
+    def payload_hash(self, xml_string: str) -> str:
+        """Hash an XML document, ignoring volatile metadata timestamps"""
+        payload = self._volatile_re.sub('', xml_string)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _disk_hash(self, file_path: str, key: str) -> Optional[tuple]:
+        """
+        (payload hash, (mtime_ns, size)) of the file on disk, or None when it
+        cannot be read or decoded (the caller then rewrites it)
+        """
+        try:
+            stat = os.stat(file_path)
+            cached = self._written_hashes.get(key)
+            if not cached or cached[1] != (stat.st_mtime_ns, stat.st_size):
+                # First write this session or edited externally: hash what is on disk
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    cached = (self.payload_hash(f.read()), (stat.st_mtime_ns, stat.st_size))
+                self._written_hashes[key] = cached
+            return cached
+        except (OSError, ValueError):
+            # UnicodeDecodeError is a ValueError
+            self._written_hashes.pop(key, None)
+            return None
+
+    def save_to_file(self, xml_string: str, file_path: str, force: bool = False):
+        """
+        Save XML string to file
+
+        The file is replaced atomically (temp file, fsync, rename). When the
+        contest payload is unchanged since the last write to the same path the
+        write is skipped, so file watchers are not triggered needlessly.
+
+        Args:
+            xml_string: XML document to write
+            file_path: Destination file path
+            force: Write even if the payload is unchanged
+
+        Returns:
+            True if the file was written or already up to date, False on error
+        """
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(xml_string)
+            digest = self.payload_hash(xml_string)
+            key = os.path.abspath(file_path)
+
+            with self._write_lock:
+                if not force and os.path.exists(file_path):
+                    cached = self._disk_hash(file_path, key)
+                    if cached and cached[0] == digest:
+                        self.write_stats['skipped'] += 1
+                        WRITES.inc(result='skipped')
+                        return True
+
+                atomic_write(file_path, xml_string)
+                stat = os.stat(file_path)
+                self._written_hashes[key] = (digest, (stat.st_mtime_ns, stat.st_size))
+                self.write_stats['written'] += 1
+            WRITES.inc(result='written')
             return True
         except Exception as e:
+            WRITES.inc(result='failed')
             print(f"Error saving XML: {e}")
             return False